@@ -21,7 +21,7 @@ extends Resource
 ## The 3D model to show when dropped on the ground
 @export var world_model: PackedScene
 
-## Path to .glb model for inventory icon rendering
+## Path to the model (.glb, or a material variant's .tscn) for inventory icon rendering
 @export var model_path: String = ""
 
 
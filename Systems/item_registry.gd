@@ -11,6 +11,13 @@ var _id_to_path: Dictionary = {}
 var _id_to_resource: Dictionary = {}
 var _initialized: bool = false
 
+# Inventory icons pre-rendered by tools/generate_assets.py (icons command):
+# one atlas texture plus a JSON index of rects keyed by ItemData.model_path
+const ICON_INDEX_PATH = "res://Assets/Icons/item_icons.json"
+var _icon_atlas: Texture2D
+var _icon_rects: Dictionary = {}
+var _baked_icons: Dictionary = {}
+
 # Hardcoded manifest: item_id -> res:// path
 # DirAccess cannot enumerate packed APK resources on Android, so we
 # list every item explicitly. Add new items here when creating them.
@@ -52,6 +59,37 @@ func ensure_initialized() -> void:
 		else:
 			FileLogger.log_msg("ItemRegistry: failed to load %s" % path)
 	FileLogger.log_msg("ItemRegistry: registered %d items" % _id_to_resource.size())
+	_load_icon_index()
+
+
+func _load_icon_index() -> void:
+	if not FileAccess.file_exists(ICON_INDEX_PATH):
+		return
+	var data = JSON.parse_string(FileAccess.get_file_as_string(ICON_INDEX_PATH))
+	if typeof(data) != TYPE_DICTIONARY or not data.has("icons") or not data.has("atlas"):
+		FileLogger.log_msg("ItemRegistry: invalid icon index %s" % ICON_INDEX_PATH)
+		return
+	_icon_atlas = load(data["atlas"])
+	if _icon_atlas == null:
+		FileLogger.log_msg("ItemRegistry: failed to load icon atlas %s" % data["atlas"])
+		return
+	_icon_rects = data["icons"]
+	FileLogger.log_msg("ItemRegistry: %d baked icons" % _icon_rects.size())
+
+
+## Pre-rendered icon for a model path, or null if it was not baked
+## (callers then fall back to rendering the model in a SubViewport).
+func get_baked_icon(model_path: String) -> Texture2D:
+	if _baked_icons.has(model_path):
+		return _baked_icons[model_path]
+	if _icon_atlas == null or not _icon_rects.has(model_path):
+		return null
+	var r = _icon_rects[model_path]["rect"]
+	var tex = AtlasTexture.new()
+	tex.atlas = _icon_atlas
+	tex.region = Rect2(r[0], r[1], r[2], r[3])
+	_baked_icons[model_path] = tex
+	return tex
 
 
 func get_item_by_id(item_id: int):
@@ -0,0 +1,39 @@
+extends Node3D
+## Distance LOD switching for the *_lod.tscn wrappers written by tools/glb_lod.py.
+## NO class_name — referenced by script path in the generated .tscn files.
+## The instanced model .glb holds one node per level (LOD0, LOD1, ...). Each
+## level's meshes get a visibility range between consecutive lod_distances,
+## so the renderer picks the level per instance with no per-frame script work.
+
+## Camera distance (meters) at which level i hands over to level i + 1
+@export var lod_distances: Array = []
+## Overlap around each switch distance to avoid flicker at the boundary
+@export var switch_margin: float = 1.0
+
+
+func _ready() -> void:
+	for node in _get_all_descendants(self):
+		var level_name := String(node.name)
+		if not level_name.begins_with("LOD") or not level_name.substr(3).is_valid_int():
+			continue
+		var level := level_name.substr(3).to_int()
+		var begin := 0.0
+		var end := 0.0
+		if level > 0 and level <= lod_distances.size():
+			begin = float(lod_distances[level - 1])
+		if level < lod_distances.size():
+			end = float(lod_distances[level])
+		for child in _get_all_descendants(node):
+			if child is GeometryInstance3D:
+				child.visibility_range_begin = begin
+				child.visibility_range_end = end
+				child.visibility_range_begin_margin = switch_margin if begin > 0.0 else 0.0
+				child.visibility_range_end_margin = switch_margin if end > 0.0 else 0.0
+
+
+func _get_all_descendants(node: Node) -> Array:
+	var result: Array = []
+	for child in node.get_children():
+		result.append(child)
+		result.append_array(_get_all_descendants(child))
+	return result
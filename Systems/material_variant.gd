@@ -0,0 +1,64 @@
+extends Node3D
+## Material overrides for the variant scenes written by tools/glb_variant.py.
+## NO class_name — referenced by script path in the generated .tscn files.
+## The scene instances the base model's .glb, so every variant shares the
+## base's meshes; only the materials differ. Each variant material is built
+## once per (variant scene, base material) and shared by all instances.
+
+## Replaces the base-color texture of textured surfaces (null keeps the base's)
+@export var albedo_texture: Texture2D
+## Maps the base's UVs (an atlas tile, if it was packed) onto albedo_texture
+@export var uv_scale := Vector3.ONE
+@export var uv_offset := Vector3.ZERO
+## Whether surfaces without a texture take tint as their albedo color
+@export var tint_untextured := false
+@export var tint := Color.WHITE
+## Multiplied into every surface's albedo color
+@export var color_factor := Color.WHITE
+## Replace every surface's factor when >= 0
+@export var metallic := -1.0
+@export var roughness := -1.0
+
+static var _materials := {}
+static var _default_material := StandardMaterial3D.new()
+
+
+func _ready() -> void:
+	for node in _get_all_descendants(self):
+		if not node is MeshInstance3D:
+			continue
+		for surface in node.get_surface_override_material_count():
+			var base = node.get_active_material(surface)
+			if base == null:
+				base = _default_material
+			if base is BaseMaterial3D:
+				node.set_surface_override_material(surface, _variant_of(base))
+
+
+func _variant_of(base: BaseMaterial3D) -> BaseMaterial3D:
+	var key := "%s:%d" % [scene_file_path, base.get_instance_id()]
+	if _materials.has(key):
+		return _materials[key]
+	var material: BaseMaterial3D = base.duplicate()
+	if material.albedo_texture != null:
+		if albedo_texture != null:
+			material.albedo_texture = albedo_texture
+			material.uv1_scale = uv_scale
+			material.uv1_offset = uv_offset
+	elif tint_untextured:
+		material.albedo_color = Color(tint.r, tint.g, tint.b, material.albedo_color.a)
+	material.albedo_color *= color_factor
+	if metallic >= 0.0:
+		material.metallic = metallic
+	if roughness >= 0.0:
+		material.roughness = roughness
+	_materials[key] = material
+	return material
+
+
+func _get_all_descendants(node: Node) -> Array:
+	var result: Array = []
+	for child in node.get_children():
+		result.append(child)
+		result.append_array(_get_all_descendants(child))
+	return result
@@ -106,6 +106,10 @@ func refresh() -> void:
 			btn.icon = null
 		else:
 			var mp = item.get("model_path")
+			if mp and mp != "" and not _icon_cache.has(mp):
+				var baked = ItemRegistry.get_baked_icon(mp)
+				if baked:
+					_icon_cache[mp] = baked
 			if mp and mp != "" and _icon_cache.has(mp) and _icon_cache[mp] != null:
 				btn.icon = _icon_cache[mp]
 				btn.text = ""
@@ -111,6 +111,10 @@ func refresh() -> void:
 			var qty: int = slot_data["quantity"]
 			btn.tooltip_text = item.call("get_display_name")
 			var mp = item.get("model_path")
+			if mp and mp != "" and not _icon_cache.has(mp):
+				var baked = ItemRegistry.get_baked_icon(mp)
+				if baked:
+					_icon_cache[mp] = baked
 			if mp and mp != "" and _icon_cache.has(mp) and _icon_cache[mp] != null:
 				btn.icon = _icon_cache[mp]
 				btn.text = str(qty) if qty > 1 else ""
@@ -104,6 +104,10 @@ func _make_btn(item, price_text: String, render_list: Array) -> Button:
 	btn.icon_alignment = HORIZONTAL_ALIGNMENT_CENTER
 	btn.expand_icon = true
 	var mp = item.get("model_path")
+	if mp and mp != "" and not _icon_cache.has(mp):
+		var baked = ItemRegistry.get_baked_icon(mp)
+		if baked:
+			_icon_cache[mp] = baked
 	if mp and mp != "" and _icon_cache.has(mp) and _icon_cache[mp] != null:
 		btn.icon = _icon_cache[mp]
 		btn.text = price_text
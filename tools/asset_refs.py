@@ -0,0 +1,137 @@
+"""
+Reference-graph scanner for the Godot project.
+
+Parses every .tscn, .tres and .gd file (plus project.godot) for res:// paths
+- ext_resource entries, model_path fields, load()/preload() strings - and
+builds a graph from scenes, resources and scripts to the files they use. A
+model - a GLB, or a generated scene under res://Assets/Models (LOD wrappers,
+material variants) - is "used" when it is reachable from the main scene or an
+autoload; models on disk that nothing reaches are orphans that only inflate
+the APK (the Android preset exports all resources).
+
+Parsed references are cached per file by mtime and size, so rescanning an
+unchanged tree only stats files.
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+
+SCANNED_SUFFIXES = (".tscn", ".tres", ".gd", ".godot")
+SKIPPED_DIRS = {".godot", ".git", "tools", "export", "android", "addons"}
+RES_PATH = re.compile(r"res://[^\"'\s)\]]+")
+CACHE_VERSION = 1
+MODEL_SCENES = "res://Assets/Models/"
+
+
+def to_res_path(root: Path, path: Path) -> str:
+    return "res://" + path.relative_to(root).as_posix()
+
+
+def is_model(res_path: str) -> bool:
+    """A GLB anywhere, or a scene under res://Assets/Models."""
+    return res_path.endswith(".glb") or res_path.startswith(MODEL_SCENES) and res_path.endswith(".tscn")
+
+
+def _project_files(root: Path):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in SKIPPED_DIRS and not d.startswith(".")]
+        for filename in filenames:
+            if filename.endswith(SCANNED_SUFFIXES):
+                yield Path(dirpath) / filename
+
+
+def parse_refs(path: Path) -> list[str]:
+    text = path.read_text(encoding="utf-8", errors="replace")
+    return sorted(set(RES_PATH.findall(text)))
+
+
+class ReferenceIndex:
+    """res:// reference graph for a project tree, with an mtime-keyed parse cache."""
+
+    def __init__(self, root: Path, cache_file: Path | None = None):
+        self.root = Path(root)
+        self.cache_file = cache_file
+        self.edges = {}  # res path of a scanned file -> res paths it references
+        self.reparsed = 0
+
+    def scan(self) -> "ReferenceIndex":
+        cached = self._load_cache()
+        fresh = {}
+        for path in _project_files(self.root):
+            stat = path.stat()
+            key = to_res_path(self.root, path)
+            entry = cached.get(key)
+            if not entry or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+                entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "refs": parse_refs(path)}
+                self.reparsed += 1
+            fresh[key] = entry
+        self.edges = {key: entry["refs"] for key, entry in fresh.items()}
+        if self.reparsed or len(fresh) != len(cached):
+            self._save_cache(fresh)
+        return self
+
+    def roots(self) -> list[str]:
+        """Entry points: project.godot itself (main scene, autoloads, icon)."""
+        return ["res://project.godot"] if "res://project.godot" in self.edges else sorted(self.edges)
+
+    def reachable(self) -> set[str]:
+        """Every res:// path reachable from the roots. A directory path reaches everything under it."""
+        seen = set()
+        stack = list(self.roots())
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            targets = self.edges.get(node, [])
+            for target in targets:
+                if target.endswith("/"):
+                    stack += [p for p in self.edges if p.startswith(target)]
+                stack.append(target)
+        return seen
+
+    def referrers(self, target: str) -> list[str]:
+        return sorted(src for src, refs in self.edges.items() if target in refs)
+
+    def retarget(self, old: str, new: str) -> list[str]:
+        """Rewrite every reference to old as new in the files that hold one. Returns their res paths."""
+        rewritten = self.referrers(old)
+        for src in rewritten:
+            path = self.root / src[len("res://"):]
+            text = path.read_text(encoding="utf-8")
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_text(RES_PATH.sub(lambda m: new if m.group(0) == old else m.group(0), text), encoding="utf-8")
+            os.replace(tmp, path)
+            self.edges[src] = sorted({new if ref == old else ref for ref in self.edges[src]})
+        return rewritten
+
+    def used_models(self) -> set[str]:
+        return {p for p in self.reachable() if is_model(p)}
+
+    def referenced_models(self) -> set[str]:
+        """Models referenced by any scanned file, reachable or not."""
+        return {ref for refs in self.edges.values() for ref in refs if is_model(ref)}
+
+    def models_on_disk(self, models_dir: Path) -> dict[str, int]:
+        """res path -> size in bytes for every GLB and model scene under models_dir."""
+        paths = sorted(p for p in Path(models_dir).rglob("*") if p.suffix in (".glb", ".tscn"))
+        return {to_res_path(self.root, p): p.stat().st_size for p in paths}
+
+    def _load_cache(self) -> dict:
+        if not self.cache_file or not self.cache_file.exists():
+            return {}
+        try:
+            data = json.loads(self.cache_file.read_text())
+        except (OSError, ValueError):
+            return {}
+        return data.get("files", {}) if data.get("version") == CACHE_VERSION else {}
+
+    def _save_cache(self, files: dict):
+        if not self.cache_file:
+            return
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_file.with_name(self.cache_file.name + ".tmp")
+        tmp.write_text(json.dumps({"version": CACHE_VERSION, "files": files}))
+        os.replace(tmp, self.cache_file)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of generate_assets.py against the local Meshy stub.
+
+Starts meshy_stub.py in-process, points the generator at it with a scratch
+Assets/ directory and state files, runs a full generation of N assets and
+reports wall-clock time, API requests per asset, peak concurrency and
+download throughput. Generator timings (poll intervals, backoff, rate limit)
+are compressed by the same time scale as the stub, so results read in
+"Meshy seconds" as well as real seconds.
+
+  python tools/bench_pipeline.py --assets 40
+  python tools/bench_pipeline.py --assets 40 --json bench.json
+  python tools/bench_pipeline.py --assets 40 --baseline bench.json   # exit 1 on regression
+"""
+
+import argparse
+import contextlib
+import importlib
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import generate_assets
+from meshy_stub import MeshyStub, StubState, add_config_arguments, config_from_args
+
+# Generator settings expressed in seconds, compressed along with the stub
+SCALED_SECONDS = (
+    "POLL_INTERVAL", "MAX_POLL_TIME", "POLL_MIN_INTERVAL", "POLL_MAX_INTERVAL",
+    "API_BACKOFF_BASE", "API_BACKOFF_MAX", "HEDGE_MIN_DEADLINE",
+)
+
+# Metrics compared against a baseline, and whether lower is better
+REGRESSION_METRICS = {
+    "wall_seconds": True,
+    "requests_per_asset": True,
+    "download_mb_per_second": False,
+}
+
+
+def build_assets(count: int) -> list[dict]:
+    """count asset definitions cycled from ASSETS, each with a unique name and prompt (or base)."""
+    assets = []
+    for i in range(count):
+        base = generate_assets.ASSETS[i % len(generate_assets.ASSETS)]
+        lap = i // len(generate_assets.ASSETS)
+        asset = dict(base)
+        if lap:
+            asset["name"] = f"{base['name']}_{lap}"
+            asset["filename"] = f"{base['name']}_{lap}{Path(base['filename']).suffix}"
+            if "variant_of" in base:
+                asset["variant_of"] = f"{base['variant_of']}_{lap}"
+            else:
+                asset["prompt"] = f"{base['prompt']} (variant {lap})"
+        assets.append(asset)
+    return assets
+
+
+def configure_generator(gen, workdir: Path, base_url: str, time_scale: float, assets: list[dict]):
+    gen.BASE_URL = base_url
+    gen.ASSETS = assets
+    gen.ASSETS_DIR = workdir / "Assets"
+    gen.STATE_FILE = workdir / "state.json"
+    gen.JOURNAL_FILE = workdir / "state.journal"
+    gen.CACHE_DIR = workdir / "cache"
+    gen.TRACE_DIR = workdir / "traces"
+    gen.CLAIMS_DIR = workdir / "claims"
+    gen.WORKER_STATUS_DIR = workdir / "workers"
+    gen.MODEL_INDEX_FILE = workdir / "glb_index.json"
+    # Any other path setting inside the project (texture extracts, reference
+    # cache, ...) moves into the workdir too, so a benchmark never writes there
+    for name, value in vars(gen).items():
+        if name.isupper() and isinstance(value, Path) and value != gen.PROJECT_ROOT \
+                and value.is_relative_to(gen.PROJECT_ROOT):
+            setattr(gen, name, workdir / value.relative_to(gen.PROJECT_ROOT))
+    # The reference scan rewrites files that point at replaced variant GLBs;
+    # it only ever sees the workdir
+    gen.PROJECT_ROOT = workdir
+    for name in SCALED_SECONDS:
+        setattr(gen, name, getattr(gen, name) * time_scale)
+    gen.API_RATE = gen.API_RATE / time_scale
+    gen._limiter = gen.RateLimiter(gen.API_RATE, gen.API_BURST)
+
+
+def run_once(args, workdir: Path) -> dict:
+    gen = importlib.reload(generate_assets)
+    assets = build_assets(args.assets)
+    time_scale = args.time_scale
+
+    with MeshyStub(config_from_args(args)) as stub:
+        configure_generator(gen, workdir, stub.base_url, time_scale, assets)
+        argv = ["generate"] + ([] if args.optimize else ["--no-optimize", "--no-atlas", "--no-icons"])
+        log_path = workdir / "generate.log"
+        with open(log_path, "w") as log_file:
+            redirect = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(log_file)
+            started = time.perf_counter()
+            with redirect:
+                exit_code = gen.main(argv)
+            wall = time.perf_counter() - started
+        if exit_code and not args.verbose:
+            print("Generator reported failures; last log lines:")
+            print("".join(log_path.read_text().splitlines(keepends=True)[-15:]))
+        stats = stub.stats()
+        tasks = list(stub.state.tasks.values())
+
+    traces = gen.latest_traces(gen.TRACE_DIR)
+    if args.verbose and traces:
+        print(gen.format_summary(gen.summarize([e for path in traces for e in gen.load_events(path)])))
+
+    installed = sum(
+        1 for a in assets if gen.is_installed(gen.ASSETS_DIR / a["output_dir"] / a["filename"])
+    )
+    per_asset = list(stats["requests_by_prompt"].values()) or [0]
+
+    # Slowest single asset as the server saw it: first submit to the last task
+    # finish the generator waited for (canceled or abandoned copies end early)
+    spans = {}
+    for task in tasks:
+        end = StubState.observed_end(task)
+        first, last = spans.get(task["prompt"], (task["created_at"], end))
+        spans[task["prompt"]] = (min(first, task["created_at"]), max(last, end))
+    slowest = max((last - first for first, last in spans.values()), default=0.0)
+
+    download_seconds = stats["download_seconds"]
+
+    return {
+        "assets": len(assets),
+        "succeeded": installed,
+        "exit_code": exit_code,
+        "wall_seconds": wall,
+        "wall_meshy_seconds": wall / time_scale,
+        "slowest_asset_seconds": slowest,
+        "api_requests": stats["api_requests"],
+        "requests_per_asset": stats["api_requests"] / max(1, len(assets)),
+        "max_requests_one_asset": max(per_asset),
+        "status_requests": stats["status_requests"],
+        "create_requests": stats["create_requests"],
+        "cancel_requests": stats["cancel_requests"],
+        "rate_limited": stats["rate_limited"],
+        "peak_concurrent_tasks": stats["peak_concurrent_tasks"],
+        "peak_in_flight_requests": stats["peak_in_flight"],
+        "download_bytes": stats["download_bytes"],
+        # Per-stream rate: bytes over the summed duration of individual downloads
+        "download_mb_per_second": stats["download_bytes"] / 1e6 / download_seconds if download_seconds else 0.0,
+    }
+
+
+def summarize(runs: list[dict]) -> dict:
+    if len(runs) == 1:
+        return runs[0]
+    summary = dict(runs[-1])
+    for key, value in runs[0].items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            summary[key] = statistics.median(run[key] for run in runs)
+    summary["runs"] = len(runs)
+    return summary
+
+
+def print_report(result: dict):
+    print("=" * 60)
+    print("Pipeline benchmark (Meshy stub)")
+    print("=" * 60)
+    print(f"Assets:                 {result['succeeded']}/{result['assets']} installed (exit {result['exit_code']})")
+    print(f"Wall time:              {result['wall_seconds']:.2f}s ({result['wall_meshy_seconds']:.0f} Meshy-s)")
+    print(f"Slowest single asset:   {result['slowest_asset_seconds']:.2f}s")
+    print(f"API requests:           {result['api_requests']} "
+          f"({result['create_requests']} create, {result['status_requests']} status, "
+          f"{result['cancel_requests']} cancel, {result['rate_limited']} got 429)")
+    print(f"Requests per asset:     {result['requests_per_asset']:.1f} (max {result['max_requests_one_asset']})")
+    print(f"Peak concurrency:       {result['peak_concurrent_tasks']} tasks, {result['peak_in_flight_requests']} HTTP requests")
+    print(f"Downloads:              {result['download_bytes'] / 1e6:.1f} MB at {result['download_mb_per_second']:.1f} MB/s per stream")
+
+
+def check_regressions(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    problems = []
+    for key, lower_is_better in REGRESSION_METRICS.items():
+        old, new = baseline.get(key), result.get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        if (change > tolerance) if lower_is_better else (change < -tolerance):
+            problems.append(f"{key}: {old:.3g} -> {new:.3g} ({change:+.0%})")
+    if result["succeeded"] < baseline.get("succeeded", 0):
+        problems.append(f"succeeded: {baseline['succeeded']} -> {result['succeeded']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark generate_assets.py against the local Meshy stub")
+    parser.add_argument("--assets", type=int, default=len(generate_assets.ASSETS), help="number of assets to generate")
+    parser.add_argument("--runs", type=int, default=1, help="repeat and report medians")
+    parser.add_argument("--optimize", action="store_true", help="include the optimize, atlas and icon stages")
+    parser.add_argument("--verbose", action="store_true", help="show generator output")
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    parser.add_argument("--baseline", type=Path, help="compare against a previous --json result")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression vs baseline")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    runs = []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory(prefix="meshy-bench-") as tmp:
+            runs.append(run_once(args, Path(tmp)))
+    result = summarize(runs)
+    print_report(result)
+
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2))
+    if args.baseline:
+        problems = check_regressions(result, json.loads(args.baseline.read_text()), args.tolerance)
+        if problems:
+            print("\nREGRESSION vs baseline:")
+            for problem in problems:
+                print(f"  {problem}")
+            return 1
+        print("\nNo regressions vs baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
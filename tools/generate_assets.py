@@ -4,19 +4,77 @@ Meshy AI 3D Asset Generator for AI RPG
 Generates low-poly OSRS-style 3D models using the Meshy Text-to-3D API.
 Downloads GLB files into the project's Assets/ directories.
 
-Uses batch parallelism: submits all preview tasks, polls them all,
-then submits all refine tasks, polls them all, then downloads everything.
+Streams each asset through preview -> refine -> download on its own worker,
+so an asset advances as soon as its own previous stage finishes instead of
+waiting on the slowest asset of every phase. Downloaded models are then
+optimized in place (see glb_optimize.py) and models with "lods" get a LOD
+chain written into them (see glb_lod.py); `optimize` re-runs both stages alone. At the end of a
+run item and equipment textures are packed into shared atlas pages (see
+texture_atlas.py) and item models are baked into an inventory icon atlas (see
+icon_bake.py); `atlas` and `icons` re-run those alone.
+
+Each generate run writes a JSONL trace of stage timings, HTTP calls and
+downloads (see tracing.py); `report` summarizes the latest one. Task
+durations from recent traces also set per-stage deadlines: a task still
+running past its deadline is hedged with a duplicate submission, the first
+copy to finish wins and the other is canceled, within a per-run budget.
+
+A run ends by checking every model against its triangle, texture, size and
+material budgets and against its last accepted stats (see glb_inspect.py);
+a model that regressed fails the run. `inspect` runs the check alone.
+
+`generate --workers N` shards the requests across N processes by cache key,
+each on its own key from MESHY_API_KEYS (comma-separated) when set. Workers
+share the state file under a file lock and claim each request before working
+on it, so nothing is submitted or downloaded twice; the parent prints their
+merged progress.
+
+Entries with "variant_of" are never generated: they are derived offline from
+their base asset's model by rewriting its materials, and installed as a .tscn
+instancing the base's model so the geometry ships once (see glb_variant.py).
+Items keep pointing at the variant's old .glb until its scene is installed;
+then their references move to the scene and the replaced GLB is deleted.
+
+Requires requests and numpy; Pillow is optional (texture downscaling).
 """
 
+import argparse
+import hashlib
 import json
+import math
 import os
+import random
+import struct
+import subprocess
 import sys
+import threading
 import time
+import shutil
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from asset_refs import ReferenceIndex
+from glb_inspect import ModelIndex, check_models, format_inspect_report
+from glb_lod import LOD_SUFFIX, format_lod_report, generate_lods, strip_lods, write_passthrough_scene
+from glb_optimize import format_report, optimize_asset, texture_budget
+from glb_variant import (VariantError, derive_variant, format_scene_report, format_variant_report, install_variant,
+                         variant_key, variant_spec, write_variant_scene)
+from icon_bake import bake_icons
+from texture_atlas import AtlasError, atlas_group, build_atlases, format_atlas_report
+from tracing import Tracer, format_summary, latest_traces, load_events, summarize, task_durations
+
 API_KEY = os.environ.get("MESHY_API_KEY", "msy_aYUfjthg9Ag91m5r8qJSQ5QdwKiay7QDQaIw")
-BASE_URL = "https://api.meshy.ai/openapi/v2"
+BASE_URL = os.environ.get("MESHY_BASE_URL", "https://api.meshy.ai/openapi/v2")
 HEADERS = {
     "Authorization": f"Bearer {API_KEY}",
     "Content-Type": "application/json",
@@ -25,19 +83,99 @@ HEADERS = {
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 ASSETS_DIR = PROJECT_ROOT / "Assets"
 STATE_FILE = PROJECT_ROOT / "tools" / ".generation_state.json"
+JOURNAL_FILE = PROJECT_ROOT / "tools" / ".generation_state.journal"
+CACHE_DIR = PROJECT_ROOT / "tools" / ".cache" / "models"
+REFS_CACHE_FILE = PROJECT_ROOT / "tools" / ".cache" / "asset_refs.json"
+MODEL_INDEX_FILE = PROJECT_ROOT / "tools" / ".cache" / "glb_index.json"
+TEXTURE_EXTRACT_DIR = PROJECT_ROOT / "tools" / ".cache" / "textures"
+TRACE_DIR = PROJECT_ROOT / "tools" / ".cache" / "traces"
+CLAIMS_DIR = PROJECT_ROOT / "tools" / ".cache" / "claims"
+WORKER_STATUS_DIR = PROJECT_ROOT / "tools" / ".cache" / "workers"
+
+# Inventory icon atlas (relative to ASSETS_DIR) and the model dirs baked into it
+ICON_ATLAS = "Icons/item_icons.png"
+ICON_INDEX = "Icons/item_icons.json"
+ICON_CATEGORIES = ("Models/Items", "Models/Food", "Models/Weapons", "Models/Armor")
+
+# Shared texture atlas pages (relative to ASSETS_DIR)
+ATLAS_DIR = "Textures"
+
+# Fixed request settings; part of every cache key, so changing one regenerates
+PREVIEW_SETTINGS = {"art_style": "realistic", "topology": "triangle", "should_remesh": True}
+REFINE_SETTINGS = {"enable_pbr": True}
 
 POLL_INTERVAL = 10
-MAX_POLL_TIME = 600
+MAX_POLL_TIME = 600  # per task copy
+
+# Hedged resubmission: a task still unfinished past the HEDGE_PERCENTILE of its
+# stage's durations (for its category, from earlier runs' traces and this one)
+# gets one duplicate; the first copy to succeed wins and the other is canceled.
+# Duplicates are capped per run (--hedge-budget), as each one costs credits.
+HEDGE_PERCENTILE = 0.9
+HEDGE_MIN_SAMPLES = 8  # durations needed before a stage/category gets a deadline
+HEDGE_MIN_DEADLINE = 60  # seconds; never hedge a task sooner than this
+HEDGE_ASSET_FACTOR = 1.5  # an asset's deadline is at least this times its own median
+HEDGE_BUDGET_FRACTION = 0.1  # default budget: duplicates per unique request
+HEDGE_HISTORY_TRACES = 20  # most recent trace files durations are seeded from
+
+# Per-task poll spacing: poll again after a fraction of the task's remaining
+# ETA (estimated from its reported progress), clamped to these bounds
+POLL_MIN_INTERVAL = 3
+POLL_MAX_INTERVAL = 30
+POLL_ETA_FRACTION = 0.5
+
+# Shared token bucket for all API traffic, plus retry policy for 429/5xx
+API_RATE = 4.0  # requests per second
+API_BURST = 8
+API_MAX_RETRIES = 5
+API_BACKOFF_BASE = 2.0
+API_BACKOFF_MAX = 60.0
+
+# Keep-alive connection pool shared by API calls and downloads
+HTTP_POOL_SIZE = 32
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_ATTEMPTS = 4
+GLB_MAGIC = b"glTF"
+
+# Max tasks in flight per stage (an asset holds a slot from submit until done)
+PREVIEW_CONCURRENCY = 10
+REFINE_CONCURRENCY = 10
+DOWNLOAD_CONCURRENCY = 4
+OPTIMIZE_CONCURRENCY = os.cpu_count() or 2
+VERIFY_CONCURRENCY = 16  # parallel status checks when resuming stored tasks
+
+_print_lock = threading.Lock()
+
+_tracer = Tracer()  # replaced by a file-backed tracer for the duration of a generate run
+
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE))
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE))
+
+# Material variants (see glb_variant.py) are derived offline from a generated
+# base model instead of being generated themselves. Metal tiers recolor the
+# bronze texels of the bronze models, leaving grips and handles as they are.
+BRONZE = [0.70, 0.45, 0.22]
+METAL_TINTS = {
+    "iron": [0.52, 0.53, 0.55],
+    "steel": [0.74, 0.76, 0.80],
+    "rune": [0.30, 0.60, 0.74],
+}
+
+
+def metal_variant(base: str, metal: str) -> dict:
+    return {"variant_of": base, "material": {"match": BRONZE, "tint": METAL_TINTS[metal]}}
+
 
 ASSETS = [
     # Characters
     {"name": "player_character", "prompt": "Low-poly fantasy RPG player character, medieval adventurer, simple humanoid warrior, Old School RuneScape style, blocky proportions, standing idle pose, no weapons equipped, game-ready character model", "negative_prompt": "high detail, realistic, photorealistic, complex, smooth, modern clothing", "output_dir": "Models/Characters", "filename": "player_character.glb", "target_polycount": 8000},
     # Enemies
-    {"name": "goblin", "prompt": "Low-poly green goblin enemy, small humanoid creature, fantasy RPG style, Old School RuneScape aesthetic, blocky proportions, aggressive stance, pointy ears, game-ready enemy model", "negative_prompt": "high detail, realistic, photorealistic, smooth, complex", "output_dir": "Models/Enemies", "filename": "goblin.glb", "target_polycount": 5000},
-    {"name": "skeleton", "prompt": "Low-poly skeleton warrior enemy, undead bones humanoid, fantasy RPG style, Old School RuneScape aesthetic, blocky proportions, standing menacingly, game-ready enemy model", "negative_prompt": "high detail, realistic, photorealistic, smooth, muscles, skin", "output_dir": "Models/Enemies", "filename": "skeleton.glb", "target_polycount": 5000},
+    {"name": "goblin", "prompt": "Low-poly green goblin enemy, small humanoid creature, fantasy RPG style, Old School RuneScape aesthetic, blocky proportions, aggressive stance, pointy ears, game-ready enemy model", "negative_prompt": "high detail, realistic, photorealistic, smooth, complex", "output_dir": "Models/Enemies", "filename": "goblin.glb", "target_polycount": 5000, "lods": True},
+    {"name": "skeleton", "prompt": "Low-poly skeleton warrior enemy, undead bones humanoid, fantasy RPG style, Old School RuneScape aesthetic, blocky proportions, standing menacingly, game-ready enemy model", "negative_prompt": "high detail, realistic, photorealistic, smooth, muscles, skin", "output_dir": "Models/Enemies", "filename": "skeleton.glb", "target_polycount": 5000, "lods": True},
     # Weapons
     {"name": "bronze_sword", "prompt": "Low-poly bronze sword, medieval fantasy short sword, brownish-orange metal blade, simple crossguard and grip, Old School RuneScape style weapon, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ornate, complex handle, glowing", "output_dir": "Models/Weapons", "filename": "bronze_sword.glb", "target_polycount": 2000},
-    {"name": "iron_sword", "prompt": "Low-poly iron sword, medieval fantasy short sword, silver-grey metal blade, simple crossguard and grip, Old School RuneScape style weapon, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ornate, complex handle, glowing, golden", "output_dir": "Models/Weapons", "filename": "iron_sword.glb", "target_polycount": 2000},
+    {"name": "iron_sword", **metal_variant("bronze_sword", "iron"), "output_dir": "Models/Weapons", "filename": "iron_sword.tscn"},
     {"name": "bronze_axe", "prompt": "Low-poly bronze axe, medieval fantasy woodcutting axe, brownish-orange metal head with wooden handle, Old School RuneScape style tool weapon, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ornate, double-headed, glowing", "output_dir": "Models/Weapons", "filename": "bronze_axe.glb", "target_polycount": 2000},
     # Armor
     {"name": "bronze_platebody", "prompt": "Low-poly bronze platebody armor, medieval fantasy chest plate, brownish-orange metal torso armor, Old School RuneScape style, game item equipment, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ornate, complex engravings, glowing", "output_dir": "Models/Armor", "filename": "bronze_platebody.glb", "target_polycount": 3000},
@@ -47,24 +185,24 @@ ASSETS = [
     {"name": "cooked_shrimps", "prompt": "Low-poly cooked shrimps, small orange-pink prawns, Old School RuneScape style food item, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, raw, complex, restaurant", "output_dir": "Models/Food", "filename": "cooked_shrimps.glb", "target_polycount": 1500},
     # Items / Resources
     {"name": "logs", "prompt": "Low-poly wooden logs, stack of two simple brown wood logs, Old School RuneScape style resource item, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, complex bark, forest, trees", "output_dir": "Models/Items", "filename": "logs.glb", "target_polycount": 1500},
-    {"name": "oak_logs", "prompt": "Low-poly oak logs, stack of darker brown wood logs, slightly larger than normal logs, Old School RuneScape style resource item, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, complex bark, forest, leaves", "output_dir": "Models/Items", "filename": "oak_logs.glb", "target_polycount": 1500},
-    {"name": "raw_shrimps", "prompt": "Low-poly raw shrimps, small grey-pink uncooked prawns, Old School RuneScape style resource item, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, cooked, complex, restaurant", "output_dir": "Models/Items", "filename": "raw_shrimps.glb", "target_polycount": 1500},
+    {"name": "oak_logs", "variant_of": "logs", "material": {"base_color": [0.72, 0.62, 0.52, 1.0]}, "output_dir": "Models/Items", "filename": "oak_logs.tscn"},
+    {"name": "raw_shrimps", "variant_of": "cooked_shrimps", "material": {"match": [0.93, 0.52, 0.36], "tolerance": 0.2, "tint": [0.78, 0.64, 0.64]}, "output_dir": "Models/Items", "filename": "raw_shrimps.tscn"},
     {"name": "copper_ore", "prompt": "Low-poly copper ore chunk, brownish-orange rough rock with metallic veins, Old School RuneScape style mining resource, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, smooth, crystal, gem", "output_dir": "Models/Items", "filename": "copper_ore.glb", "target_polycount": 1500},
     {"name": "bones", "prompt": "Low-poly bones, simple white-beige skeletal remains, two crossed bones, Old School RuneScape style drop item, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, skeleton, complex, skull", "output_dir": "Models/Items", "filename": "bones.glb", "target_polycount": 1000},
     {"name": "coins", "prompt": "Low-poly gold coins, small stack of shiny yellow gold coins, Old School RuneScape style currency, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, complex engravings, treasure chest", "output_dir": "Models/Items", "filename": "coins.glb", "target_polycount": 1500},
     # World / Environment
-    {"name": "tree_normal", "prompt": "Low-poly fantasy tree, simple green canopy with brown trunk, Old School RuneScape style game environment object, deciduous tree, game-ready, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, complex leaves, autumn, dead", "output_dir": "Models/World", "filename": "tree_normal.glb", "target_polycount": 4000},
-    {"name": "tree_oak", "prompt": "Low-poly large oak tree, wider green canopy with thick brown trunk, Old School RuneScape style game environment, big deciduous tree, game-ready, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, complex leaves, autumn, dead, thin", "output_dir": "Models/World", "filename": "tree_oak.glb", "target_polycount": 5000},
-    {"name": "rock_copper", "prompt": "Low-poly copper mining rock, brownish-orange rocky formation with visible ore veins, Old School RuneScape style mining node, game environment, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, smooth, crystal, gem, complex", "output_dir": "Models/World", "filename": "rock_copper.glb", "target_polycount": 3000},
-    {"name": "fishing_spot", "prompt": "Low-poly small circular pond with water ripples, fishing spot water feature, Old School RuneScape style, game environment, blue water surface, small rocks around edges, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ocean, complex, waterfall", "output_dir": "Models/World", "filename": "fishing_spot.glb", "target_polycount": 2000},
+    {"name": "tree_normal", "prompt": "Low-poly fantasy tree, simple green canopy with brown trunk, Old School RuneScape style game environment object, deciduous tree, game-ready, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, complex leaves, autumn, dead", "output_dir": "Models/World", "filename": "tree_normal.glb", "target_polycount": 4000, "lods": True},
+    {"name": "tree_oak", "prompt": "Low-poly large oak tree, wider green canopy with thick brown trunk, Old School RuneScape style game environment, big deciduous tree, game-ready, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, complex leaves, autumn, dead, thin", "output_dir": "Models/World", "filename": "tree_oak.glb", "target_polycount": 5000, "lods": True},
+    {"name": "rock_copper", "prompt": "Low-poly copper mining rock, brownish-orange rocky formation with visible ore veins, Old School RuneScape style mining node, game environment, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, smooth, crystal, gem, complex", "output_dir": "Models/World", "filename": "rock_copper.glb", "target_polycount": 3000, "lods": True},
+    {"name": "fishing_spot", "prompt": "Low-poly small circular pond with water ripples, fishing spot water feature, Old School RuneScape style, game environment, blue water surface, small rocks around edges, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ocean, complex, waterfall", "output_dir": "Models/World", "filename": "fishing_spot.glb", "target_polycount": 2000, "lods": True},
     {"name": "rock_depleted", "prompt": "Low-poly depleted grey rock, empty mining rock with no ore, dark grey rocky formation, Old School RuneScape style, game environment, mined out rock, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, colorful, ore veins, crystal", "output_dir": "Models/World", "filename": "rock_depleted.glb", "target_polycount": 2000},
     {"name": "tree_stump", "prompt": "Low-poly tree stump, cut brown wooden stump left after chopping a tree, Old School RuneScape style, game environment, small flat stump, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, complex roots, mushrooms, moss", "output_dir": "Models/World", "filename": "tree_stump.glb", "target_polycount": 1500},
 
     # ── BATCH 2: Additional Weapons ──
-    {"name": "steel_sword", "prompt": "Low-poly steel sword, medieval fantasy short sword, bright silvery metal blade, simple crossguard and leather grip, Old School RuneScape style weapon, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ornate, glowing, magical", "output_dir": "Models/Weapons", "filename": "steel_sword.glb", "target_polycount": 2000},
-    {"name": "rune_sword", "prompt": "Low-poly rune sword, medieval fantasy short sword, cyan-blue tinted metal blade, simple crossguard, Old School RuneScape style weapon, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ornate, glowing effects, complex", "output_dir": "Models/Weapons", "filename": "rune_sword.glb", "target_polycount": 2000},
-    {"name": "iron_axe", "prompt": "Low-poly iron axe, medieval fantasy woodcutting axe, silver-grey metal head with wooden handle, Old School RuneScape style tool weapon, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ornate, double-headed, glowing", "output_dir": "Models/Weapons", "filename": "iron_axe.glb", "target_polycount": 2000},
-    {"name": "steel_axe", "prompt": "Low-poly steel axe, medieval fantasy woodcutting axe, bright silvery metal head with wooden handle, Old School RuneScape style tool weapon, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ornate, double-headed, magical", "output_dir": "Models/Weapons", "filename": "steel_axe.glb", "target_polycount": 2000},
+    {"name": "steel_sword", **metal_variant("bronze_sword", "steel"), "output_dir": "Models/Weapons", "filename": "steel_sword.tscn"},
+    {"name": "rune_sword", **metal_variant("bronze_sword", "rune"), "output_dir": "Models/Weapons", "filename": "rune_sword.tscn"},
+    {"name": "iron_axe", **metal_variant("bronze_axe", "iron"), "output_dir": "Models/Weapons", "filename": "iron_axe.tscn"},
+    {"name": "steel_axe", **metal_variant("bronze_axe", "steel"), "output_dir": "Models/Weapons", "filename": "steel_axe.tscn"},
     {"name": "iron_dagger", "prompt": "Low-poly iron dagger, short stabbing knife, silver-grey metal blade with small grip, Old School RuneScape style weapon, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ornate, curved, magical", "output_dir": "Models/Weapons", "filename": "iron_dagger.glb", "target_polycount": 1500},
     {"name": "iron_mace", "prompt": "Low-poly iron mace, medieval fantasy flanged mace, silver-grey metal head with wooden handle, Old School RuneScape style weapon, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ornate, spiked ball, magical", "output_dir": "Models/Weapons", "filename": "iron_mace.glb", "target_polycount": 2000},
     {"name": "wooden_shield", "prompt": "Low-poly wooden shield, round medieval shield made of brown wood planks with metal rim, Old School RuneScape style, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ornate, heraldry, glowing", "output_dir": "Models/Weapons", "filename": "wooden_shield.glb", "target_polycount": 2000},
@@ -74,14 +212,14 @@ ASSETS = [
     {"name": "staff", "prompt": "Low-poly wooden magic staff, long brown wooden rod with simple blue crystal on top, Old School RuneScape style magic weapon, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ornate, complex runes, particle effects", "output_dir": "Models/Weapons", "filename": "staff.glb", "target_polycount": 2000},
 
     # ── BATCH 2: Additional Armor ──
-    {"name": "iron_platebody", "prompt": "Low-poly iron platebody armor, medieval fantasy chest plate, silver-grey metal torso armor, Old School RuneScape style, game item equipment, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ornate, complex engravings, glowing", "output_dir": "Models/Armor", "filename": "iron_platebody.glb", "target_polycount": 3000},
-    {"name": "iron_med_helm", "prompt": "Low-poly iron medium helmet, medieval fantasy half-face helm, silver-grey metal, Old School RuneScape style, game item headgear, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ornate, full face cover, visor", "output_dir": "Models/Armor", "filename": "iron_med_helm.glb", "target_polycount": 2000},
-    {"name": "steel_platebody", "prompt": "Low-poly steel platebody armor, medieval fantasy chest plate, bright silvery metal torso armor, Old School RuneScape style, game item equipment, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ornate, complex engravings, glowing", "output_dir": "Models/Armor", "filename": "steel_platebody.glb", "target_polycount": 3000},
-    {"name": "steel_med_helm", "prompt": "Low-poly steel medium helmet, medieval fantasy half-face helm, bright silvery metal, Old School RuneScape style, game item headgear, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ornate, full face cover, complex", "output_dir": "Models/Armor", "filename": "steel_med_helm.glb", "target_polycount": 2000},
+    {"name": "iron_platebody", **metal_variant("bronze_platebody", "iron"), "output_dir": "Models/Armor", "filename": "iron_platebody.tscn"},
+    {"name": "iron_med_helm", **metal_variant("bronze_med_helm", "iron"), "output_dir": "Models/Armor", "filename": "iron_med_helm.tscn"},
+    {"name": "steel_platebody", **metal_variant("bronze_platebody", "steel"), "output_dir": "Models/Armor", "filename": "steel_platebody.tscn"},
+    {"name": "steel_med_helm", **metal_variant("bronze_med_helm", "steel"), "output_dir": "Models/Armor", "filename": "steel_med_helm.tscn"},
     {"name": "leather_body", "prompt": "Low-poly leather body armor, simple brown leather torso vest, Old School RuneScape style, game item equipment, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ornate, metal, plate armor", "output_dir": "Models/Armor", "filename": "leather_body.glb", "target_polycount": 2500},
     {"name": "leather_chaps", "prompt": "Low-poly leather chaps, simple brown leather leg armor, Old School RuneScape style, game item equipment, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ornate, metal, plate armor", "output_dir": "Models/Armor", "filename": "leather_chaps.glb", "target_polycount": 2500},
     {"name": "bronze_platelegs", "prompt": "Low-poly bronze platelegs, medieval fantasy leg armor, brownish-orange metal greaves, Old School RuneScape style, game item equipment, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ornate, complex engravings", "output_dir": "Models/Armor", "filename": "bronze_platelegs.glb", "target_polycount": 3000},
-    {"name": "iron_platelegs", "prompt": "Low-poly iron platelegs, medieval fantasy leg armor, silver-grey metal greaves, Old School RuneScape style, game item equipment, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, ornate, complex engravings", "output_dir": "Models/Armor", "filename": "iron_platelegs.glb", "target_polycount": 3000},
+    {"name": "iron_platelegs", **metal_variant("bronze_platelegs", "iron"), "output_dir": "Models/Armor", "filename": "iron_platelegs.tscn"},
 
     # ── BATCH 2: Additional Enemies ──
     {"name": "giant_rat", "prompt": "Low-poly giant rat enemy, oversized brown rat creature, fantasy RPG style, Old School RuneScape aesthetic, blocky proportions, aggressive stance, game-ready enemy model", "negative_prompt": "high detail, realistic, photorealistic, smooth, cute, cartoon", "output_dir": "Models/Enemies", "filename": "giant_rat.glb", "target_polycount": 4000},
@@ -99,7 +237,7 @@ ASSETS = [
     {"name": "coal", "prompt": "Low-poly coal ore chunk, dark black rough rock, Old School RuneScape style mining resource, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, smooth, shiny, diamond", "output_dir": "Models/Items", "filename": "coal.glb", "target_polycount": 1000},
     {"name": "tin_ore", "prompt": "Low-poly tin ore chunk, light grey rough rock with silver veins, Old School RuneScape style mining resource, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, smooth, crystal, gem", "output_dir": "Models/Items", "filename": "tin_ore.glb", "target_polycount": 1500},
     {"name": "bronze_bar", "prompt": "Low-poly bronze bar, flat rectangular brownish-orange metal ingot, Old School RuneScape style crafting resource, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, smooth, complex shape, decorated", "output_dir": "Models/Items", "filename": "bronze_bar.glb", "target_polycount": 1000},
-    {"name": "iron_bar", "prompt": "Low-poly iron bar, flat rectangular silver-grey metal ingot, Old School RuneScape style crafting resource, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, smooth, complex shape, decorated", "output_dir": "Models/Items", "filename": "iron_bar.glb", "target_polycount": 1000},
+    {"name": "iron_bar", **metal_variant("bronze_bar", "iron"), "output_dir": "Models/Items", "filename": "iron_bar.tscn"},
     {"name": "feather", "prompt": "Low-poly feather, single white bird feather, Old School RuneScape style item, simple game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, complex, quill pen, colorful", "output_dir": "Models/Items", "filename": "feather.glb", "target_polycount": 800},
     {"name": "raw_chicken", "prompt": "Low-poly raw chicken, uncooked pink chicken carcass, Old School RuneScape style resource item, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, cooked, brown, complex", "output_dir": "Models/Items", "filename": "raw_chicken.glb", "target_polycount": 1500},
     {"name": "cowhide", "prompt": "Low-poly cowhide, flat brown and white animal hide, Old School RuneScape style crafting resource, game item, isolated on blank background", "negative_prompt": "high detail, realistic, photorealistic, complex, fur, 3D animal", "output_dir": "Models/Items", "filename": "cowhide.glb", "target_polycount": 1000},
@@ -134,62 +272,586 @@ ASSETS = [
 ]
 
 
+def log(message: str):
+    with _print_lock:
+        print(message)
+        sys.stdout.flush()
+
+
+class FileLock:
+    """Exclusive lock on a file, shared by this process's threads and across processes.
+
+    Re-entrant within a process. Uses flock (msvcrt.locking on Windows), so the
+    OS drops it if the holder dies. path may be a callable, resolved on acquire.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if not self._thread_lock.acquire(blocking):
+            return False
+        if self._depth == 0:
+            path = Path(self.path() if callable(self.path) else self.path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            f = open(path, "a+b")
+            if not _lock_file(f, blocking):
+                f.close()
+                self._thread_lock.release()
+                return False
+            self._file = f
+        self._depth += 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            _unlock_file(self._file)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def _lock_file(f, blocking: bool) -> bool:
+    if fcntl is not None:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return False
+        return True
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.05)
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# Held around every read-modify-write of STATE_FILE and JOURNAL_FILE
+_state_lock = FileLock(lambda: STATE_FILE.with_suffix(".lock"))
+
+
 def load_state() -> dict:
+    """Load generation state.
+
+    state["cache"] maps a request hash (see cache_key) to the Meshy task IDs and
+    the raw downloaded GLB for that exact request; state["assets"] maps each
+    asset name to the cache key currently installed in Assets/. Older name-keyed
+    state is adopted under each asset's current key.
+    """
+    with _state_lock:
+        state = _load_snapshot()
+        for record in _read_journal()[0]:
+            apply_record(state, record)
+    return state
+
+
+def _load_snapshot() -> dict:
+    state = {}
     if STATE_FILE.exists():
         with open(STATE_FILE) as f:
-            return json.load(f)
-    return {"completed": [], "preview_tasks": {}, "refine_tasks": {}}
+            state = json.load(f)
+    state.setdefault("cache", {})
+    state.setdefault("assets", {})
+    if any(k in state for k in ("completed", "preview_tasks", "refine_tasks")):
+        _migrate_legacy_state(state)
+    return state
+
+
+def _snapshot_id() -> tuple | None:
+    """Identity of the current STATE_FILE; changes whenever any process rewrites it."""
+    try:
+        st = STATE_FILE.stat()
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _migrate_legacy_state(state: dict):
+    completed = set(state.pop("completed", []))
+    preview_tasks = state.pop("preview_tasks", {})
+    refine_tasks = state.pop("refine_tasks", {})
+    for asset in ASSETS:
+        name = asset["name"]
+        if "variant_of" in asset or (name not in preview_tasks and name not in completed):
+            continue
+        key = cache_key(asset)
+        entry = state["cache"].setdefault(key, {"name": name})
+        if name in preview_tasks:
+            entry.setdefault("preview_task", preview_tasks[name])
+        if name in refine_tasks:
+            entry.setdefault("refine_task", refine_tasks[name])
+        if name in completed:
+            state["assets"].setdefault(name, key)
 
 
 def save_state(state: dict):
-    with open(STATE_FILE, "w") as f:
+    """Write a full snapshot atomically, then drop the journal it now covers.
+
+    Replaying records is idempotent, so a crash between the two steps is safe.
+    """
+    tmp_path = STATE_FILE.with_name(STATE_FILE.name + ".tmp")
+    with open(tmp_path, "w") as f:
         json.dump(state, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, STATE_FILE)
+    _fsync_dir(STATE_FILE.parent)
+    JOURNAL_FILE.unlink(missing_ok=True)
 
 
-def create_preview(asset: dict) -> str | None:
-    payload = {
+def _fsync_dir(path: Path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def apply_record(state: dict, record: dict):
+    """Apply one journal record to state.
+
+    Records: {"op": "entry", "key", "name", "fields"} sets (or, for None,
+    removes) fields of a cache entry; {"op": "install", "name", "key"} marks a
+    key as installed for an asset; {"op": "evict", "key"} drops an entry.
+    """
+    op = record.get("op")
+    if op == "entry":
+        entry = state["cache"].setdefault(record["key"], {"name": record["name"]})
+        for field, value in record["fields"].items():
+            if value is None:
+                entry.pop(field, None)
+            else:
+                entry[field] = value
+    elif op == "install":
+        state["assets"][record["name"]] = record["key"]
+    elif op == "evict":
+        state["cache"].pop(record["key"], None)
+
+
+def _read_journal(offset: int = 0) -> tuple[list[dict], int]:
+    """Records from byte offset on, and the offset just past the last complete line."""
+    try:
+        with open(JOURNAL_FILE, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], 0
+    records = []
+    end = data.rfind(b"\n") + 1  # a torn final write has no newline yet
+    for line in data[:end].splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue  # torn write of a crashed process; appends after it are intact
+    return records, offset + end
+
+
+class StateJournal:
+    """Append-only, fsync'd log of state transitions on top of the STATE_FILE snapshot.
+
+    Every record is durable before record() returns, so a crash mid-run loses
+    nothing; compact() folds the journal back into a fresh snapshot.
+
+    Several processes can share the state (see --workers): every append and
+    compaction runs under the state lock, after first applying whatever other
+    processes appended (or compacted) since this one last looked.
+    """
+
+    def __init__(self):
+        self.state = {}
+        self._snapshot = None
+        self._offset = 0
+        with _state_lock:
+            self._reload()
+
+    def _reload(self):
+        fresh = _load_snapshot()
+        self._snapshot = _snapshot_id()
+        records, self._offset = _read_journal()
+        for record in records:
+            apply_record(fresh, record)
+        # Swap top-level values in place: pipeline threads hold on to self.state
+        for key in set(self.state) - set(fresh):
+            del self.state[key]
+        self.state.update(fresh)
+
+    def refresh(self):
+        """Apply what other processes recorded since the last look."""
+        with _state_lock:
+            if _snapshot_id() != self._snapshot:
+                self._reload()
+                return
+            records, self._offset = _read_journal(self._offset)
+            for record in records:
+                apply_record(self.state, record)
+
+    def record(self, **record):
+        with _state_lock:
+            self.refresh()
+            apply_record(self.state, record)
+            with open(JOURNAL_FILE, "ab+") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell():
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")  # don't glue onto a crashed writer's torn line
+                f.write(json.dumps(record, separators=(",", ":")).encode() + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+                self._offset = f.tell()
+
+    def update_entry(self, key: str, name: str, **fields):
+        self.record(op="entry", key=key, name=name, fields={**fields, "updated": int(time.time())})
+
+    def compact(self):
+        with _state_lock:
+            self.refresh()
+            save_state(self.state)
+            self._snapshot = _snapshot_id()
+            self._offset = 0
+
+    def close(self):
+        self.compact()
+
+
+def build_preview_payload(asset: dict) -> dict:
+    return {
         "mode": "preview",
         "prompt": asset["prompt"],
         "negative_prompt": asset.get("negative_prompt", ""),
-        "art_style": "realistic",
         "target_polycount": asset.get("target_polycount", 5000),
-        "topology": "triangle",
-        "should_remesh": True,
+        **PREVIEW_SETTINGS,
     }
+
+
+def build_refine_payload(preview_id: str) -> dict:
+    return {"mode": "refine", "preview_task_id": preview_id, **REFINE_SETTINGS}
+
+
+def cache_key(asset: dict) -> str:
+    """Hash of everything sent to Meshy for this asset: the preview payload plus refine settings."""
+    request = {"preview": build_preview_payload(asset), "refine": REFINE_SETTINGS}
+    blob = json.dumps(request, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def variant_base(asset: dict) -> dict | None:
+    """The ASSETS entry a variant derives from; None for generated assets."""
+    base_name = asset.get("variant_of")
+    if base_name is None:
+        return None
+    for base in ASSETS:
+        if base["name"] == base_name:
+            if "variant_of" in base:
+                raise VariantError(f"{asset['name']}: base {base_name} is itself a variant")
+            return base
+    raise VariantError(f"{asset['name']}: variant_of names unknown asset {base_name!r}")
+
+
+def resolved_asset(asset: dict) -> dict:
+    """A variant with its base's optimize settings (polycount, texture budget, ...) filled in."""
+    base = variant_base(asset)
+    return asset if base is None else {**base, **asset}
+
+
+def asset_key(asset: dict) -> str:
+    """Cache key of any ASSETS entry: its request hash, or for a variant its base's plus the material spec."""
+    base = variant_base(asset)
+    return cache_key(asset) if base is None else variant_key(cache_key(base), variant_spec(asset))
+
+
+def derive_model(journal: "StateJournal", asset: dict, base_key: str) -> Path | None:
+    """Derive a variant's raw model from its base's cached one into the cache. None if that failed."""
+    base_cached = cached_model(journal.state, base_key)
+    if base_cached is None:
+        return None
+    key = asset_key(asset)
+    cache_path = CACHE_DIR / f"{key}.glb"
+    tmp_path = cache_path.with_name(cache_path.name + ".part")
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
     try:
-        resp = requests.post(f"{BASE_URL}/text-to-3d", headers=HEADERS, json=payload, timeout=30)
+        with _tracer.span("variant", target=asset["name"]):
+            report = derive_variant(base_cached, tmp_path, variant_spec(asset))
+    except Exception as e:
+        log(f"  [variant] {asset['name']}: FAILED ({e})")
+        return None
+    os.replace(tmp_path, cache_path)
+    journal.update_entry(key, asset["name"], glb=cache_path.name, source="variant", base=base_key)
+    log(format_variant_report(asset["name"], asset["variant_of"], report))
+    return cache_path
+
+
+def cached_model(state: dict, key: str) -> Path | None:
+    entry = state["cache"].get(key)
+    if not entry or not entry.get("glb"):
+        return None
+    path = CACHE_DIR / entry["glb"]
+    return path if is_valid_glb(path) else None
+
+
+def request_claim(key: str) -> FileLock:
+    """Per-request lock a process holds while generating or installing that request.
+
+    Held through the OS, so a crashed worker's claims free themselves. The
+    lock files are never deleted (deleting a lock file races with its next user).
+    """
+    return FileLock(CLAIMS_DIR / f"{key}.lock")
+
+
+def in_shard(key: str, shard: tuple[int, int] | None) -> bool:
+    """Whether a cache key belongs to shard (index, count). Stable across runs and processes."""
+    if shard is None:
+        return True
+    index, count = shard
+    return int(key[:16], 16) % count == index
+
+
+class RateLimiter:
+    """Token bucket shared by every API request.
+
+    On 429/5xx the whole bucket pauses (for Retry-After when the server sends
+    one) and the refill rate is halved; it creeps back up on each success.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def back_off(self, delay: float):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            self.rate = max(self.max_rate / 16, self.rate / 2)
+            self.tokens = 0.0
+
+    def succeeded(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate * 1.1)
+
+
+_limiter = RateLimiter(API_RATE, API_BURST)
+
+
+class HedgePolicy:
+    """Per-asset, per-stage deadlines for hedging slow tasks, and the budget of duplicates.
+
+    A deadline is the HEDGE_PERCENTILE of the server-side durations (created to
+    finished) of the stage's tasks in the asset's category, or in every
+    category while that has too few samples. Tasks still running count as
+    slower than any finished one, so early in a run, when only the fast tasks
+    are done, there is no deadline yet. It is never less than
+    HEDGE_ASSET_FACTOR times the asset's own median, so an asset that is always
+    slow is not hedged every run, nor than HEDGE_MIN_DEADLINE.
+    """
+
+    def __init__(self, budget: int, history: list[tuple[str, str, str, float]] = ()):
+        self.budget = budget
+        self.spent = 0
+        self.samples = {}  # (stage, category or None) -> seconds
+        self.by_asset = {}  # (stage, asset name) -> seconds
+        self.running = {}  # (stage, category or None) -> tasks being waited on
+        self.lock = threading.Lock()
+        for stage, name, category, seconds in history:
+            self.observe(stage, name, category, seconds)
+
+    def observe(self, stage: str, name: str, category: str, seconds: float):
+        with self.lock:
+            for key in ((stage, category), (stage, None)):
+                self.samples.setdefault(key, []).append(seconds)
+            self.by_asset.setdefault((stage, name), []).append(seconds)
+
+    @contextmanager
+    def waiting(self, stage: str, asset: dict):
+        """Count a task as running for the block."""
+        keys = ((stage, asset["output_dir"]), (stage, None))
+        with self.lock:
+            for key in keys:
+                self.running[key] = self.running.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                for key in keys:
+                    self.running[key] -= 1
+
+    def deadline(self, stage: str, asset: dict) -> float | None:
+        """Seconds after which a task of this stage for asset is hedged, or None (not now)."""
+        with self.lock:
+            if self.spent >= self.budget:
+                return None
+            key = (stage, asset["output_dir"])
+            if len(self.samples.get(key, [])) < HEDGE_MIN_SAMPLES:
+                key = (stage, None)
+            samples = sorted(self.samples.get(key, []))
+            if len(samples) < HEDGE_MIN_SAMPLES:
+                return None
+            rank = math.ceil(HEDGE_PERCENTILE * (len(samples) + self.running.get(key, 0))) - 1
+            if rank >= len(samples):
+                return None  # the percentile is among the tasks still running
+            deadline = samples[rank]
+            own = self.by_asset.get((stage, asset["name"]))
+            if own:
+                deadline = max(deadline, HEDGE_ASSET_FACTOR * sorted(own)[len(own) // 2])
+        deadline = max(deadline, HEDGE_MIN_DEADLINE)
+        return deadline if deadline < MAX_POLL_TIME else None
+
+    def spend(self) -> bool:
+        with self.lock:
+            if self.spent >= self.budget:
+                return False
+            self.spent += 1
+            return True
+
+    def refund(self):
+        with self.lock:
+            self.spent -= 1
+
+
+def hedge_history() -> list[tuple[str, str, str, float]]:
+    """Task durations from the most recent traces, excluding the one this run is writing."""
+    if not TRACE_DIR.is_dir():
+        return []
+    paths = [path for path in sorted(TRACE_DIR.glob("*.jsonl")) if path != _tracer.path]
+    history = []
+    for path in paths[-HEDGE_HISTORY_TRACES:]:
+        history += task_durations(load_events(path))
+    return history
+
+
+def retry_after(resp: requests.Response) -> float | None:
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, when.timestamp() - time.time())
+
+
+def api_request(method: str, url: str, **kwargs) -> requests.Response:
+    """Send a Meshy API request through the shared rate limiter.
+
+    Retries 429/5xx responses and connection errors with exponential backoff,
+    honoring Retry-After. The last response (or exception) is passed through.
+    """
+    kwargs.setdefault("headers", HEADERS)
+    kwargs.setdefault("timeout", 30)
+    endpoint = {"POST": "create", "DELETE": "cancel"}.get(method, "status")
+    attempt = 0
+    while True:
+        _limiter.acquire()
+        started = time.time()
+        try:
+            resp = _session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt >= API_MAX_RETRIES:
+                _tracer.emit("http", method=method, endpoint=endpoint, error=type(e).__name__,
+                             seconds=time.time() - started, attempt=attempt)
+                raise
+            status, delay = None, None
+        else:
+            status = resp.status_code
+            if status != 429 and status < 500:
+                _limiter.succeeded()
+                _tracer.emit("http", method=method, endpoint=endpoint, status=status,
+                             seconds=time.time() - started, attempt=attempt)
+                return resp
+            if attempt >= API_MAX_RETRIES:
+                _tracer.emit("http", method=method, endpoint=endpoint, status=status,
+                             seconds=time.time() - started, attempt=attempt)
+                return resp
+            delay = retry_after(resp)
+        if delay is None:
+            delay = min(API_BACKOFF_MAX, API_BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.0)
+        _tracer.emit("http", method=method, endpoint=endpoint, status=status,
+                     error=None if status else "connection", seconds=time.time() - started,
+                     attempt=attempt, retry_in=delay)
+        _limiter.back_off(delay)
+        attempt += 1
+
+
+def create_preview(asset: dict) -> str | None:
+    payload = build_preview_payload(asset)
+    try:
+        resp = api_request("POST", f"{BASE_URL}/text-to-3d", json=payload)
         if resp.status_code in (200, 202):
             task_id = resp.json().get("result")
             return task_id
         else:
-            print(f"    ERROR: {resp.status_code} - {resp.text[:200]}")
+            log(f"    ERROR: {resp.status_code} - {resp.text[:200]}")
             return None
     except Exception as e:
-        print(f"    ERROR: {e}")
+        log(f"    ERROR: {e}")
         return None
 
 
 def create_refine(preview_id: str) -> str | None:
-    payload = {
-        "mode": "refine",
-        "preview_task_id": preview_id,
-        "enable_pbr": True,
-    }
+    payload = build_refine_payload(preview_id)
     try:
-        resp = requests.post(f"{BASE_URL}/text-to-3d", headers=HEADERS, json=payload, timeout=30)
+        resp = api_request("POST", f"{BASE_URL}/text-to-3d", json=payload)
         if resp.status_code in (200, 202):
             return resp.json().get("result")
         else:
-            print(f"    ERROR: {resp.status_code} - {resp.text[:200]}")
+            log(f"    ERROR: {resp.status_code} - {resp.text[:200]}")
             return None
     except Exception as e:
-        print(f"    ERROR: {e}")
+        log(f"    ERROR: {e}")
         return None
 
 
 def check_task(task_id: str) -> dict:
     try:
-        resp = requests.get(f"{BASE_URL}/text-to-3d/{task_id}", headers=HEADERS, timeout=30)
+        resp = api_request("GET", f"{BASE_URL}/text-to-3d/{task_id}")
         if resp.status_code == 200:
             return resp.json()
         return {"status": "ERROR", "task_error": resp.text[:200]}
@@ -197,211 +859,1322 @@ def check_task(task_id: str) -> dict:
         return {"status": "ERROR", "task_error": str(e)}
 
 
-def poll_batch(task_map: dict[str, str], stage: str) -> dict[str, dict]:
-    """Poll all tasks in a batch until they all complete. Returns {name: task_data}."""
-    results = {}
-    pending = dict(task_map)  # name -> task_id
-    start = time.time()
-
-    while pending and (time.time() - start) < MAX_POLL_TIME:
-        done_names = []
-        for name, task_id in pending.items():
-            data = check_task(task_id)
-            status = data.get("status", "UNKNOWN")
-            progress = data.get("progress", 0)
-
-            if status == "SUCCEEDED":
-                results[name] = data
-                done_names.append(name)
-                print(f"  [{stage}] {name}: DONE")
-            elif status in ("FAILED", "CANCELED", "EXPIRED"):
-                results[name] = None
-                done_names.append(name)
-                print(f"  [{stage}] {name}: {status} - {data.get('task_error', '')}")
-            else:
-                pass  # still running
+def cancel_task(task_id: str) -> bool:
+    """Delete a task Meshy is still working on, so it stops (a hedged task's losing copy)."""
+    try:
+        resp = api_request("DELETE", f"{BASE_URL}/text-to-3d/{task_id}")
+        return resp.status_code in (200, 204, 404)
+    except Exception:
+        return False
+
+
+def next_poll_delay(data: dict, running_for: float) -> float:
+    """Seconds until a task is worth polling again, based on its reported progress.
+
+    Queued tasks and tasks with no progress yet are polled at POLL_INTERVAL;
+    running tasks are polled after a fraction of their estimated remaining time.
+    """
+    progress = data.get("progress") or 0
+    if data.get("status") == "IN_PROGRESS" and 0 < progress < 100 and running_for > 0:
+        eta = running_for * (100 - progress) / progress
+        delay = eta * POLL_ETA_FRACTION
+    else:
+        delay = POLL_INTERVAL
+    delay = min(POLL_MAX_INTERVAL, max(POLL_MIN_INTERVAL, delay))
+    return delay * random.uniform(0.9, 1.1)
 
-        for n in done_names:
-            del pending[n]
 
-        if pending:
-            remaining = [f"{n}({check_task(tid).get('progress', '?')}%)" for n, tid in list(pending.items())[:5]]
-            extra = f" +{len(pending) - 5} more" if len(pending) > 5 else ""
-            print(f"  [{stage}] Waiting: {', '.join(remaining)}{extra}")
-            time.sleep(POLL_INTERVAL)
+def wait_for_task(task_id: str, stage: str, name: str, progress: dict,
+                  deadline=None, resubmit=None, duplicate: str | None = None) -> dict | None:
+    """Poll a single task until it finishes. Returns the task data, or None on failure/timeout.
 
-    # Mark remaining as failed
-    for name in pending:
-        results[name] = None
-        print(f"  [{stage}] {name}: TIMEOUT")
+    The status fetched on each poll is also what the progress report shows, so
+    there is exactly one GET per poll. A task still unfinished deadline()
+    seconds in (asked again after every poll; None means no deadline yet) is
+    hedged once: resubmit() submits a duplicate (or returns None), both
+    copies are polled, the first to succeed is returned - its "id" tells which
+    - and the other is canceled. Each copy times out MAX_POLL_TIME after it was
+    submitted and is then canceled too. duplicate is a hedge submitted by an
+    earlier, interrupted run, raced from the start.
+    """
+    with _tracer.span("task", stage=stage, task_id=task_id) as span:
+        start = time.time()
+        copies = {task_id: {"start": start, "running_since": None, "next_poll": start}}
+        polls = 0
+        hedged = deadline is None or resubmit is None or duplicate is not None
+        if duplicate:
+            copies[duplicate] = {"start": start, "running_since": None, "next_poll": start}
+            span["hedge_task_id"] = duplicate
+        limit = None
+        outcome, timing = "TIMEOUT", {}
+        try:
+            while copies:
+                copy_id = min(copies, key=lambda c: copies[c]["next_poll"])
+                copy = copies[copy_id]
+                wake = copy["next_poll"] if limit is None else min(copy["next_poll"], start + limit)
+                if wake > time.time():
+                    time.sleep(wake - time.time())
+                    continue
 
-    return results
+                if limit is not None and time.time() - start >= limit:
+                    hedged = True  # one attempt per task, even if the budget refuses it
+                    duplicate = resubmit()
+                    if duplicate:
+                        now = time.time()
+                        copies[duplicate] = {"start": now, "running_since": None, "next_poll": now}
+                        span["hedge_task_id"] = duplicate
+                        log(f"  [{stage}] {name}: still running after {limit:.0f}s, hedging with {duplicate}")
+                    limit = None
+                    continue
+
+                data = check_task(copy_id)
+                polls += 1
+                status = data.get("status", "UNKNOWN")
+
+                if status in ("SUCCEEDED", "FAILED", "CANCELED", "EXPIRED"):
+                    del copies[copy_id]
+                    if status == "SUCCEEDED":
+                        progress.pop(name, None)
+                        winner = "duplicate" if copy_id != task_id else "original"
+                        if "hedge_task_id" in span:
+                            span["winner"] = winner
+                        span.update(status=status, polls=polls, ok=True, **task_timing(data))
+                        log(f"  [{stage}] {name}: DONE" + (" (duplicate won)" if winner == "duplicate" else ""))
+                        data["id"] = copy_id
+                        return data
+                    outcome, timing = status, task_timing(data)
+                    waiting = ", waiting on the other copy" if copies else ""
+                    log(f"  [{stage}] {name}: {status} - {data.get('task_error', '')}{waiting}")
+                    continue
+
+                now = time.time()
+                if now - copy["start"] >= MAX_POLL_TIME:
+                    del copies[copy_id]
+                    cancel_task(copy_id)  # it would keep running (and billing) on Meshy
+                    outcome, timing = "TIMEOUT", {}
+                    log(f"  [{stage}] {name}: TIMEOUT" + (", waiting on the other copy" if copies else ""))
+                    continue
+                if status == "IN_PROGRESS" and copy["running_since"] is None:
+                    copy["running_since"] = now
+                running_for = now - copy["running_since"] if copy["running_since"] else 0.0
+
+                progress[name] = f"{stage} {data.get('progress', '?')}%" + (" (hedged)" if len(copies) > 1 else "")
+                remaining = copy["start"] + MAX_POLL_TIME - now
+                copy["next_poll"] = now + max(0.0, min(next_poll_delay(data, running_for), remaining))
+                if not hedged:
+                    limit = deadline()
+        finally:
+            for leftover in copies:  # the other copy of a winner, or copies abandoned by an error
+                cancel_task(leftover)
+
+        progress.pop(name, None)
+        span.update(status=outcome, polls=polls, ok=False, **timing)
+        return None
 
 
-def download_glb(url: str, output_path: Path) -> bool:
+def task_timing(data: dict) -> dict:
+    """Server-side queue and run seconds from a finished task's millisecond timestamps."""
+    created, started, finished = (data.get(k) for k in ("created_at", "started_at", "finished_at"))
+    timing = {}
+    if created and started:
+        timing["queue_seconds"] = max(0.0, (started - created) / 1000)
+    if started and finished:
+        timing["run_seconds"] = max(0.0, (finished - started) / 1000)
+    return timing
+
+
+def is_valid_glb(path: Path) -> bool:
+    """Cheap completeness check: GLB magic, version 2 and a header length matching the file size."""
     try:
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        resp = requests.get(url, timeout=120, stream=True)
-        if resp.status_code == 200:
-            with open(output_path, "wb") as f:
-                for chunk in resp.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            size_kb = output_path.stat().st_size / 1024
-            print(f"  Downloaded: {output_path.name} ({size_kb:.1f} KB)")
-            return True
-        print(f"  Download failed: {resp.status_code}")
+        with open(path, "rb") as f:
+            header = f.read(12)
+        size = path.stat().st_size
+    except OSError:
         return False
-    except Exception as e:
-        print(f"  Download error: {e}")
+    if len(header) < 12:
+        return False
+    magic, version, length = struct.unpack("<4sII", header)
+    return magic == GLB_MAGIC and version == 2 and length == size
+
+
+def _content_total(resp: requests.Response, offset: int) -> int | None:
+    """Full size of the remote file, from Content-Range (206) or Content-Length (200)."""
+    if resp.status_code == 206:
+        total = resp.headers.get("Content-Range", "").rpartition("/")[2]
+        return int(total) if total.isdigit() else None
+    length = resp.headers.get("Content-Length")
+    return int(length) if length and length.isdigit() else None
+
+
+def download_glb(url: str, output_path: Path, label: str | None = None) -> bool:
+    """Download a GLB via a .part file, resuming with HTTP Range where possible.
+
+    The file only replaces output_path once its size matches what the server
+    announced and its GLB header checks out, so an interrupted download never
+    leaves a truncated model in Assets/. The validator (ETag/Last-Modified) of
+    a partial download is kept next to it and sent as If-Range, so a partial
+    file is only resumed against the same remote content.
+    """
+    with _tracer.span("download") as span:
+        span["bytes"] = 0
+        ok = _download_glb(url, output_path, label or output_path.name, span)
+        span["ok"] = ok
+        return ok
+
+
+def _download_glb(url: str, output_path: Path, label: str, span: dict) -> bool:
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    part_path = output_path.with_name(output_path.name + ".part")
+    meta_path = output_path.with_name(output_path.name + ".part.json")
+
+    total = None
+    for attempt in range(DOWNLOAD_ATTEMPTS):
+        span["attempts"] = attempt + 1
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        validator = None
+        if offset and meta_path.exists():
+            try:
+                validator = json.loads(meta_path.read_text()).get("validator")
+            except (OSError, ValueError):
+                validator = None
+        headers = {}
+        if offset and validator:
+            headers = {"Range": f"bytes={offset}-", "If-Range": validator}
+
+        try:
+            with _session.get(url, headers=headers, stream=True, timeout=(10, 120)) as resp:
+                if resp.status_code == 416 and offset:
+                    # Nothing left to fetch; validate what we already have
+                    total = offset
+                    break
+                if resp.status_code not in (200, 206):
+                    log(f"  Download failed: {resp.status_code}")
+                    return False
+
+                total = _content_total(resp, offset)
+                mode = "ab" if resp.status_code == 206 else "wb"
+                if mode == "wb":
+                    offset = 0
+                elif offset:
+                    span["resumed_from"] = offset
+                validator = resp.headers.get("ETag") or resp.headers.get("Last-Modified")
+                meta_path.write_text(json.dumps({"validator": validator}))
+
+                with open(part_path, mode) as f:
+                    for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+                        span["bytes"] += len(chunk)
+                    f.flush()
+                    os.fsync(f.fileno())
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            log(f"  Download interrupted ({label}, attempt {attempt + 1}): {e}")
+            continue
+        except OSError as e:
+            log(f"  Download error: {e}")
+            return False
+
+        if total is None or part_path.stat().st_size >= total:
+            break
+        log(f"  Download short ({label}): {part_path.stat().st_size}/{total} bytes, resuming")
+
+    size = part_path.stat().st_size if part_path.exists() else 0
+    if total is not None and size != total:
+        log(f"  Download incomplete: {label} ({size}/{total} bytes)")
         return False
+    if not is_valid_glb(part_path):
+        log(f"  Download corrupt: {label} is not a complete GLB, discarding")
+        part_path.unlink(missing_ok=True)
+        meta_path.unlink(missing_ok=True)
+        return False
+
+    os.replace(part_path, output_path)
+    meta_path.unlink(missing_ok=True)
+    log(f"  Downloaded: {label} ({size / 1024:.1f} KB)")
+    return True
+
+
+def is_installed(path: Path) -> bool:
+    """True if path holds an installed model: a complete GLB, or a variant's scene."""
+    return is_valid_glb(path) if path.suffix == ".glb" else path.is_file()
+
+
+def install_model(asset: dict, source: Path, optimize: bool) -> Path:
+    """Copy a cached raw GLB into Assets/ (atomically) and optimize the copy.
+
+    A variant installs as a scene over its base's model instead; that raises
+    VariantError when the base is not installed.
+    """
+    output_path = ASSETS_DIR / asset["output_dir"] / asset["filename"]
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if "variant_of" in asset:
+        base = variant_base(asset)
+        base_path = ASSETS_DIR / base["output_dir"] / base["filename"]
+        if not is_valid_glb(base_path):
+            raise VariantError(f"base {base['name']} is not installed")
+        report = install_variant(source, output_path, asset_res_path(asset), base_path, asset_res_path(base),
+                                 variant_spec(asset), texture_budget(asset) if optimize else None)
+        log(format_scene_report(asset["name"], base["filename"], report))
+        return output_path
+    tmp_path = output_path.with_name(output_path.name + ".part")
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, output_path)
+    if optimize:
+        run_optimize(asset, output_path)
+    run_lods(asset, output_path, build=optimize)
+    return output_path
+
+
+def verify_tasks(task_ids: list[str]) -> dict[str, dict]:
+    """Check stored task IDs concurrently in one bulk pass. Returns {task_id: task data}."""
+    task_ids = list(dict.fromkeys(task_ids))
+    if not task_ids:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(VERIFY_CONCURRENCY, len(task_ids))) as pool:
+        return dict(zip(task_ids, pool.map(check_task, task_ids)))
+
+
+class AssetPipeline:
+    """Streams every request through preview -> refine -> download independently.
+
+    Work is grouped by cache key: assets whose requests hash the same are
+    generated once and the result is installed for all of them. Each group runs
+    on its own worker and advances the moment its own previous stage finishes,
+    so one slow preview never holds up another asset's refine or download.
+    Per-stage semaphores bound how many tasks are in flight at each stage.
+
+    Every task submission and outcome goes to the journal as it happens.
+    Stored tasks found by the resume pass are reused when they succeeded and
+    waited on (not resubmitted) when they are still running. A request is only
+    worked on while holding its claim (see request_claim), so processes sharing
+    the state never submit or download the same request twice. Material
+    variants waiting on a request are derived and installed once its model is in.
+    A task that runs past its deadline from hedges gets a duplicate (see
+    wait_for_task), journaled as <stage>_hedge_task while the two race so an
+    interrupted run can resume or cancel it; the winning copy is what the
+    journal keeps.
+    """
+
+    def __init__(self, journal: StateJournal, known_tasks: dict[str, dict] | None = None, optimize: bool = True,
+                 status_file: Path | None = None, hedges: HedgePolicy | None = None):
+        self.journal = journal
+        self.state = journal.state
+        self.known_tasks = known_tasks or {}
+        self.optimize = optimize
+        self.status_file = status_file
+        self.hedges = hedges or HedgePolicy(0)
+        self.counts = {"done": 0, "failed": 0, "elsewhere": 0}
+        self.counts_lock = threading.Lock()
+        self.slots = {
+            "preview": threading.BoundedSemaphore(PREVIEW_CONCURRENCY),
+            "refine": threading.BoundedSemaphore(REFINE_CONCURRENCY),
+            "download": threading.BoundedSemaphore(DOWNLOAD_CONCURRENCY),
+            "optimize": threading.BoundedSemaphore(OPTIMIZE_CONCURRENCY),
+        }
+        self.progress = {}  # name -> "stage NN%" for tasks still running
+        self.finished = threading.Event()
 
+    def run(self, jobs: dict[str, list[dict]], variants: dict[str, list[dict]] | None = None) -> tuple[int, int]:
+        """Generate each cache key in jobs and install it for its assets and variants.
 
-def main():
+        Returns (successes, failures), counting variants like assets.
+        """
+        self.variants = variants or {}
+        reporter = threading.Thread(target=self._report_progress, daemon=True)
+        reporter.start()
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, len(jobs))) as pool:
+                results = list(pool.map(self.process, jobs.items()))
+        finally:
+            self.finished.set()
+            reporter.join()
+            self._write_status()
+        successes = sum(ok for ok, _ in results)
+        return successes, sum(failed for _, failed in results)
+
+    def process(self, job: tuple[str, list[dict]]) -> tuple[int, int]:
+        key, assets = job
+        asset = assets[0]
+        targets = assets + self.variants.get(key, [])
+        claim = request_claim(key)
+        if not claim.acquire(blocking=False):
+            log(f"  {asset['name']}: another process is generating this request, skipping")
+            with self.counts_lock:
+                self.counts["elsewhere"] += len(targets)
+            return 0, 0
+        started = time.time()
+        try:
+            with _tracer.bind(asset=asset["name"]):
+                result = self._process(key, assets)
+        finally:
+            claim.release()
+        for target in targets:
+            _tracer.emit("asset", asset=target["name"], category=target["output_dir"], key=key,
+                         ok=result[0] > 0, start=started, seconds=time.time() - started)
+        with self.counts_lock:
+            self.counts["done"] += result[0]
+            self.counts["failed"] += result[1]
+        return result
+
+    def _process(self, key: str, assets: list[dict]) -> tuple[int, int]:
+        asset = assets[0]
+        name = asset["name"]
+        total = len(assets) + len(self.variants.get(key, []))
+        try:
+            # Another process may have finished this request since the run was planned
+            self.journal.refresh()
+            cached = cached_model(self.state, key)
+            if cached is not None:
+                log(f"  {name}: generated by another process, installing from cache")
+                for target in assets:
+                    self._install(key, target, cached)
+                derived, elsewhere = self._install_variants(key)
+                return len(assets) + derived, total - len(assets) - derived - elsewhere
+
+            preview = None
+            refine = self._succeeded_task(key, "refine_task")
+            if refine is not None:
+                log(f"  {name}: reusing previous refine {refine['id']}")
+            else:
+                preview = self._run_preview(key, asset)
+                if preview is None:
+                    return 0, total
+                refine = self._run_refine(key, asset, preview["id"])
+
+            # Try refined model first, fallback to preview
+            glb_url = None
+            source = "refine"
+            if refine:
+                glb_url = refine.get("model_urls", {}).get("glb")
+            if not glb_url and preview:
+                glb_url = preview.get("model_urls", {}).get("glb")
+                source = "preview"
+                if glb_url:
+                    log(f"  {name}: using preview model (refine unavailable)")
+                    _tracer.emit("fallback", reason="refine failed" if refine is None else "refine has no GLB")
+            if not glb_url:
+                log(f"  {name}: NO model URL available")
+                return 0, total
+
+            cached = self._run_download(key, name, glb_url, source)
+            if cached is None:
+                return 0, total
+            for target in assets:
+                self._install(key, target, cached)
+            derived, elsewhere = self._install_variants(key)
+            return len(assets) + derived, total - len(assets) - derived - elsewhere
+        except Exception as e:
+            log(f"  {name}: pipeline error: {e}")
+            return 0, total
+
+    def _stored_task(self, key: str, field: str) -> tuple[str | None, dict]:
+        """A task ID stored for this request and its status (from the resume pass when available)."""
+        task_id = self.state["cache"].get(key, {}).get(field)
+        if not task_id:
+            return None, {}
+        data = self.known_tasks.get(task_id) or check_task(task_id)
+        data.setdefault("id", task_id)
+        return task_id, data
+
+    def _succeeded_task(self, key: str, field: str) -> dict | None:
+        task_id, data = self._stored_task(key, field)
+        return data if task_id and data.get("status") == "SUCCEEDED" else None
+
+    def _run_stage(self, key: str, asset: dict, stage: str, submit) -> dict | None:
+        """Reuse, resume or submit the task for one stage, then wait for it (hedging it past its deadline)."""
+        name = asset["name"]
+        field, hedge_field = f"{stage}_task", f"{stage}_hedge_task"
+        task_id, data = self._stored_task(key, field)
+        hedge_id, hedge = self._stored_task(key, hedge_field)
+        if hedge_id:
+            task_id, data, hedge_id = self._settle_hedge(task_id, data, hedge_id, hedge)
+            self.journal.update_entry(key, name, **{field: task_id, hedge_field: hedge_id})
+        status = data.get("status")
+        if status == "SUCCEEDED":
+            log(f"  {name}: reusing previous {stage} {task_id}")
+            return data
+        if status in ("PENDING", "IN_PROGRESS"):
+            also = f" and its duplicate {hedge_id}" if hedge_id else ""
+            log(f"  {name}: resuming {stage} {task_id}{also} ({data.get('progress', 0)}%)")
+        else:
+            with _tracer.span("submit", stage=stage) as span:
+                task_id = submit()
+                span["ok"] = bool(task_id)
+            if not task_id:
+                return None
+            fields = {field: task_id, hedge_field: None, f"{stage}_status": "SUBMITTED"}
+            if stage == "preview":
+                # A new preview invalidates any refine made from the old one
+                fields.update(refine_task=None, refine_hedge_task=None, refine_status=None)
+            self.journal.update_entry(key, name, **fields)
+            log(f"  {name}: submitted {stage} {task_id}")
+
+        def resubmit():
+            if not self.hedges.spend():
+                log(f"  {name}: {stage} is slow but the hedge budget is spent")
+                return None
+            with _tracer.span("submit", stage=stage, hedge=True) as span:
+                duplicate = submit()
+                span["ok"] = bool(duplicate)
+            if not duplicate:
+                self.hedges.refund()
+                return None
+            # Journaled at once, so a crash mid-race can resume (or cancel) it
+            self.journal.update_entry(key, name, **{hedge_field: duplicate})
+            return duplicate
+
+        with self.hedges.waiting(stage, asset):
+            data = wait_for_task(task_id, stage, name, self.progress,
+                                 lambda: self.hedges.deadline(stage, asset), resubmit, duplicate=hedge_id)
+        fields = {f"{stage}_status": "SUCCEEDED" if data else "FAILED", hedge_field: None}
+        if data is not None:
+            data.setdefault("id", task_id)
+            fields[field] = data["id"]
+            seconds = sum(task_timing(data).values())
+            if seconds:
+                self.hedges.observe(stage, name, asset["output_dir"], seconds)
+        self.journal.update_entry(key, name, **fields)
+        return data
+
+    @staticmethod
+    def _settle_hedge(task_id: str | None, data: dict, hedge_id: str, hedge: dict) -> tuple[str | None, dict, str | None]:
+        """Pick up a stage that was hedged when the last run stopped. Returns (task id, its data, duplicate to race).
+
+        A succeeded copy wins and a running one is canceled; a copy that ended
+        otherwise is dropped, leaving the other as the stage's task. Only when
+        both are still running are both raced again.
+        """
+        live = ("PENDING", "IN_PROGRESS")
+        status, hedge_status = data.get("status"), hedge.get("status")
+        if status == "SUCCEEDED" or (hedge_status not in live and hedge_status != "SUCCEEDED"):
+            if hedge_status in live:
+                cancel_task(hedge_id)
+            return task_id, data, None
+        if hedge_status == "SUCCEEDED" or status not in live:
+            if status in live:
+                cancel_task(task_id)
+            return hedge_id, hedge, None
+        return task_id, data, hedge_id
+
+    def _run_preview(self, key: str, asset: dict) -> dict | None:
+        name = asset["name"]
+
+        def submit():
+            task_id = create_preview(asset)
+            if not task_id:
+                log(f"  {name}: FAILED to submit preview")
+            return task_id
+
+        with self._slot("preview"):
+            return self._run_stage(key, asset, "preview", submit)
+
+    def _run_refine(self, key: str, asset: dict, preview_id: str) -> dict | None:
+        name = asset["name"]
+
+        def submit():
+            task_id = create_refine(preview_id)
+            if not task_id:
+                log(f"  {name}: FAILED to submit refine (will use preview)")
+            return task_id
+
+        with self._slot("refine"):
+            return self._run_stage(key, asset, "refine", submit)
+
+    def _run_download(self, key: str, name: str, glb_url: str, source: str) -> Path | None:
+        cache_path = CACHE_DIR / f"{key}.glb"
+        with self._slot("download"):
+            if not download_glb(glb_url, cache_path, label=name):
+                return None
+        self.journal.update_entry(key, name, glb=cache_path.name, source=source)
+        return cache_path
+
+    def _install(self, key: str, asset: dict, cached: Path):
+        with self._slot("optimize"), _tracer.span("install", target=asset["name"]):
+            install_model(asset, cached, self.optimize)
+        self.journal.record(op="install", name=asset["name"], key=key)
+
+    def _install_variants(self, key: str) -> tuple[int, int]:
+        """Derive and install the variants of the model just installed for key.
+
+        Returns (installed, elsewhere): elsewhere counts variants another process holds the claim for.
+        """
+        installed = elsewhere = 0
+        for variant in self.variants.get(key, []):
+            variant_claim = request_claim(asset_key(variant))
+            if not variant_claim.acquire(blocking=False):
+                log(f"  [variant] {variant['name']}: another process is deriving it, skipping")
+                elsewhere += 1
+                continue
+            try:
+                derived = derive_model(self.journal, variant, key)
+                if derived is not None:
+                    self._install(asset_key(variant), variant, derived)
+                    installed += 1
+            except VariantError as e:
+                log(f"  [variant] {variant['name']}: FAILED ({e})")
+            finally:
+                variant_claim.release()
+        if elsewhere:
+            with self.counts_lock:
+                self.counts["elsewhere"] += elsewhere
+        return installed, elsewhere
+
+    @contextmanager
+    def _slot(self, stage: str):
+        """Hold a stage's concurrency slot, tracing how long it took to get one."""
+        with _tracer.span("slot", stage=stage):
+            self.slots[stage].acquire()
+        try:
+            yield
+        finally:
+            self.slots[stage].release()
+
+    def _write_status(self):
+        with self.counts_lock:
+            counts = dict(self.counts)
+        update_worker_status(self.status_file, **counts, active=dict(self.progress))
+
+    def _report_progress(self):
+        while not self.finished.wait(POLL_INTERVAL):
+            if self.status_file:
+                self._write_status()  # the coordinating process shows merged progress
+                continue
+            running = list(self.progress.items())
+            if not running:
+                continue
+            shown = [f"{n}({p})" for n, p in running[:5]]
+            extra = f" +{len(running) - 5} more" if len(running) > 5 else ""
+            log(f"  Waiting: {', '.join(shown)}{extra}")
+
+
+def run_optimize(asset: dict, path: Path) -> dict | None:
+    """Optimize a downloaded model in place. Failures keep the model as downloaded."""
+    try:
+        with _tracer.span("optimize"):
+            report = optimize_asset(asset, path)
+    except Exception as e:
+        log(f"  [optimize] {asset['name']}: skipped ({e})")
+        return None
+    log(format_report(asset["name"], report))
+    return report
+
+
+def run_lods(asset: dict, path: Path, build: bool = True) -> dict | None:
+    """Add LOD levels to a model that opts into LODs and write its wrapper scene.
+
+    Without build, or if the chain fails, the wrapper instances the plain model.
+    """
+    if not asset.get("lods"):
+        return None
+    report = None
+    if build:
+        try:
+            with _tracer.span("lod"):
+                report = generate_lods(asset, path, asset_res_path(asset))
+        except Exception as e:
+            log(f"  [lod] {asset['name']}: skipped, the wrapper shows the full model ({e})")
+    if report is None:
+        write_passthrough_scene(asset, path, asset_res_path(asset))
+    else:
+        log(format_lod_report(asset["name"], report))
+    return report
+
+
+def pack_texture_atlases() -> dict | None:
+    """Repack shared texture atlases from every atlas-group model on disk. None if there are none."""
+    models = {}
+    for asset in ASSETS:
+        path = ASSETS_DIR / asset["output_dir"] / asset["filename"]
+        group = atlas_group(asset)
+        if group and is_valid_glb(path):
+            models[asset["name"]] = (group, path)
+    if not models:
+        return None
+    try:
+        with _tracer.span("atlas", models=len(models)):
+            report = build_atlases(models, ASSETS_DIR / ATLAS_DIR, TEXTURE_EXTRACT_DIR, f"res://Assets/{ATLAS_DIR}")
+    except AtlasError as e:
+        log(f"  [atlas] skipped ({e})")
+        return None
+    log(format_atlas_report(report))
+    return report
+
+
+def refresh_variant_scenes():
+    """Rewrite installed variant scenes for their bases as now installed (reinstalls and repacks move their UVs).
+
+    References to a variant's old .glb move to its scene, and the GLB it replaces is deleted.
+    """
+    index = None
+    for asset in ASSETS:
+        base = variant_base(asset)
+        scene_path = ASSETS_DIR / asset["output_dir"] / asset["filename"]
+        if base is None or not scene_path.is_file():
+            continue
+        base_path = ASSETS_DIR / base["output_dir"] / base["filename"]
+        if not is_valid_glb(base_path):
+            continue
+        write_variant_scene(scene_path, asset_res_path(asset), base_path, asset_res_path(base),
+                            variant_spec(asset))
+        index = index or scan_references()
+        replaced_res = replaced_model_res_path(asset)
+        for src in index.retarget(replaced_res, asset_res_path(asset)):
+            log(f"  [variant] {src}: now uses {asset['filename']}")
+        replaced = scene_path.with_suffix(".glb")
+        if replaced.exists():
+            replaced.unlink()
+            replaced.with_name(replaced.name + ".import").unlink(missing_ok=True)
+            log(f"  [variant] {asset['name']}: removed {replaced.name}, replaced by its scene")
+
+
+def cmd_atlas(args) -> int:
+    """Repack the shared texture atlases from the models already on disk."""
+    report = pack_texture_atlases()
+    refresh_variant_scenes()
+    if report is None:
+        print("No atlas pages written")
+        return 1
+    return 0
+
+
+def bake_item_icons() -> dict | None:
+    """Re-bake the icon atlas from every item model on disk. None if there are none.
+
+    A variant's scene has no GLB of its own; its icon comes from its derived model in the cache
+    (or, until the scene is installed, from the GLB it replaces).
+    """
+    models = {}
+    state = None
+    for asset in ASSETS:
+        path = ASSETS_DIR / asset["output_dir"] / asset["filename"]
+        if asset["output_dir"] in ICON_CATEGORIES and "variant_of" in asset and not path.is_file() \
+                and is_valid_glb(shipped_glb(asset)):
+            models[replaced_model_res_path(asset)] = shipped_glb(asset)
+            continue
+        if asset["output_dir"] not in ICON_CATEGORIES or not is_installed(path):
+            continue
+        if "variant_of" in asset:
+            state = state or load_state()
+            path = cached_model(state, asset_key(asset))
+            if path is None:
+                log(f"  [icons] {asset['name']}: skipped (derived model not cached)")
+                continue
+        models[asset_res_path(asset)] = path
+    if not models:
+        return None
+    errors = {}
+    started = time.time()
+    with _tracer.span("icons", models=len(models)):
+        index = bake_icons(models, ASSETS_DIR / ICON_ATLAS, ASSETS_DIR / ICON_INDEX, f"res://Assets/{ICON_ATLAS}",
+                           errors=errors)
+    width, height = index["size"]
+    log(f"  [icons] baked {len(index['icons'])} icons into a {width}x{height} atlas in {time.time() - started:.1f}s")
+    for res_path, error in errors.items():
+        log(f"  [icons] {res_path}: skipped ({error})")
+    return index
+
+
+def cmd_icons(args) -> int:
+    """Re-bake the inventory icon atlas from the item models already on disk."""
+    if bake_item_icons() is None:
+        print("No item models on disk")
+        return 1
+    print(f"Wrote {ASSETS_DIR / ICON_ATLAS} and {ASSETS_DIR / ICON_INDEX}")
+    return 0
+
+
+def cmd_optimize(args) -> int:
+    """Re-run the optimizer over models that are already on disk."""
+    selected = [resolved_asset(a) for a in ASSETS if not args.names or a["name"] in args.names]
+    total_before = total_after = 0
+    for asset in selected:
+        path = shipped_glb(asset)
+        if not is_valid_glb(path):
+            continue
+        if asset.get("lods"):
+            strip_lods(path)  # optimize LOD0 alone; run_lods adds the levels back
+        report = run_optimize(asset, path)
+        if report:
+            total_before += report["bytes_before"]
+            total_after += report["bytes_after"]
+        if "variant_of" not in asset:
+            run_lods(asset, path)
+    print(f"\nTotal: {total_before / 1024:.1f} KB -> {total_after / 1024:.1f} KB")
+    return 0
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    index, _, count = value.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected I/N, got {value!r}")
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must be in 0..{count - 1}")
+    return index, count
+
+
+def parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Meshy AI 3D asset generator for AI RPG")
+    sub = parser.add_subparsers(dest="command")
+
+    gen = sub.add_parser("generate", help="generate missing assets (default)")
+    gen.add_argument("--no-optimize", action="store_true", help="keep downloaded models as-is")
+    gen.add_argument("--no-atlas", action="store_true", help="don't repack the shared texture atlases")
+    gen.add_argument("--no-icons", action="store_true", help="don't re-bake the inventory icon atlas")
+    gen.add_argument("--no-check", action="store_true", help="don't check models against their budgets")
+    gen.add_argument("--unreferenced", choices=["defer", "skip", "include"], default="defer",
+                     help="assets no scene/resource uses: queue them last (default), skip them, "
+                          "or keep ASSETS order")
+    gen.add_argument("--trace", type=Path, metavar="PATH",
+                     help="write the run trace here (default: tools/.cache/traces/<timestamp>.jsonl)")
+    gen.add_argument("--workers", type=int, default=1, metavar="N",
+                     help="split the run across N worker processes, each on its own key from "
+                          "MESHY_API_KEYS (comma-separated) when set")
+    gen.add_argument("--hedge-budget", type=int, metavar="N",
+                     help="duplicate submissions allowed for tasks past their deadline "
+                          f"(default: {HEDGE_BUDGET_FRACTION:.0%} of the requests, rounded up; 0 disables)")
+    gen.add_argument("--shard", type=parse_shard, metavar="I/N",
+                     help="only generate requests in shard I (0-based) of N")
+    gen.add_argument("--key-share", type=int, default=1, help=argparse.SUPPRESS)
+    gen.add_argument("--status", type=Path, help=argparse.SUPPRESS)
+
+    opt = sub.add_parser("optimize", help="optimize models already in Assets/ and rebuild their LODs")
+    opt.add_argument("names", nargs="*", help="asset names (default: all)")
+
+    sub.add_parser("atlas", help="pack item/equipment textures into shared atlas pages")
+
+    sub.add_parser("icons", help="bake item models into the inventory icon atlas")
+
+    sub.add_parser("refs", help="report which assets the game references and orphaned GLBs")
+
+    ins = sub.add_parser("inspect", help="check models against their budgets and last accepted stats")
+    ins.add_argument("names", nargs="*", help="asset names (default: every model in Assets/Models)")
+    ins.add_argument("--accept", action="store_true",
+                     help="take the named models' current stats as their baseline")
+    ins.add_argument("--strict", action="store_true", help="also fail on models over budget")
+    ins.add_argument("--json", action="store_true", help="print the report as JSON")
+
+    rep = sub.add_parser("report", help="summarize a generate run trace")
+    rep.add_argument("traces", nargs="*", type=Path,
+                     help="trace files, e.g. one per worker (default: the latest run)")
+    rep.add_argument("--json", action="store_true", help="print the summary as JSON")
+
+    cache = sub.add_parser("cache", help="inspect or evict the generation cache")
+    cache.add_argument("action", choices=["list", "evict"])
+    cache.add_argument("--all", action="store_true", help="evict every entry, not just stale ones")
+    cache.add_argument("--dry-run", action="store_true", help="show what would be evicted")
+
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or (argv[0] not in sub.choices and argv[0] not in ("-h", "--help")):
+        argv.insert(0, "generate")
+    return parser.parse_args(argv)
+
+
+def cmd_generate(args) -> int:
+    if args.workers > 1:
+        return run_workers(args)
+    configure_worker(args)
     print("=" * 60)
     print("Meshy AI 3D Asset Generator for AI RPG")
     print(f"Total assets: {len(ASSETS)}")
+    if args.shard:
+        print(f"Shard: {args.shard[0]} of {args.shard[1]}")
     print("=" * 60)
     sys.stdout.flush()
 
-    state = load_state()
+    global _tracer
+    trace_path = args.trace or TRACE_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.jsonl"
+    _tracer = Tracer(trace_path)
+    journal = StateJournal()
+    try:
+        return _generate(journal, args)
+    finally:
+        journal.close()
+        _tracer.close()
+        _tracer = Tracer()
+        print(f"Trace: {trace_path} (summarize with: generate_assets.py report)")
+
+
+def _generate(journal: StateJournal, args) -> int:
+    state = journal.state
+    optimize = not args.no_optimize
+    _tracer.emit("run", phase="start", assets=len(ASSETS), optimize=optimize,
+                 concurrency={"preview": PREVIEW_CONCURRENCY, "refine": REFINE_CONCURRENCY,
+                              "download": DOWNLOAD_CONCURRENCY})
+
+    try:
+        assets = [resolved_asset(asset) for asset in ASSETS]
+        keys = [asset_key(asset) for asset in assets]
+    except VariantError as e:
+        print(f"Invalid asset definition: {e}")
+        return 1
 
     # Ensure directories
-    for asset in ASSETS:
+    for asset in assets:
         (ASSETS_DIR / asset["output_dir"]).mkdir(parents=True, exist_ok=True)
 
-    # Filter to assets that still need work
-    to_generate = []
-    for asset in ASSETS:
+    # Only requests whose hash has no usable model yet need the API; variants
+    # only need their base's model
+    jobs = {}  # cache key -> assets sharing that exact request
+    variants = {}  # base cache key -> variants waiting on that request
+    skipped = restored = 0
+    for asset, key in zip(assets, keys):
         name = asset["name"]
+        base = variant_base(asset)
+        base_key = cache_key(base) if base else None
+        if not in_shard(base_key or key, args.shard):
+            continue
         output_path = ASSETS_DIR / asset["output_dir"] / asset["filename"]
-        if name in state["completed"] and output_path.exists():
+        if state["assets"].get(name) == key and is_installed(output_path):
             print(f"  SKIP (done): {name}")
+            skipped += 1
             continue
-        to_generate.append(asset)
+        cached = cached_model(state, key)
+        claim = request_claim(key)
+        # A variant's scene instances its base's model, so it waits for the base to be installed
+        ready = base is None or is_valid_glb(ASSETS_DIR / base["output_dir"] / base["filename"])
+        if ready and (cached or base_key) and claim.acquire(blocking=False):
+            try:
+                if cached is None and cached_model(state, base_key):
+                    cached = derive_model(journal, asset, base_key)
+                if cached:
+                    install_model(asset, cached, optimize)
+                    journal.record(op="install", name=name, key=key)
+            except VariantError as e:
+                print(f"  [variant] {name}: FAILED ({e})")
+                cached = None
+            finally:
+                claim.release()
+            if cached:
+                print(f"  {name}: restored from cache ({key[:12]})")
+                restored += 1
+                continue
+        if base_key:
+            variants.setdefault(base_key, []).append(asset)
+        else:
+            jobs.setdefault(key, []).append(asset)
+
+    for base_key, waiting in variants.items():
+        if base_key not in jobs:
+            # Base installed but its raw model is gone: fetch it again (reusing its stored tasks)
+            jobs[base_key] = [resolved_asset(variant_base(waiting[0]))]
 
+    jobs = prioritize_jobs(jobs, args.unreferenced, variants)
+    variants = {key: waiting for key, waiting in variants.items() if key in jobs}
+    derived = sum(len(waiting) for waiting in variants.values())
+    to_generate = sum(len(assets) for assets in jobs.values()) + derived
+    update_worker_status(args.status, total=to_generate, skipped=skipped, restored=restored)
     if not to_generate:
         print("\nAll assets already generated!")
-        return 0
+        checked = finish_run(args) if restored else True
+        _tracer.emit("run", phase="end", succeeded=0, failed=0, skipped=skipped, restored=restored)
+        return 0 if checked else 1
 
-    print(f"\nAssets to generate: {len(to_generate)}")
+    print(f"\nAssets to generate: {to_generate} ({len(jobs)} unique requests, {derived} derived variants)")
+    print(f"Concurrency: preview={PREVIEW_CONCURRENCY} refine={REFINE_CONCURRENCY} download={DOWNLOAD_CONCURRENCY}")
     sys.stdout.flush()
 
-    # ── PHASE 1: Submit all preview tasks ──
-    print("\n--- PHASE 1: Submitting preview tasks ---")
-    sys.stdout.flush()
-    preview_tasks = {}  # name -> task_id
-    for asset in to_generate:
-        name = asset["name"]
-        # Check if we already have a preview task from a previous run
-        if name in state.get("preview_tasks", {}):
-            task_id = state["preview_tasks"][name]
-            # Verify it still exists and is valid
-            data = check_task(task_id)
-            if data.get("status") == "SUCCEEDED":
-                preview_tasks[name] = task_id
-                print(f"  {name}: reusing previous preview {task_id}")
-                sys.stdout.flush()
-                continue
-
-        task_id = create_preview(asset)
-        if task_id:
-            preview_tasks[name] = task_id
-            state.setdefault("preview_tasks", {})[name] = task_id
-            print(f"  {name}: submitted preview {task_id}")
-        else:
-            print(f"  {name}: FAILED to submit preview")
+    # Resume: verify every stored task for the pending requests in one concurrent pass.
+    # A recorded refine success makes its preview irrelevant, so only the refine is checked.
+    stored = []
+    for key in jobs:
+        entry = state["cache"].get(key, {})
+        stages = ["refine"] if entry.get("refine_status") == "SUCCEEDED" else ["preview", "refine"]
+        fields = [f"{stage}{kind}" for stage in stages for kind in ("_task", "_hedge_task")]
+        stored += [entry[f] for f in fields if entry.get(f)]
+    known_tasks = {}
+    if stored:
+        started = time.time()
+        known_tasks = verify_tasks(stored)
+        print(f"Verified {len(known_tasks)} stored tasks in {time.time() - started:.1f}s")
         sys.stdout.flush()
-        time.sleep(0.5)  # small delay to avoid rate limiting
 
-    save_state(state)
-
-    # ── PHASE 2: Poll all preview tasks ──
-    print(f"\n--- PHASE 2: Polling {len(preview_tasks)} preview tasks ---")
+    budget = args.hedge_budget if args.hedge_budget is not None else math.ceil(len(jobs) * HEDGE_BUDGET_FRACTION)
+    history = hedge_history()
+    hedges = HedgePolicy(budget, history)
+    print(f"Hedging: up to {budget} duplicate tasks, deadlines from {len(history)} earlier task durations")
     sys.stdout.flush()
-    preview_results = poll_batch(preview_tasks, "preview")
+    pipeline = AssetPipeline(journal, known_tasks, optimize=optimize, status_file=args.status, hedges=hedges)
+    successes, failures = pipeline.run(jobs, variants)
+    checked = finish_run(args) if successes or restored else True
+    _tracer.emit("run", phase="end", succeeded=successes, failed=failures, skipped=skipped, restored=restored,
+                 hedged=hedges.spent)
 
-    # ── PHASE 3: Submit all refine tasks ──
-    print("\n--- PHASE 3: Submitting refine tasks ---")
+    print("\n" + "=" * 60)
+    print(f"DONE: {successes} succeeded, {failures} failed")
+    if skipped or restored:
+        print(f"  ({skipped} were already completed, {restored} restored from cache)")
+    if hedges.spent:
+        print(f"  ({hedges.spent} slow tasks hedged with a duplicate)")
+    if pipeline.counts["elsewhere"]:
+        print(f"  ({pipeline.counts['elsewhere']} left to another process working on the same request)")
+    print("=" * 60)
     sys.stdout.flush()
-    refine_tasks = {}  # name -> task_id
-    for name, data in preview_results.items():
-        if data is None:
-            print(f"  {name}: skipping refine (preview failed)")
-            sys.stdout.flush()
-            continue
-        # Check for existing refine task
-        if name in state.get("refine_tasks", {}):
-            task_id = state["refine_tasks"][name]
-            check = check_task(task_id)
-            if check.get("status") == "SUCCEEDED":
-                refine_tasks[name] = task_id
-                print(f"  {name}: reusing previous refine {task_id}")
-                sys.stdout.flush()
-                continue
 
-        preview_id = preview_tasks[name]
-        task_id = create_refine(preview_id)
-        if task_id:
-            refine_tasks[name] = task_id
-            state.setdefault("refine_tasks", {})[name] = task_id
-            print(f"  {name}: submitted refine {task_id}")
-        else:
-            print(f"  {name}: FAILED to submit refine (will use preview)")
-        sys.stdout.flush()
-        time.sleep(0.5)
+    return 0 if failures == 0 and checked else 1
 
-    save_state(state)
 
-    # ── PHASE 4: Poll all refine tasks ──
-    if refine_tasks:
-        print(f"\n--- PHASE 4: Polling {len(refine_tasks)} refine tasks ---")
-        sys.stdout.flush()
-        refine_results = poll_batch(refine_tasks, "refine")
-    else:
-        refine_results = {}
+def api_keys() -> list[str]:
+    """Keys to spread workers over: MESHY_API_KEYS (comma-separated), else API_KEY."""
+    keys = [k.strip() for k in os.environ.get("MESHY_API_KEYS", "").split(",") if k.strip()]
+    return keys or [API_KEY]
+
+
+def configure_worker(args):
+    """Scale this process's rate and concurrency limits to its share of the key and machine."""
+    global _limiter, PREVIEW_CONCURRENCY, REFINE_CONCURRENCY, OPTIMIZE_CONCURRENCY
+    share = max(1, args.key_share)
+    if share > 1:
+        # Workers on the same key split its request rate and task slots
+        _limiter = RateLimiter(API_RATE / share, max(1, API_BURST // share))
+        PREVIEW_CONCURRENCY = max(1, PREVIEW_CONCURRENCY // share)
+        REFINE_CONCURRENCY = max(1, REFINE_CONCURRENCY // share)
+    if args.shard:
+        OPTIMIZE_CONCURRENCY = max(1, OPTIMIZE_CONCURRENCY // args.shard[1])
+
+
+def update_worker_status(path: Path | None, **fields):
+    """Merge fields into a worker's status file, read by the coordinating process."""
+    if path is None:
+        return
+    status = read_worker_status(path)
+    status.update(fields, updated=time.time())
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        tmp.write_text(json.dumps(status))
+        os.replace(tmp, path)
+    except OSError:
+        pass  # the reader has it open (Windows); the next update catches up
+
+
+def read_worker_status(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def run_workers(args) -> int:
+    """Run generate in args.workers processes over disjoint shards, showing merged progress.
 
-    # ── PHASE 5: Download all models ──
-    print("\n--- PHASE 5: Downloading models ---")
+    Worker i takes the requests whose cache key falls in shard i and the i-th
+    key of api_keys() (round-robin; workers sharing a key split its limits).
+    All workers journal into the same state under the state lock. The atlas and
+    icon stages run once here, after every worker has exited.
+    """
+    count = args.workers
+    keys = api_keys()
+    worker_keys = [keys[i % len(keys)] for i in range(count)]
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    WORKER_STATUS_DIR.mkdir(parents=True, exist_ok=True)
+    for stale in WORKER_STATUS_DIR.glob("worker-*.json"):
+        stale.unlink()
+
+    print("=" * 60)
+    print(f"Meshy AI 3D Asset Generator: {count} workers on {len(set(worker_keys))} API key(s)")
+    print("=" * 60)
     sys.stdout.flush()
-    asset_map = {a["name"]: a for a in ASSETS}
-    successes = 0
-    failures = 0
 
-    for asset in to_generate:
-        name = asset["name"]
-        output_path = ASSETS_DIR / asset["output_dir"] / asset["filename"]
+    workers = []
+    for i, key in enumerate(worker_keys):
+        status = WORKER_STATUS_DIR / f"worker-{i}.json"
+        command = [
+            sys.executable, str(Path(__file__).resolve()), "generate",
+            "--shard", f"{i}/{count}", "--key-share", str(worker_keys.count(key)), "--status", str(status),
+            "--trace", str(TRACE_DIR / f"{stamp}-w{i}.jsonl"), "--unreferenced", args.unreferenced,
+            "--no-atlas", "--no-icons", "--no-check",
+        ] + (["--no-optimize"] if args.no_optimize else [])
+        if args.hedge_budget is not None:
+            # Each worker gets its share, the first ones rounding up
+            command += ["--hedge-budget", str(args.hedge_budget // count + (i < args.hedge_budget % count))]
+        proc = subprocess.Popen(command, env={**os.environ, "MESHY_API_KEY": key}, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, text=True, bufsize=1)
+        relay = threading.Thread(target=_relay_output, args=(proc, f"[w{i}]"), daemon=True)
+        relay.start()
+        workers.append((proc, relay, status))
 
-        # Try refined model first, fallback to preview
-        glb_url = None
-        if name in refine_results and refine_results[name]:
-            glb_url = refine_results[name].get("model_urls", {}).get("glb")
-        if not glb_url and name in preview_results and preview_results[name]:
-            glb_url = preview_results[name].get("model_urls", {}).get("glb")
-            if glb_url:
-                print(f"  {name}: using preview model (refine unavailable)")
-
-        if glb_url:
-            if download_glb(glb_url, output_path):
-                successes += 1
-                state["completed"].append(name)
-            else:
-                failures += 1
-        else:
-            print(f"  {name}: NO model URL available")
-            failures += 1
-        sys.stdout.flush()
+    last_report = time.monotonic()
+    while any(proc.poll() is None for proc, _, _ in workers):
+        time.sleep(0.2)
+        if time.monotonic() - last_report >= POLL_INTERVAL:
+            last_report = time.monotonic()
+            log(format_worker_progress([read_worker_status(status) for _, _, status in workers]))
 
-    save_state(state)
+    statuses = []
+    for proc, relay, status in workers:
+        relay.join()
+        statuses.append({**read_worker_status(status), "exit": proc.returncode})
+    succeeded = sum(s.get("done", 0) for s in statuses)
+    failed = sum(s.get("failed", 0) for s in statuses)
+    restored = sum(s.get("restored", 0) for s in statuses)
+    checked = finish_run(args) if succeeded or restored else True
 
     print("\n" + "=" * 60)
-    print(f"DONE: {successes} succeeded, {failures} failed")
-    already = len(ASSETS) - len(to_generate)
-    if already:
-        print(f"  ({already} were already completed)")
+    print(f"ALL WORKERS DONE: {succeeded} succeeded, {failed} failed, {restored} restored from cache")
+    for i, s in enumerate(statuses):
+        print(f"  w{i}: exit {s['exit']}, {s.get('done', 0)}/{s.get('total', '?')} succeeded, "
+              f"{s.get('failed', 0)} failed")
     print("=" * 60)
     sys.stdout.flush()
+    return 0 if checked and all(s["exit"] == 0 for s in statuses) else 1
+
+
+def _relay_output(proc: subprocess.Popen, prefix: str):
+    for line in proc.stdout:
+        log(f"{prefix} {line.rstrip()}")
+
+
+def format_worker_progress(statuses: list[dict]) -> str:
+    done = sum(s.get("done", 0) for s in statuses)
+    failed = sum(s.get("failed", 0) for s in statuses)
+    total = sum(s.get("total", 0) for s in statuses)
+    per_worker = " ".join(f"w{i} {s.get('done', 0)}/{s.get('total', '?')}" for i, s in enumerate(statuses))
+    line = f"  Progress: {done}/{total} done, {failed} failed ({per_worker})"
+    running = [f"w{i}:{name}({p})" for i, s in enumerate(statuses) for name, p in s.get("active", {}).items()]
+    if running:
+        extra = f" +{len(running) - 8} more" if len(running) > 8 else ""
+        line += f"\n  Waiting: {', '.join(running[:8])}{extra}"
+    return line
+
+
+def finish_run(args) -> bool:
+    """Batch stages over the whole catalog, once models were (re)installed.
+
+    Returns False when the model check found a regression.
+    """
+    if not args.no_atlas:
+        pack_texture_atlases()
+    refresh_variant_scenes()
+    if not args.no_icons:
+        bake_item_icons()
+    if args.no_check:
+        return True
+    report = inspect_models(model_catalog())
+    print(f"  [check] {len(report['models'])} models checked in {report['seconds'] * 1000:.0f} ms")
+    details = format_inspect_report(report, verbose=False)
+    if details:
+        print(details)
+    return not any(m["regressed"] for m in report["models"].values())
+
+
+def model_catalog(missing: bool = False) -> dict[str, tuple[dict, Path]]:
+    """{name: (asset, path)} of ASSETS models and unclaimed GLBs in Assets/Models; only those on disk unless missing.
+
+    A variant is listed only while it still ships the GLB its scene replaces.
+    """
+    models = {}
+    for asset in map(resolved_asset, ASSETS):
+        path = shipped_glb(asset)
+        if "variant_of" not in asset:
+            models[asset["name"]] = (asset, path)
+        elif path.is_file():  # a variant's scene has no geometry of its own, the GLB it replaces does
+            models[asset["name"]] = ({**asset, "filename": path.name}, path)
+    claimed = {path for _, path in models.values()}
+    for path in sorted((ASSETS_DIR / "Models").glob("*/*.glb")):
+        if path not in claimed:
+            output_dir = path.parent.relative_to(ASSETS_DIR).as_posix()
+            name = path.stem if path.stem not in models else f"{output_dir}/{path.stem}"
+            models[name] = ({"name": name, "output_dir": output_dir, "filename": path.name}, path)
+    if not missing:
+        models = {name: model for name, model in models.items() if model[1].is_file()}
+    return models
+
+
+def inspect_models(models: dict[str, tuple[dict, Path]], accept: bool = False) -> dict:
+    """Check models with glb_inspect against the index in MODEL_INDEX_FILE."""
+    started = time.perf_counter()
+    index = ModelIndex(ASSETS_DIR, MODEL_INDEX_FILE)
+    report = check_models(models, index, accept=set(models) if accept else frozenset())
+    report.update(seconds=time.perf_counter() - started, hashed=index.hashed, parsed=index.inspected)
+    return report
+
+
+def asset_res_path(asset: dict) -> str:
+    return f"res://Assets/{asset['output_dir']}/{asset['filename']}"
+
+
+def shipped_glb(asset: dict) -> Path:
+    """An asset's own GLB; for a variant, the .glb its scene replaces (on disk only until the scene is installed)."""
+    path = ASSETS_DIR / asset["output_dir"] / asset["filename"]
+    return path.with_suffix(".glb")
+
+
+def replaced_model_res_path(asset: dict) -> str:
+    """The .glb a variant's scene replaces: what items reference until the scene is installed."""
+    return asset_res_path(asset).rsplit(".", 1)[0] + ".glb"
+
+
+def asset_in_use(asset: dict, used: set[str]) -> bool:
+    """True if the game uses the model directly, through its LOD wrapper, or (a variant) by the GLB it replaces."""
+    path = asset_res_path(asset)
+    if "variant_of" in asset:
+        return path in used or replaced_model_res_path(asset) in used
+    return path in used or path[: -len(".glb")] + LOD_SUFFIX + ".tscn" in used
+
+
+def scan_references() -> ReferenceIndex:
+    return ReferenceIndex(PROJECT_ROOT, REFS_CACHE_FILE).scan()
+
+
+def prioritize_jobs(jobs: dict[str, list[dict]], unreferenced: str,
+                    variants: dict[str, list[dict]] | None = None) -> dict[str, list[dict]]:
+    """Put requests for models the game uses first; defer or drop the rest.
+
+    A request counts as used when the game uses one of its assets or of the variants derived from it.
+    """
+    if unreferenced == "include":
+        return jobs
+    variants = variants or {}
+    used = scan_references().reachable()
+    wanted, deferred = {}, {}
+    for key, assets in jobs.items():
+        is_used = any(asset_in_use(a, used) for a in assets + variants.get(key, []))
+        (wanted if is_used else deferred)[key] = assets
+    names = [a["name"] for key, assets in deferred.items() for a in assets + variants.get(key, [])]
+    if names and unreferenced == "skip":
+        print(f"  Skipping {len(names)} unreferenced assets: {', '.join(names)}")
+        return wanted
+    if names:
+        print(f"  Deferring {len(names)} unreferenced assets behind {len(wanted)} referenced requests")
+    return {**wanted, **deferred}
+
+
+def cmd_refs(args) -> int:
+    """Report referenced models, unreferenced ASSETS entries and orphaned models on disk."""
+    started = time.perf_counter()
+    index = scan_references()
+    elapsed = time.perf_counter() - started
+    used = index.used_models()
+    referenced = index.referenced_models()
+    on_disk = index.models_on_disk(ASSETS_DIR / "Models")
+
+    print(f"Scanned {len(index.edges)} files in {elapsed * 1000:.0f} ms ({index.reparsed} re-parsed)")
+    print(f"\nReferenced models ({len(used)}):")
+    for path in sorted(used):
+        status = "" if path in on_disk else "  MISSING"
+        print(f"  {path}{status}  <- {', '.join(index.referrers(path))}")
+
+    unreachable = sorted(referenced - used)
+    if unreachable:
+        print(f"\nReferenced only from unreachable files ({len(unreachable)}):")
+        for path in unreachable:
+            print(f"  {path}  <- {', '.join(index.referrers(path))}")
+
+    reachable = index.reachable()
+    unused_assets = [a["name"] for a in ASSETS if not asset_in_use(a, reachable)]
+    print(f"\nASSETS entries nothing uses ({len(unused_assets)}): {', '.join(unused_assets)}")
+
+    orphans = {path: size for path, size in on_disk.items() if path not in used}
+    print(f"\nOrphaned models on disk ({len(orphans)}, {sum(orphans.values()) / 1024:.1f} KB shipped for nothing):")
+    for path, size in orphans.items():
+        print(f"  {path} ({size / 1024:.1f} KB)")
+    return 0
+
+
+def cmd_inspect(args) -> int:
+    models = model_catalog(missing=bool(args.names))
+    unknown = set(args.names) - set(models)
+    if unknown:
+        print(f"Unknown assets: {', '.join(sorted(unknown))}")
+        return 1
+    if args.accept and not args.names:
+        print("--accept needs the names of the models to accept")
+        return 1
+    if args.names:
+        models = {name: models[name] for name in args.names}
+    report = inspect_models(models, accept=args.accept)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"Checked {len(report['models'])} models in {report['seconds'] * 1000:.0f} ms "
+              f"({report['hashed']} hashed, {report['parsed']} parsed)\n")
+        print(format_inspect_report(report))
+    failed = report["broken"] or any(m["regressed"] for m in report["models"].values())
+    if args.strict:
+        failed = failed or report["missing"] or any(m["over"] for m in report["models"].values())
+    return 1 if failed else 0
+
+
+def cmd_cache(args) -> int:
+    """List cache entries, or evict the ones no current asset definition hashes to."""
+    with _state_lock:  # don't interleave with a running generate's journal
+        return _cache(args)
+
+
+def _cache(args) -> int:
+    state = load_state()
+    live = {asset_key(asset) for asset in ASSETS}
+
+    if args.action == "list":
+        for key, entry in sorted(state["cache"].items(), key=lambda kv: kv[1].get("name", "")):
+            path = CACHE_DIR / entry["glb"] if entry.get("glb") else None
+            size = f"{path.stat().st_size / 1024:.1f} KB" if path and path.exists() else "no model"
+            status = "live" if key in live else "stale"
+            print(f"  {entry.get('name', '?'):20s} {key[:12]}  {status:5s}  {size}")
+        return 0
+
+    evict = [key for key in state["cache"] if args.all or key not in live]
+    freed = 0
+    for key in evict:
+        entry = state["cache"][key]
+        path = CACHE_DIR / entry["glb"] if entry.get("glb") else None
+        if path and path.exists():
+            freed += path.stat().st_size
+            if not args.dry_run:
+                path.unlink()
+        print(f"  evict {entry.get('name', '?')} ({key[:12]})")
+        if not args.dry_run:
+            del state["cache"][key]
+
+    # Model files no entry points at (e.g. left by an interrupted eviction)
+    known = {entry.get("glb") for entry in state["cache"].values()}
+    if CACHE_DIR.exists():
+        for path in CACHE_DIR.glob("*.glb"):
+            if path.name not in known:
+                freed += path.stat().st_size
+                print(f"  remove orphaned {path.name}")
+                if not args.dry_run:
+                    path.unlink()
+
+    if not args.dry_run:
+        save_state(state)
+    verb = "Would free" if args.dry_run else "Freed"
+    print(f"\n{verb} {freed / 1024:.1f} KB from {len(evict)} cache entries")
+    return 0
+
+
+def cmd_report(args) -> int:
+    paths = args.traces or latest_traces(TRACE_DIR)
+    missing = [path for path in paths if not path.is_file()]
+    if not paths or missing:
+        print(f"No trace found{f' at {missing[0]}' if missing else f' in {TRACE_DIR}'}")
+        return 1
+    summary = summarize([event for path in paths for event in load_events(path)])
+    if args.json:
+        print(json.dumps(summary, indent=2, default=float))
+    else:
+        print(f"Trace: {', '.join(str(path) for path in paths)}\n")
+        print(format_summary(summary))
+    return 0
+
 
-    return 0 if failures == 0 else 1
+def main(argv: list[str] | None = None):
+    args = parse_args(argv)
+    if args.command == "optimize":
+        return cmd_optimize(args)
+    if args.command == "cache":
+        return cmd_cache(args)
+    if args.command == "refs":
+        return cmd_refs(args)
+    if args.command == "inspect":
+        return cmd_inspect(args)
+    if args.command == "atlas":
+        return cmd_atlas(args)
+    if args.command == "icons":
+        return cmd_icons(args)
+    if args.command == "report":
+        return cmd_report(args)
+    return cmd_generate(args)
 
 
 if __name__ == "__main__":
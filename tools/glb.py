@@ -0,0 +1,380 @@
+"""
+Minimal GLB (binary glTF 2.0) reader/writer for the asset tools.
+
+Keeps the glTF JSON as a plain dict and the payload of every bufferView as
+bytes. Accessors are read as NumPy arrays and new ones are appended with
+add_accessor(); compact() drops whatever is no longer referenced and
+to_bytes()/save() repack the single binary buffer from what is left.
+"""
+
+import json
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+
+GLB_MAGIC = b"glTF"
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+MODE_TRIANGLES = 4
+
+COMPONENT_DTYPES = {
+    5120: np.dtype(np.int8),
+    5121: np.dtype(np.uint8),
+    5122: np.dtype(np.int16),
+    5123: np.dtype(np.uint16),
+    5125: np.dtype(np.uint32),
+    5126: np.dtype(np.float32),
+}
+DTYPE_COMPONENTS = {dtype: code for code, dtype in COMPONENT_DTYPES.items()}
+TYPE_SIZES = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT2": 4, "MAT3": 9, "MAT4": 16}
+SIZE_TYPES = {1: "SCALAR", 2: "VEC2", 3: "VEC3", 4: "VEC4"}
+
+
+class GLBError(ValueError):
+    pass
+
+
+def _align(n: int, alignment: int = 4) -> int:
+    return (n + alignment - 1) // alignment * alignment
+
+
+def read_gltf(path: Path) -> dict:
+    """Read only the JSON chunk of a GLB; the binary payload is never loaded."""
+    with open(path, "rb") as f:
+        header = f.read(20)
+        if len(header) < 20:
+            raise GLBError("file too short for a GLB header")
+        magic, version, _, chunk_length, chunk_type = struct.unpack("<4sIIII", header)
+        if magic != GLB_MAGIC or version != 2:
+            raise GLBError("not a glTF 2.0 binary file")
+        if chunk_type != CHUNK_JSON:
+            raise GLBError("GLB does not start with a JSON chunk")
+        chunk = f.read(chunk_length)
+    if len(chunk) < chunk_length:
+        raise GLBError("truncated GLB JSON chunk")
+    return json.loads(chunk.decode("utf-8"))
+
+
+def node_matrix(node: dict) -> np.ndarray:
+    """A node's local transform (matrix, or TRS) as a 4x4 column-vector matrix."""
+    if "matrix" in node:
+        return np.array(node["matrix"], dtype=np.float64).reshape(4, 4).T
+    x, y, z, w = node.get("rotation", (0.0, 0.0, 0.0, 1.0))
+    rotation = np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+    ])
+    matrix = np.eye(4)
+    matrix[:3, :3] = rotation * np.array(node.get("scale", (1.0, 1.0, 1.0)))
+    matrix[:3, 3] = node.get("translation", (0.0, 0.0, 0.0))
+    return matrix
+
+
+def mesh_instances(gltf: dict):
+    """Yield (mesh index, world matrix) for every mesh node in the default scene."""
+    scenes = gltf.get("scenes", [])
+    if scenes:
+        roots = scenes[gltf.get("scene", 0)].get("nodes", [])
+    else:
+        roots = range(len(gltf.get("nodes", [])))
+    stack = [(n, np.eye(4)) for n in roots]
+    while stack:
+        index, parent = stack.pop()
+        node = gltf["nodes"][index]
+        world = parent @ node_matrix(node)
+        if "mesh" in node:
+            yield node["mesh"], world
+        stack += [(c, world) for c in node.get("children", [])]
+
+
+class GLB:
+    def __init__(self, gltf: dict, views: list[bytes]):
+        self.gltf = gltf
+        self.views = views  # payload of each bufferView, same order as gltf["bufferViews"]
+        self.path = None  # file the GLB was loaded from; external image URIs resolve against it
+
+    @classmethod
+    def load(cls, path: Path) -> "GLB":
+        glb = cls.from_bytes(Path(path).read_bytes())
+        glb.path = Path(path)
+        return glb
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "GLB":
+        if len(data) < 20:
+            raise GLBError("file too short for a GLB header")
+        magic, version, length = struct.unpack_from("<4sII", data, 0)
+        if magic != GLB_MAGIC or version != 2:
+            raise GLBError("not a glTF 2.0 binary file")
+        if length > len(data):
+            raise GLBError(f"truncated GLB ({len(data)} of {length} bytes)")
+
+        gltf = None
+        binary = b""
+        offset = 12
+        while offset + 8 <= length:
+            chunk_length, chunk_type = struct.unpack_from("<II", data, offset)
+            chunk = data[offset + 8:offset + 8 + chunk_length]
+            if chunk_type == CHUNK_JSON and gltf is None:
+                gltf = json.loads(chunk.decode("utf-8"))
+            elif chunk_type == CHUNK_BIN and not binary:
+                binary = chunk
+            offset += 8 + _align(chunk_length)
+        if gltf is None:
+            raise GLBError("GLB has no JSON chunk")
+
+        buffers = gltf.get("buffers", [])
+        if len(buffers) > 1 or any("uri" in b for b in buffers):
+            raise GLBError("only self-contained GLBs with a single embedded buffer are supported")
+
+        views = []
+        for view in gltf.get("bufferViews", []):
+            start = view.get("byteOffset", 0)
+            views.append(bytes(binary[start:start + view["byteLength"]]))
+        return cls(gltf, views)
+
+    # ── Accessors ──
+
+    def read_accessor(self, index: int) -> np.ndarray:
+        """Return accessor data as an (count,) or (count, n) array.
+
+        Normalized integer accessors are decoded to float32 in [0, 1] / [-1, 1].
+        """
+        accessor = self.gltf["accessors"][index]
+        if "sparse" in accessor:
+            raise GLBError("sparse accessors are not supported")
+        dtype = COMPONENT_DTYPES[accessor["componentType"]]
+        size = TYPE_SIZES[accessor["type"]]
+        count = accessor["count"]
+
+        if "bufferView" not in accessor:
+            array = np.zeros((count, size), dtype=dtype)
+        else:
+            view = self.gltf["bufferViews"][accessor["bufferView"]]
+            payload = self.views[accessor["bufferView"]]
+            offset = accessor.get("byteOffset", 0)
+            element = dtype.itemsize * size
+            stride = view.get("byteStride") or element
+            array = np.ndarray(
+                (count, size), dtype=dtype, buffer=payload, offset=offset,
+                strides=(stride, dtype.itemsize),
+            ).copy()
+
+        if accessor.get("normalized"):
+            info = np.iinfo(dtype)
+            array = array.astype(np.float32) / info.max
+            if info.min < 0:
+                array = np.maximum(array, -1.0)
+        return array[:, 0] if size == 1 else array
+
+    def add_view(self, payload: bytes, target: int | None = None, stride: int | None = None) -> int:
+        view = {"buffer": 0, "byteLength": len(payload)}
+        if stride:
+            view["byteStride"] = stride
+        if target:
+            view["target"] = target
+        self.gltf.setdefault("bufferViews", []).append(view)
+        self.views.append(bytes(payload))
+        return len(self.views) - 1
+
+    def add_accessor(self, array: np.ndarray, target: int | None = None,
+                     normalized: bool = False, bounds: bool = False) -> int:
+        """Append array as a new tightly packed accessor and return its index.
+
+        Vertex attribute elements that are not a multiple of 4 bytes are padded
+        with a byteStride, as the glTF spec requires.
+        """
+        array = np.ascontiguousarray(array)
+        size = 1 if array.ndim == 1 else array.shape[1]
+        rows = array.reshape(len(array), size)
+        element = rows.itemsize * size
+        stride = None
+        if target == ARRAY_BUFFER and element % 4:
+            stride = _align(element)
+            padded = np.zeros((len(rows), stride), dtype=np.uint8)
+            padded[:, :element] = rows.view(np.uint8).reshape(len(rows), element)
+            payload = padded.tobytes()
+        else:
+            payload = rows.tobytes()
+
+        accessor = {
+            "bufferView": self.add_view(payload, target, stride),
+            "componentType": DTYPE_COMPONENTS[rows.dtype],
+            "count": len(rows),
+            "type": SIZE_TYPES[size],
+        }
+        if normalized:
+            accessor["normalized"] = True
+        if bounds and len(rows):
+            accessor["min"] = rows.min(axis=0).tolist()
+            accessor["max"] = rows.max(axis=0).tolist()
+        self.gltf.setdefault("accessors", []).append(accessor)
+        return len(self.gltf["accessors"]) - 1
+
+    # ── Images ──
+
+    def image_bytes(self, index: int) -> bytes | None:
+        """Embedded image payload, or the referenced file for a relative URI next to the GLB."""
+        image = self.gltf["images"][index]
+        if "bufferView" in image:
+            return self.views[image["bufferView"]]
+        uri = image.get("uri", "")
+        if not uri or uri.startswith("data:") or self.path is None:
+            return None
+        external = self.path.parent / uri
+        return external.read_bytes() if external.is_file() else None
+
+    def set_image_bytes(self, index: int, payload: bytes, mime_type: str | None = None):
+        image = self.gltf["images"][index]
+        image.pop("uri", None)
+        image["bufferView"] = self.add_view(payload)
+        if mime_type:
+            image["mimeType"] = mime_type
+
+    def set_image_uri(self, index: int, uri: str):
+        """Point an image at an external file instead of embedded bytes."""
+        image = self.gltf["images"][index]
+        image.pop("bufferView", None)
+        image.pop("mimeType", None)
+        image["uri"] = uri
+
+    # ── Garbage collection ──
+
+    def compact(self):
+        """Drop unreferenced accessors, bufferViews, images, textures, samplers and materials."""
+        gltf = self.gltf
+        meshes = gltf.get("meshes", [])
+        primitives = [p for mesh in meshes for p in mesh.get("primitives", [])]
+
+        used_materials = {p["material"] for p in primitives if "material" in p}
+        material_map = self._remap("materials", used_materials)
+        for p in primitives:
+            if "material" in p:
+                p["material"] = material_map[p["material"]]
+
+        used_textures = set()
+        for material in gltf.get("materials", []):
+            for info in _texture_infos(material):
+                used_textures.add(info["index"])
+        texture_map = self._remap("textures", used_textures)
+        for material in gltf.get("materials", []):
+            for info in _texture_infos(material):
+                info["index"] = texture_map[info["index"]]
+
+        used_images, used_samplers = set(), set()
+        for texture in gltf.get("textures", []):
+            for holder in _image_sources(texture):
+                used_images.add(holder["source"])
+            if "sampler" in texture:
+                used_samplers.add(texture["sampler"])
+        image_map = self._remap("images", used_images)
+        sampler_map = self._remap("samplers", used_samplers)
+        for texture in gltf.get("textures", []):
+            for holder in _image_sources(texture):
+                holder["source"] = image_map[holder["source"]]
+            if "sampler" in texture:
+                texture["sampler"] = sampler_map[texture["sampler"]]
+
+        accessor_refs = []  # (container, key) pairs that hold an accessor index
+        for p in primitives:
+            attributes = p.get("attributes", {})
+            accessor_refs += [(attributes, k) for k in attributes]
+            if "indices" in p:
+                accessor_refs.append((p, "indices"))
+            for target in p.get("targets", []):
+                accessor_refs += [(target, k) for k in target]
+        for skin in gltf.get("skins", []):
+            if "inverseBindMatrices" in skin:
+                accessor_refs.append((skin, "inverseBindMatrices"))
+        for animation in gltf.get("animations", []):
+            for sampler in animation.get("samplers", []):
+                accessor_refs += [(sampler, "input"), (sampler, "output")]
+        accessor_map = self._remap("accessors", {c[k] for c, k in accessor_refs})
+        for container, key in accessor_refs:
+            container[key] = accessor_map[container[key]]
+
+        view_refs = []
+        for accessor in gltf.get("accessors", []):
+            if "bufferView" in accessor:
+                view_refs.append(accessor)
+            if "sparse" in accessor:
+                view_refs += [accessor["sparse"]["indices"], accessor["sparse"]["values"]]
+        view_refs += [image for image in gltf.get("images", []) if "bufferView" in image]
+        used_views = sorted({ref["bufferView"] for ref in view_refs})
+        view_map = {old: new for new, old in enumerate(used_views)}
+        gltf["bufferViews"] = [gltf["bufferViews"][i] for i in used_views]
+        self.views = [self.views[i] for i in used_views]
+        for ref in view_refs:
+            ref["bufferView"] = view_map[ref["bufferView"]]
+        if not gltf["bufferViews"]:
+            del gltf["bufferViews"]
+
+    def _remap(self, key: str, used: set[int]) -> dict[int, int]:
+        items = self.gltf.get(key)
+        if items is None:
+            return {}
+        keep = sorted(used)
+        self.gltf[key] = [items[i] for i in keep]
+        if not self.gltf[key]:
+            del self.gltf[key]
+        return {old: new for new, old in enumerate(keep)}
+
+    # ── Writing ──
+
+    def to_bytes(self) -> bytes:
+        binary = bytearray()
+        for view, payload in zip(self.gltf.get("bufferViews", []), self.views):
+            binary += b"\0" * (_align(len(binary)) - len(binary))
+            view["buffer"] = 0
+            view["byteOffset"] = len(binary)
+            view["byteLength"] = len(payload)
+            binary += payload
+        binary += b"\0" * (_align(len(binary)) - len(binary))
+        if binary:
+            self.gltf["buffers"] = [{"byteLength": len(binary)}]
+        else:
+            self.gltf.pop("buffers", None)
+
+        json_chunk = json.dumps(self.gltf, separators=(",", ":")).encode("utf-8")
+        json_chunk += b" " * (_align(len(json_chunk)) - len(json_chunk))
+        chunks = struct.pack("<II", len(json_chunk), CHUNK_JSON) + json_chunk
+        if binary:
+            chunks += struct.pack("<II", len(binary), CHUNK_BIN) + bytes(binary)
+        return struct.pack("<4sII", GLB_MAGIC, 2, 12 + len(chunks)) + chunks
+
+    def save(self, path: Path):
+        """Write atomically: a temp file next to path, then rename over it."""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(self.to_bytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+
+def _texture_infos(node):
+    """Yield every textureInfo dict ({"index": n, ...}) inside a material."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key.endswith("Texture") and isinstance(value, dict) and "index" in value:
+                yield value
+            yield from _texture_infos(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _texture_infos(value)
+
+
+def _image_sources(texture: dict):
+    """Yield the texture itself and any extension dicts that carry an image "source"."""
+    if "source" in texture:
+        yield texture
+    for extension in texture.get("extensions", {}).values():
+        if isinstance(extension, dict) and "source" in extension:
+            yield extension
@@ -0,0 +1,294 @@
+"""
+Fast model inspection and per-asset budgets for Assets/Models.
+
+Reads only the JSON chunk of each GLB (see glb.read_gltf): triangle and
+vertex counts come from accessor counts, the bounding box from the POSITION
+accessors' min/max placed by the node transforms, texture bytes from the
+lengths of the embedded image bufferViews. The binary payload is never
+decoded.
+
+Results live in an index (tools/.cache/glb_index.json) keyed by file content
+hash, with each file's mtime and size in front of it, so re-checking an
+unchanged tree only stats files and a model restored byte-for-byte is not
+parsed again.
+
+Each model is checked against a budget derived from its asset entry:
+
+  triangles      target_polycount plus TRIANGLE_SLACK; a model with LODs
+                 also gets its extra levels' share (glb_lod.lod_budget_factor)
+  texture_bytes  one texture per channel the optimizer keeps for the
+                 category, at its max texture size and TEXTURE_BYTES_PER_TEXEL
+  bytes          texture_bytes plus GEOMETRY_BYTES_PER_TRIANGLE per triangle
+  materials      per category
+
+and against its baseline: the stats recorded when it was first checked under
+its current asset definition, or last accepted. Passing runs leave the
+baseline alone, so growth that creeps in a little per run still adds up to a
+regression. A model whose asset definition is unchanged but that grew past
+REGRESSION_TOLERANCE on any of those metrics has regressed. Textures on
+shared atlas pages (external URIs) are listed but not counted against a
+model.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from glb import MODE_TRIANGLES, mesh_instances, read_gltf
+from glb_lod import lod_budget_factor
+from glb_optimize import ITEM_DROPPED_CHANNELS, dropped_channels, texture_budget
+
+INDEX_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+
+TRIANGLE_SLACK = 0.10
+DEFAULT_TRIANGLE_BUDGET = 5000  # models without a target_polycount
+TEXTURE_BYTES_PER_TEXEL = 1.0  # compressed; JPEG/PNG base colors land well under this
+GEOMETRY_BYTES_PER_TRIANGLE = 48  # indices plus position/normal/uv of the ~0.6 vertices per triangle
+FILE_OVERHEAD_BYTES = 16 * 1024  # JSON chunk and padding
+MATERIAL_BUDGET = {
+    "Models/Items": 2,
+    "Models/Food": 2,
+    "Models/Weapons": 2,
+    "Models/Armor": 2,
+}
+DEFAULT_MATERIAL_BUDGET = 4
+REGRESSION_TOLERANCE = 0.05
+CHECKED_METRICS = ("triangles", "texture_bytes", "bytes", "materials")
+
+MODE_TRIANGLE_STRIP = 5
+MODE_TRIANGLE_FAN = 6
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def inspect_glb(path: Path) -> dict:
+    """Stats of a GLB from its JSON chunk alone."""
+    path = Path(path)
+    gltf = read_gltf(path)
+    accessors = gltf.get("accessors", [])
+    meshes = gltf.get("meshes", [])
+    stats = {
+        "bytes": path.stat().st_size,
+        "triangles": 0,
+        "vertices": 0,
+        "draw_calls": 0,
+        "materials": len(gltf.get("materials", [])),
+        "textures": 0,
+        "texture_bytes": 0,
+        "shared_textures": [],
+        "bounds": None,
+    }
+
+    low, high = np.full(3, np.inf), np.full(3, -np.inf)
+    for mesh_index, world in mesh_instances(gltf):
+        for prim in meshes[mesh_index].get("primitives", []):
+            position = accessors[prim["attributes"]["POSITION"]] if "POSITION" in prim["attributes"] else None
+            vertices = position["count"] if position else 0
+            elements = accessors[prim["indices"]]["count"] if "indices" in prim else vertices
+            mode = prim.get("mode", MODE_TRIANGLES)
+            if mode == MODE_TRIANGLES:
+                stats["triangles"] += elements // 3
+            elif mode in (MODE_TRIANGLE_STRIP, MODE_TRIANGLE_FAN):
+                stats["triangles"] += max(elements - 2, 0)
+            stats["vertices"] += vertices
+            stats["draw_calls"] += 1
+            if position and "min" in position and "max" in position:
+                corners = _box_corners(position["min"], position["max"]) @ world[:3, :3].T + world[:3, 3]
+                low = np.minimum(low, corners.min(axis=0))
+                high = np.maximum(high, corners.max(axis=0))
+    if np.isfinite(low).all():
+        stats["bounds"] = [[round(float(v), 4) for v in low], [round(float(v), 4) for v in high]]
+
+    views = gltf.get("bufferViews", [])
+    for image in gltf.get("images", []):
+        stats["textures"] += 1
+        if "bufferView" in image:
+            stats["texture_bytes"] += views[image["bufferView"]]["byteLength"]
+        elif image.get("uri", "").startswith("data:"):
+            stats["texture_bytes"] += len(image["uri"]) * 3 // 4
+        elif image.get("uri"):
+            stats["shared_textures"].append(image["uri"])
+    return stats
+
+
+def _box_corners(low: list[float], high: list[float]) -> np.ndarray:
+    low, high = np.asarray(low[:3], dtype=np.float64), np.asarray(high[:3], dtype=np.float64)
+    return np.array([[(high if i & bit else low)[axis] for axis, bit in enumerate((1, 2, 4))] for i in range(8)])
+
+
+def model_budget(asset: dict) -> dict:
+    triangles = int((asset.get("target_polycount") or DEFAULT_TRIANGLE_BUDGET) * (1 + TRIANGLE_SLACK)
+                    * lod_budget_factor(asset))
+    edge = texture_budget(asset)
+    textures = 1 + len(ITEM_DROPPED_CHANNELS) - len(dropped_channels(asset))
+    texture_bytes = int(textures * edge * edge * TEXTURE_BYTES_PER_TEXEL)
+    return {
+        "triangles": triangles,
+        "texture_bytes": texture_bytes,
+        "bytes": texture_bytes + triangles * GEOMETRY_BYTES_PER_TRIANGLE + FILE_OVERHEAD_BYTES,
+        "materials": MATERIAL_BUDGET.get(asset["output_dir"], DEFAULT_MATERIAL_BUDGET),
+    }
+
+
+def definition_hash(asset: dict) -> str:
+    blob = json.dumps(asset, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+class ModelIndex:
+    """Content-hash-keyed model stats plus per-path baselines, persisted as JSON."""
+
+    def __init__(self, root: Path, index_file: Path | None = None):
+        self.root = Path(root)
+        self.index_file = index_file
+        self.files = {}  # path relative to root -> {"mtime_ns", "size", "hash"}
+        self.stats = {}  # content hash -> inspect_glb() result
+        self.baselines = {}  # path relative to root -> {"definition", "hash", "stats"}
+        self.hashed = 0
+        self.inspected = 0
+        self._load()
+
+    def lookup(self, path: Path) -> tuple[str, dict]:
+        """(content hash, stats) of a model; only re-hashes changed files and only parses unseen content."""
+        path = Path(path)
+        key = path.relative_to(self.root).as_posix()
+        stat = path.stat()
+        entry = self.files.get(key)
+        if not entry or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+            entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "hash": file_hash(path)}
+            self.files[key] = entry
+            self.hashed += 1
+        if entry["hash"] not in self.stats:
+            self.stats[entry["hash"]] = inspect_glb(path)
+            self.inspected += 1
+        return entry["hash"], self.stats[entry["hash"]]
+
+    def save(self):
+        if not self.index_file:
+            return
+        live = {entry["hash"] for entry in self.files.values()} | {b["hash"] for b in self.baselines.values()}
+        self.files = {key: entry for key, entry in self.files.items() if (self.root / key).is_file()}
+        data = {
+            "version": INDEX_VERSION,
+            "files": self.files,
+            "stats": {digest: stats for digest, stats in self.stats.items() if digest in live},
+            "baselines": self.baselines,
+        }
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_file.with_name(self.index_file.name + ".tmp")
+        tmp.write_text(json.dumps(data, separators=(",", ":")))
+        os.replace(tmp, self.index_file)
+
+    def _load(self):
+        if not self.index_file or not self.index_file.exists():
+            return
+        try:
+            data = json.loads(self.index_file.read_text())
+        except ValueError:
+            return
+        if data.get("version") != INDEX_VERSION:
+            return
+        self.files = data.get("files", {})
+        self.stats = data.get("stats", {})
+        self.baselines = data.get("baselines", {})
+
+
+def check_models(models: dict[str, tuple[dict, Path]], index: ModelIndex, accept: set[str] = frozenset()) -> dict:
+    """Inspect models ({asset name: (asset, GLB path)}) and check budgets and baselines.
+
+    A model's baseline is set to its current stats only when it has none, its
+    definition changed or its name is in accept; otherwise it stays put, so a
+    regression keeps failing until it is fixed or accepted.
+
+    Returns {"models": {name: {"path", "stats", "budget", "over", "regressed"}},
+    "missing": [names], "broken": {name: error}}; "over" maps a metric to
+    (value, budget) and "regressed" to (baseline, value).
+    """
+    report = {"models": {}, "missing": [], "broken": {}}
+    for name, (asset, path) in sorted(models.items()):
+        path = Path(path)
+        if not path.is_file():
+            report["missing"].append(name)
+            continue
+        try:
+            digest, stats = index.lookup(path)
+        except (ValueError, KeyError, IndexError) as e:  # GLBError, bad JSON, dangling indices
+            report["broken"][name] = str(e)
+            continue
+
+        budget = model_budget(asset)
+        over = {m: (stats[m], budget[m]) for m in CHECKED_METRICS if stats[m] > budget[m]}
+
+        key = path.relative_to(index.root).as_posix()
+        definition = definition_hash(asset)
+        baseline = index.baselines.get(key)
+        regressed = {}
+        if baseline and baseline["definition"] == definition and name not in accept:
+            before = baseline["stats"]
+            regressed = {m: (before[m], stats[m]) for m in CHECKED_METRICS
+                         if stats[m] > before[m] * (1 + REGRESSION_TOLERANCE)}
+        else:
+            index.baselines[key] = {"definition": definition, "hash": digest, "stats": stats}
+
+        report["models"][name] = {"path": key, "stats": stats, "budget": budget, "over": over,
+                                  "regressed": regressed}
+    index.save()
+    return report
+
+
+def format_inspect_report(report: dict, verbose: bool = True) -> str:
+    models = report["models"]
+    lines = []
+    if verbose and models:
+        lines.append(f"{'Model':<24}{'tris':>8}{'budget':>8}{'verts':>8}{'mats':>6}{'tex KB':>9}"
+                     f"{'file KB':>9}  {'size (m)':<17}flags")
+        for name, m in sorted(models.items(), key=lambda kv: kv[1]["stats"]["bytes"], reverse=True):
+            stats = m["stats"]
+            bounds = stats["bounds"]
+            size = "x".join(f"{hi - lo:.2f}" for lo, hi in zip(*bounds)) if bounds else "-"
+            flags = [f"over {metric}" for metric in m["over"]] + [f"REGRESSED {metric}" for metric in m["regressed"]]
+            if stats["shared_textures"]:
+                flags.append("atlas")
+            lines.append(f"  {name:<22}{stats['triangles']:>8}{m['budget']['triangles']:>8}{stats['vertices']:>8}"
+                         f"{stats['materials']:>6}{stats['texture_bytes'] / 1024:>9.1f}{stats['bytes'] / 1024:>9.1f}"
+                         f"  {size:<17}{', '.join(flags)}")
+
+    over = {name: m for name, m in models.items() if m["over"]}
+    if over:
+        lines.append(f"\nOver budget ({len(over)}):")
+        for name, m in sorted(over.items()):
+            lines.append(f"  {name}: " + ", ".join(f"{metric} {_amount(metric, value)} > {_amount(metric, limit)}"
+                                                   for metric, (value, limit) in m["over"].items()))
+    if report["missing"] or report["broken"]:
+        lines.append(f"\nNot checked ({len(report['missing']) + len(report['broken'])}):")
+        for name in report["missing"]:
+            lines.append(f"  {name}: no model on disk")
+        for name, error in sorted(report["broken"].items()):
+            lines.append(f"  {name}: unreadable ({error})")
+
+    regressed = {name: m for name, m in models.items() if m["regressed"]}
+    if regressed:
+        lines.append("\n" + "!" * 60)
+        lines.append(f"MODEL REGRESSIONS ({len(regressed)}): grew more than {REGRESSION_TOLERANCE:.0%} "
+                     f"with an unchanged asset definition")
+        for name, m in sorted(regressed.items()):
+            lines.append(f"  {name} ({m['path']}): " + ", ".join(
+                f"{metric} {_amount(metric, before)} -> {_amount(metric, after)}"
+                for metric, (before, after) in m["regressed"].items()))
+        lines.append("Fix them, or accept the new stats with: generate_assets.py inspect --accept NAME...")
+        lines.append("!" * 60)
+    return "\n".join(lines)
+
+
+def _amount(metric: str, value: int) -> str:
+    return f"{value / 1024:.1f} KB" if metric.endswith("bytes") else str(value)
@@ -0,0 +1,248 @@
+"""
+LOD chain generation for models instanced many times (trees, rocks, enemies).
+
+For a model at Assets/<dir>/<name>.glb this rewrites the GLB in place and
+writes one sibling:
+  <name>.glb       every level in one file, as scene roots LOD0, LOD1, ...
+                   LOD0 is the model itself, each further level is the same
+                   node tree with its meshes decimated (glb_optimize.decimate)
+                   to a fraction of the original triangles. Materials and
+                   textures are shared, so the extra levels only add geometry.
+  <name>_lod.tscn  a wrapper scene running Systems/lod_group.gd, which gives
+                   each level a GeometryInstance3D visibility range from the
+                   profile's switch distances.
+
+The model ships once, with its levels; scenes instance it through the wrapper,
+since instancing the .glb directly would draw every level at once. A chain
+built again (or optimized again) starts from LOD0: strip_lods() drops the
+levels, recognised by the LOD_EXTRAS_KEY marker in asset.extras.
+
+LODs are opt-in per asset, since they only pay off for a model the scenes
+instance through the .tscn: "lods": True takes its output directory's profile
+from LOD_PROFILES, or "lods" can be a profile of the same shape. When no chain
+can be built (optimizing skipped or failed), the .tscn instances the plain
+model, so scenes using the wrapper still load.
+"""
+
+import copy
+import os
+from pathlib import Path
+
+from glb import GLB, MODE_TRIANGLES
+from glb_optimize import _read_primitive, _write_primitive, decimate, weld
+
+# Triangle ratio of each extra level (relative to LOD0) and the camera
+# distance in meters at which the previous level hands over to it
+LOD_PROFILES = {
+    "Models/World": {"ratios": [0.5, 0.25, 0.1], "distances": [18.0, 32.0, 50.0]},
+    "Models/Enemies": {"ratios": [0.5, 0.2], "distances": [14.0, 28.0]},
+}
+
+LOD_SCRIPT = "res://Systems/lod_group.gd"
+LOD_SUFFIX = "_lod"
+LOD_EXTRAS_KEY = "lod_ratios"
+
+
+class LODError(ValueError):
+    pass
+
+
+def lod_profile(asset: dict) -> dict | None:
+    profile = asset.get("lods")
+    if profile is True:
+        profile = LOD_PROFILES.get(asset["output_dir"])
+        if profile is None:
+            raise LODError(f"{asset['name']}: no LOD profile for {asset['output_dir']}")
+    if not profile:
+        return None
+    if len(profile["ratios"]) != len(profile["distances"]):
+        raise LODError(f"{asset['name']}: LOD profile needs one distance per ratio")
+    return profile
+
+
+def lod_scene_path(path: Path) -> Path:
+    """<name>_lod.tscn next to path."""
+    return path.with_name(path.stem + LOD_SUFFIX + ".tscn")
+
+
+def lod_budget_factor(asset: dict) -> float:
+    """How many LOD0s' worth of triangles the asset's GLB holds with its levels (1 without LODs)."""
+    profile = lod_profile(asset)
+    return 1 + sum(profile["ratios"]) if profile else 1
+
+
+def generate_lods(asset: dict, path: Path, res_path: str) -> dict | None:
+    """Add the LOD levels to a model and write its wrapper scene. None if the asset doesn't use LODs.
+
+    res_path is the model's own res:// path, which the wrapper instances.
+    """
+    profile = lod_profile(asset)
+    if profile is None:
+        return None
+    path = Path(path)
+    report = build_lod_glb(path, path, profile["ratios"])
+    write_lod_scene(lod_scene_path(path), asset["name"], res_path, profile["distances"])
+    report["distances"] = list(profile["distances"])
+    return report
+
+
+def build_lod_glb(path: Path, output_path: Path, ratios: list[float]) -> dict:
+    """Write a GLB whose scene holds LOD0 (the model) plus one decimated copy per ratio.
+
+    Levels already in path are dropped first, so output_path may be path itself.
+    Returns {"triangles": [count per level], "bytes": size of the written file}.
+    """
+    glb = GLB.load(path)
+    _strip_levels(glb)
+    gltf = glb.gltf
+    if gltf.get("skins") or gltf.get("animations"):
+        raise LODError("skinned or animated models are not supported")
+    scenes = gltf.get("scenes", [])
+    if not scenes:
+        raise LODError("GLB has no scene")
+    scene = scenes[gltf.get("scene", 0)]
+    roots = scene.get("nodes", [])
+
+    used_meshes = sorted({gltf["nodes"][n]["mesh"] for n in _subtree(gltf, roots) if "mesh" in gltf["nodes"][n]})
+    triangles = [sum(_mesh_triangles(glb, m) for m in used_meshes)]
+    levels = {m: [m] for m in used_meshes}  # mesh index -> mesh index at each level
+    for level, ratio in enumerate(ratios, start=1):
+        level_triangles = 0
+        for m in used_meshes:
+            mesh, count = _decimated_mesh(glb, m, ratio, level)
+            gltf["meshes"].append(mesh)
+            levels[m].append(len(gltf["meshes"]) - 1)
+            level_triangles += count
+        triangles.append(level_triangles)
+
+    nodes = gltf["nodes"]
+    lod_roots = []
+    for level in range(len(ratios) + 1):
+        children = roots if level == 0 else [_clone(gltf, n, levels, level) for n in roots]
+        nodes.append({"name": f"LOD{level}", "children": children})
+        lod_roots.append(len(nodes) - 1)
+    scene["nodes"] = lod_roots
+    gltf.setdefault("asset", {}).setdefault("extras", {})[LOD_EXTRAS_KEY] = list(ratios)
+
+    glb.compact()
+    glb.save(output_path)
+    return {"triangles": triangles, "bytes": output_path.stat().st_size}
+
+
+def strip_lods(path: Path) -> bool:
+    """Reduce a model with LOD levels back to LOD0 in place. False if it has none."""
+    glb = GLB.load(path)
+    if not _strip_levels(glb):
+        return False
+    glb.compact()
+    glb.save(path)
+    return True
+
+
+def write_lod_scene(scene_path: Path, name: str, glb_res: str, distances: list[float]):
+    levels = ", ".join(repr(float(d)) for d in distances)
+    text = (
+        "[gd_scene load_steps=3 format=3]\n"
+        "\n"
+        f'[ext_resource type="Script" path="{LOD_SCRIPT}" id="1"]\n'
+        f'[ext_resource type="PackedScene" path="{glb_res}" id="lod_model"]\n'
+        "\n"
+        f'[node name="{name}" type="Node3D"]\n'
+        'script = ExtResource("1")\n'
+        f"lod_distances = [{levels}]\n"
+        "\n"
+        '[node name="Levels" parent="." instance=ExtResource("lod_model")]\n'
+    )
+    tmp = scene_path.with_name(scene_path.name + ".tmp")
+    tmp.write_text(text)
+    os.replace(tmp, scene_path)
+
+
+def write_passthrough_scene(asset: dict, path: Path, res_path: str):
+    """Point the model's wrapper scene at the model with no levels to switch."""
+    write_lod_scene(lod_scene_path(Path(path)), asset["name"], res_path, [])
+
+
+def format_lod_report(name: str, report: dict) -> str:
+    chain = " -> ".join(str(t) for t in report["triangles"])
+    distances = ", ".join(f"{d:g}m" for d in report["distances"])
+    return f"  [lod] {name}: tris {chain} (switch at {distances}), {report['bytes'] / 1024:.1f} KB"
+
+
+# ── Helpers ──
+
+def _strip_levels(glb: GLB) -> bool:
+    """Make LOD0's children the scene roots again and drop the other levels' nodes and meshes."""
+    gltf = glb.gltf
+    extras = gltf.get("asset", {}).get("extras", {})
+    if LOD_EXTRAS_KEY not in extras:
+        return False
+    del extras[LOD_EXTRAS_KEY]
+    scene = gltf["scenes"][gltf.get("scene", 0)]
+    scene["nodes"] = gltf["nodes"][scene["nodes"][0]].get("children", [])
+
+    kept = set()
+    for s in gltf["scenes"]:
+        kept.update(_subtree(gltf, s.get("nodes", [])))
+    node_map = glb._remap("nodes", kept)
+    for node in gltf.get("nodes", []):
+        if "children" in node:
+            node["children"] = [node_map[c] for c in node["children"]]
+    for s in gltf["scenes"]:
+        s["nodes"] = [node_map[n] for n in s.get("nodes", [])]
+
+    mesh_map = glb._remap("meshes", {node["mesh"] for node in gltf.get("nodes", []) if "mesh" in node})
+    for node in gltf.get("nodes", []):
+        if "mesh" in node:
+            node["mesh"] = mesh_map[node["mesh"]]
+    return True
+
+
+def _subtree(gltf: dict, roots: list[int]) -> list[int]:
+    found, stack = [], list(roots)
+    while stack:
+        n = stack.pop()
+        found.append(n)
+        stack += gltf["nodes"][n].get("children", [])
+    return found
+
+
+def _mesh_triangles(glb: GLB, mesh_index: int) -> int:
+    total = 0
+    for prim in glb.gltf["meshes"][mesh_index]["primitives"]:
+        if prim.get("mode", MODE_TRIANGLES) != MODE_TRIANGLES:
+            continue
+        key = prim["indices"] if "indices" in prim else prim["attributes"]["POSITION"]
+        total += glb.gltf["accessors"][key]["count"] // 3
+    return total
+
+
+def _decimated_mesh(glb: GLB, mesh_index: int, ratio: float, level: int) -> tuple[dict, int]:
+    """A copy of a mesh with each triangle primitive decimated to ratio of its triangles.
+
+    Primitives that cannot be decimated (points, lines, morph targets) are
+    shared with the original unchanged.
+    """
+    mesh = copy.deepcopy(glb.gltf["meshes"][mesh_index])
+    if "name" in mesh:
+        mesh["name"] += f"_LOD{level}"
+    triangles = 0
+    for prim in mesh["primitives"]:
+        if prim.get("mode", MODE_TRIANGLES) != MODE_TRIANGLES or "targets" in prim:
+            continue
+        attributes, indices = weld(*_read_primitive(glb, prim))
+        attributes, indices = decimate(attributes, indices, max(1, int(len(indices) * ratio)))
+        _write_primitive(glb, prim, attributes, indices)
+        triangles += len(indices)
+    return mesh, triangles
+
+
+def _clone(gltf: dict, node_index: int, levels: dict[int, list[int]], level: int) -> int:
+    """Deep-copy a node subtree, pointing meshes at their decimated version for level."""
+    node = copy.deepcopy(gltf["nodes"][node_index])
+    if "mesh" in node:
+        node["mesh"] = levels[node["mesh"]][level]
+    if "children" in node:
+        node["children"] = [_clone(gltf, c, levels, level) for c in node["children"]]
+    gltf["nodes"].append(node)
+    return len(gltf["nodes"]) - 1
@@ -0,0 +1,439 @@
+"""
+Offline GLB optimizer for generated assets.
+
+Runs on a downloaded model in place:
+  1. weld bit-identical vertices,
+  2. decimate primitives when the model exceeds its target_polycount,
+  3. quantize texture coordinates, colors and indices,
+  4. drop PBR texture channels the category doesn't use (normal, occlusion,
+     metallic-roughness), folding the metallic-roughness average into the
+     material factors,
+  5. downscale embedded textures to power-of-two sizes within the category's
+     budget, so they mipmap and VRAM-compress cleanly on mobile,
+  6. strip accessors, bufferViews and images nothing references any more.
+
+Geometry work is pure NumPy on top of glb.py. Texture work needs to decode
+the JPEG/PNG images Meshy embeds, which uses Pillow when it is installed and is
+skipped (with a note in the report) when it is not.
+"""
+
+import io
+from pathlib import Path
+
+import numpy as np
+
+from glb import ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER, GLB, MODE_TRIANGLES
+
+# Longest texture edge allowed per output directory (rounded down to a power of two)
+TEXTURE_MAX_SIZE = {
+    "Models/Items": 512,
+    "Models/Food": 512,
+    "Models/Weapons": 512,
+    "Models/Armor": 512,
+    "Models/Enemies": 1024,
+    "Models/Characters": 1024,
+    "Models/World": 1024,
+}
+DEFAULT_TEXTURE_MAX_SIZE = 1024
+JPEG_QUALITY = 88
+
+# Material texture channels dropped per output directory; the low-poly item
+# art reads the same without them. An asset keeps everything with "keep_pbr": True.
+ITEM_DROPPED_CHANNELS = ("normalTexture", "occlusionTexture", "metallicRoughnessTexture")
+DROPPED_CHANNELS = {
+    "Models/Items": ITEM_DROPPED_CHANNELS,
+    "Models/Food": ITEM_DROPPED_CHANNELS,
+    "Models/Weapons": ITEM_DROPPED_CHANNELS,
+    "Models/Armor": ITEM_DROPPED_CHANNELS,
+}
+
+# Attributes that can be stored as normalized integers in core glTF 2.0
+QUANTIZABLE_PREFIXES = ("TEXCOORD_", "COLOR_")
+
+
+def texture_budget(asset: dict) -> int:
+    return asset.get("max_texture_size", TEXTURE_MAX_SIZE.get(asset["output_dir"], DEFAULT_TEXTURE_MAX_SIZE))
+
+
+def dropped_channels(asset: dict) -> tuple[str, ...]:
+    return () if asset.get("keep_pbr") else DROPPED_CHANNELS.get(asset["output_dir"], ())
+
+
+def optimize_asset(asset: dict, path: Path) -> dict:
+    return optimize_glb(path, asset.get("target_polycount"), texture_budget(asset), dropped_channels(asset))
+
+
+def optimize_glb(path: Path, target_polycount: int | None, max_texture_size: int | None,
+                 drop_channels: tuple[str, ...] = ()) -> dict:
+    """Optimize a GLB in place and return a report of what changed.
+
+    The file is only rewritten (atomically) when the result differs from the input.
+    """
+    path = Path(path)
+    original = path.read_bytes()
+    glb = GLB.from_bytes(original)
+    report = {
+        "bytes_before": len(original),
+        "triangles_before": 0,
+        "triangles_after": 0,
+        "vertices_before": 0,
+        "vertices_after": 0,
+        "textures_resized": 0,
+        "channels_dropped": 0,
+        "notes": [],
+    }
+
+    primitives = []
+    for mesh in glb.gltf.get("meshes", []):
+        for prim in mesh.get("primitives", []):
+            if prim.get("mode", MODE_TRIANGLES) != MODE_TRIANGLES or "targets" in prim:
+                report["notes"].append("skipped non-triangle or morph-target primitive")
+                continue
+            primitives.append(prim)
+
+    meshes = [_read_primitive(glb, prim) for prim in primitives]
+    total_triangles = sum(len(indices) for _, indices in meshes)
+    ratio = 1.0
+    if target_polycount and total_triangles > target_polycount:
+        ratio = target_polycount / total_triangles
+
+    for prim, (attributes, indices) in zip(primitives, meshes):
+        report["triangles_before"] += len(indices)
+        report["vertices_before"] += len(attributes["POSITION"])
+
+        attributes, indices = weld(attributes, indices)
+        if ratio < 1.0:
+            target = max(1, int(len(indices) * ratio))
+            attributes, indices = decimate(attributes, indices, target)
+
+        _write_primitive(glb, prim, attributes, indices)
+        report["triangles_after"] += len(indices)
+        report["vertices_after"] += len(attributes["POSITION"])
+
+    if drop_channels:
+        report["channels_dropped"] = drop_texture_channels(glb, drop_channels, report["notes"])
+        glb.compact()  # don't spend time resizing the images that were just orphaned
+    if max_texture_size:
+        report["textures_resized"] = downscale_textures(glb, max_texture_size, report["notes"])
+
+    glb.compact()
+    optimized = glb.to_bytes()
+    if optimized != original and (len(optimized) <= len(original) or ratio < 1.0 or report["channels_dropped"]):
+        glb.save(path)
+        report["bytes_after"] = len(optimized)
+    else:
+        report["bytes_after"] = len(original)
+    return report
+
+
+def format_report(name: str, report: dict) -> str:
+    before_kb = report["bytes_before"] / 1024
+    after_kb = report["bytes_after"] / 1024
+    saved = 100 * (1 - report["bytes_after"] / report["bytes_before"]) if report["bytes_before"] else 0
+    line = (f"  [optimize] {name}: {before_kb:.1f} KB -> {after_kb:.1f} KB ({saved:.0f}% smaller), "
+            f"tris {report['triangles_before']} -> {report['triangles_after']}, "
+            f"verts {report['vertices_before']} -> {report['vertices_after']}")
+    if report["textures_resized"]:
+        line += f", {report['textures_resized']} texture(s) downscaled"
+    if report["channels_dropped"]:
+        line += f", {report['channels_dropped']} PBR channel(s) dropped"
+    for note in dict.fromkeys(report["notes"]):
+        line += f"\n      note: {note}"
+    return line
+
+
+# ── Primitive I/O ──
+
+def _read_primitive(glb: GLB, prim: dict) -> tuple[dict[str, np.ndarray], np.ndarray]:
+    attributes = {name: glb.read_accessor(index) for name, index in prim["attributes"].items()}
+    count = len(attributes["POSITION"])
+    if "indices" in prim:
+        indices = glb.read_accessor(prim["indices"]).astype(np.int64)
+    else:
+        indices = np.arange(count, dtype=np.int64)
+    return attributes, indices[: len(indices) // 3 * 3].reshape(-1, 3)
+
+
+def _write_primitive(glb: GLB, prim: dict, attributes: dict[str, np.ndarray], indices: np.ndarray):
+    new_attributes = {}
+    for name, values in attributes.items():
+        normalized = False
+        if name.startswith(QUANTIZABLE_PREFIXES):
+            values, normalized = quantize_unit(values)
+        elif values.dtype == np.float64:
+            values = values.astype(np.float32)
+        new_attributes[name] = glb.add_accessor(
+            values, target=ARRAY_BUFFER, normalized=normalized, bounds=(name == "POSITION"))
+    prim["attributes"] = new_attributes
+
+    flat = indices.reshape(-1)
+    index_dtype = np.uint16 if len(attributes["POSITION"]) < 0xFFFF else np.uint32
+    prim["indices"] = glb.add_accessor(flat.astype(index_dtype), target=ELEMENT_ARRAY_BUFFER)
+
+
+def quantize_unit(values: np.ndarray) -> tuple[np.ndarray, bool]:
+    """Store [0, 1] float data as normalized uint16. Anything else is left as float32."""
+    if values.dtype != np.float32 and values.dtype != np.float64:
+        return values, False
+    if len(values) == 0 or values.min() < 0.0 or values.max() > 1.0:
+        return values.astype(np.float32), False
+    return np.round(values * 65535.0).astype(np.uint16), True
+
+
+# ── Geometry ──
+
+def _row_keys(arrays: list[np.ndarray]) -> np.ndarray:
+    """One opaque byte-string key per row, concatenated across all arrays."""
+    count = len(arrays[0])
+    parts = [np.ascontiguousarray(a).reshape(count, -1).view(np.uint8).reshape(count, -1) for a in arrays]
+    rows = np.ascontiguousarray(np.concatenate(parts, axis=1))
+    return rows.view(np.dtype((np.void, rows.shape[1]))).reshape(count)
+
+
+def _reindex(attributes: dict, indices: np.ndarray, keep: np.ndarray, remap: np.ndarray):
+    """Keep vertices `keep` (in that order) and send old index i to remap[i]."""
+    return {name: values[keep] for name, values in attributes.items()}, remap[indices]
+
+
+def clean_triangles(attributes: dict, indices: np.ndarray):
+    """Drop degenerate triangles and vertices no triangle references."""
+    a, b, c = indices[:, 0], indices[:, 1], indices[:, 2]
+    indices = indices[(a != b) & (b != c) & (a != c)]
+    used = np.zeros(len(attributes["POSITION"]), dtype=bool)
+    used[indices.reshape(-1)] = True
+    keep = np.flatnonzero(used)
+    remap = np.full(len(used), -1, dtype=np.int64)
+    remap[keep] = np.arange(len(keep))
+    return _reindex(attributes, indices, keep, remap)
+
+
+def weld(attributes: dict, indices: np.ndarray):
+    """Merge vertices whose attributes are bit-identical, preserving first-use order."""
+    names = sorted(attributes)
+    keys = _row_keys([attributes[n] for n in names])
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    attributes, indices = _reindex(attributes, indices, first[order], rank[inverse.reshape(-1)])
+    return clean_triangles(attributes, indices)
+
+
+def _connected_components(vertex_count: int, indices: np.ndarray) -> np.ndarray:
+    """Label each vertex with the smallest vertex index of its connected component."""
+    labels = np.arange(vertex_count)
+    edges = np.concatenate([indices[:, [0, 1]], indices[:, [1, 2]], indices[:, [2, 0]]])
+    a, b = edges[:, 0], edges[:, 1]
+    while True:
+        low = np.minimum(labels[a], labels[b])
+        updated = labels.copy()
+        np.minimum.at(updated, a, low)
+        np.minimum.at(updated, b, low)
+        updated = updated[updated]  # pointer jumping
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def face_quadrics(positions: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """Area-weighted plane quadrics (T, 4, 4) for each triangle."""
+    p0, p1, p2 = (positions[indices[:, i]].astype(np.float64) for i in range(3))
+    normal = np.cross(p1 - p0, p2 - p0)
+    area = np.linalg.norm(normal, axis=1)
+    unit = normal / np.maximum(area, 1e-30)[:, None]
+    plane = np.concatenate([unit, -np.einsum("ij,ij->i", unit, p0)[:, None]], axis=1)
+    return 0.5 * area[:, None, None] * plane[:, :, None] * plane[:, None, :]
+
+
+def _grid_cells(positions: np.ndarray, resolution: int) -> np.ndarray:
+    lo = positions.min(axis=0)
+    extent = positions.max(axis=0) - lo
+    size = max(float(extent.max()), 1e-12) / resolution
+    cell = np.minimum(((positions - lo) / size).astype(np.int64), resolution - 1)
+    return (cell[:, 0] * resolution + cell[:, 1]) * resolution + cell[:, 2]
+
+
+def _collapsed_faces(cells: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """Triangles that survive clustering, with duplicates (same corners, same winding) removed."""
+    tri = cells[indices]
+    keep = (tri[:, 0] != tri[:, 1]) & (tri[:, 1] != tri[:, 2]) & (tri[:, 0] != tri[:, 2])
+    tri = tri[keep]
+    # Rotate each triangle so its smallest cell comes first; winding is preserved
+    # so front and back faces of thin geometry (blades, leaves) both survive
+    shift = np.argmin(tri, axis=1)
+    rows = np.arange(len(tri))[:, None]
+    rotated = tri[rows, (shift[:, None] + np.arange(3)) % 3]
+    _, unique = np.unique(rotated, axis=0, return_index=True)
+    return np.flatnonzero(keep)[np.sort(unique)]
+
+
+def decimate(attributes: dict, indices: np.ndarray, target_triangles: int):
+    """Quadric-error vertex clustering down to at most target_triangles.
+
+    Vertices are bucketed on a uniform grid whose resolution is binary-searched
+    for the largest triangle count within budget. Each cell collapses to the
+    point minimizing the summed plane quadrics of its faces, so silhouettes and
+    creases survive better than with plain averaging. Cells are split per UV
+    chart so texture seams stay intact; other attributes come from the member
+    vertex closest to the collapsed position.
+    """
+    if len(indices) <= target_triangles:
+        return attributes, indices
+    positions = attributes["POSITION"].astype(np.float64)
+
+    lo, hi = 1, 1024
+    best = None
+    while lo <= hi:
+        resolution = (lo + hi) // 2
+        cells = _grid_cells(positions, resolution)
+        faces = _collapsed_faces(cells, indices)
+        if len(faces) <= target_triangles:
+            best = (resolution, cells, faces)
+            lo = resolution + 1
+        else:
+            hi = resolution - 1
+    if best is None:
+        return attributes, indices
+    _, cells, faces = best
+
+    cell_ids, cell_of = np.unique(cells, return_inverse=True)
+    cell_of = cell_of.reshape(-1)
+    optimum = _cell_optimum(positions, indices, cell_of, len(cell_ids))
+
+    charts = _connected_components(len(positions), indices)
+    group_keys = cell_of.astype(np.int64) * len(positions) + charts
+    _, group_of = np.unique(group_keys, return_inverse=True)
+    group_of = group_of.reshape(-1)
+
+    # Representative vertex per (cell, chart) group: the member nearest the optimum
+    distance = np.linalg.norm(positions - optimum[cell_of], axis=1)
+    order = np.lexsort((distance, group_of))
+    first = order[np.r_[True, group_of[order][1:] != group_of[order][:-1]]]
+
+    new_attributes = {name: values[first].copy() for name, values in attributes.items()}
+    new_attributes["POSITION"] = optimum[cell_of[first]].astype(attributes["POSITION"].dtype)
+    if "NORMAL" in new_attributes:
+        normals = new_attributes["NORMAL"].astype(np.float64)
+        normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-12)[:, None]
+        new_attributes["NORMAL"] = normals.astype(attributes["NORMAL"].dtype)
+
+    return clean_triangles(new_attributes, group_of[indices[faces]])
+
+
+def _cell_optimum(positions: np.ndarray, indices: np.ndarray, cell_of: np.ndarray, cell_count: int) -> np.ndarray:
+    """Per-cell point minimizing the summed face quadrics, regularized toward the cell mean."""
+    quadrics = face_quadrics(positions, indices).reshape(-1, 16)
+    summed = np.zeros((cell_count, 16))
+    for corner in range(3):
+        corner_cells = cell_of[indices[:, corner]]
+        for k in range(16):
+            summed[:, k] += np.bincount(corner_cells, weights=quadrics[:, k], minlength=cell_count)
+    summed = summed.reshape(-1, 4, 4)
+
+    counts = np.bincount(cell_of, minlength=cell_count).astype(np.float64)
+    mean = np.stack([np.bincount(cell_of, weights=positions[:, i], minlength=cell_count) for i in range(3)], axis=1)
+    mean /= np.maximum(counts, 1)[:, None]
+
+    a = summed[:, :3, :3]
+    b = -summed[:, :3, 3]
+    # Tikhonov step toward the mean keeps flat/degenerate cells well-posed
+    lam = 1e-3 * np.trace(a, axis1=1, axis2=2)[:, None, None] / 3 + 1e-12
+    residual = b - np.einsum("nij,nj->ni", a, mean)
+    offset = np.linalg.solve(a + lam * np.eye(3), residual[:, :, None])[:, :, 0]
+    optimum = mean + offset
+
+    # Points that wander out of the cell's own bounds fall back to the mean
+    lo = np.full((cell_count, 3), np.inf)
+    hi = np.full((cell_count, 3), -np.inf)
+    np.minimum.at(lo, cell_of, positions)
+    np.maximum.at(hi, cell_of, positions)
+    outside = np.any((optimum < lo) | (optimum > hi), axis=1)
+    optimum[outside] = mean[outside]
+    return optimum
+
+
+# ── Textures ──
+
+def _floor_pow2(n: int) -> int:
+    return 1 << (max(1, n).bit_length() - 1)
+
+
+def pot_size(width: int, height: int, max_size: int) -> tuple[int, int]:
+    """Power-of-two size within max_size on the longest edge, keeping the aspect as close as possible."""
+    scale = min(1.0, max_size / max(width, height))
+    return _floor_pow2(int(width * scale)), _floor_pow2(int(height * scale))
+
+
+def drop_texture_channels(glb: GLB, channels: tuple[str, ...], notes: list) -> int:
+    """Remove the given textureInfo keys from every material. Returns how many were removed.
+
+    A dropped metallic-roughness texture has its average (B = metallic,
+    G = roughness) folded into the material factors so the surface keeps its
+    overall look; without Pillow the material is made non-metallic instead.
+    """
+    dropped = 0
+    for material in glb.gltf.get("materials", []):
+        pbr = material.get("pbrMetallicRoughness", {})
+        for channel in channels:
+            holder = pbr if channel in ("metallicRoughnessTexture", "baseColorTexture") else material
+            info = holder.pop(channel, None)
+            if info is None:
+                continue
+            dropped += 1
+            if channel == "metallicRoughnessTexture":
+                metallic, roughness = _average_metallic_roughness(glb, info["index"], notes)
+                pbr["metallicFactor"] = pbr.get("metallicFactor", 1.0) * metallic
+                pbr["roughnessFactor"] = pbr.get("roughnessFactor", 1.0) * roughness
+    return dropped
+
+
+def _average_metallic_roughness(glb: GLB, texture_index: int, notes: list) -> tuple[float, float]:
+    source = glb.gltf["textures"][texture_index].get("source")
+    payload = glb.image_bytes(source) if source is not None else None
+    if payload is None:
+        return 0.0, 1.0
+    try:
+        from PIL import Image
+    except ImportError:
+        notes.append("Pillow not installed, dropped metallic-roughness replaced by a matte default")
+        return 0.0, 1.0
+    with Image.open(io.BytesIO(payload)) as img:
+        pixels = np.asarray(img.convert("RGB"), dtype=np.float64) / 255.0
+    return float(pixels[:, :, 2].mean()), float(pixels[:, :, 1].mean())
+
+
+def downscale_textures(glb: GLB, max_size: int, notes: list) -> int:
+    """Resize embedded images to power-of-two sizes within max_size. Returns how many were resized.
+
+    External images (shared atlas pages) are sized by whoever owns them and left alone.
+    """
+    images = glb.gltf.get("images", [])
+    if not images:
+        return 0
+    try:
+        from PIL import Image
+    except ImportError:
+        notes.append("Pillow not installed, textures left at original size")
+        return 0
+
+    resized = 0
+    for index, image in enumerate(images):
+        if "bufferView" not in image:
+            continue
+        payload = glb.image_bytes(index)
+        with Image.open(io.BytesIO(payload)) as img:
+            img.load()
+            width, height = img.size
+            size = pot_size(width, height, max_size)
+            if size == (width, height):
+                continue
+            out = io.BytesIO()
+            if image.get("mimeType") == "image/png" or img.format == "PNG":
+                img.resize(size, Image.LANCZOS).save(out, format="PNG", optimize=True)
+                mime = "image/png"
+            else:
+                img.convert("RGB").resize(size, Image.LANCZOS).save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+                mime = "image/jpeg"
+        glb.set_image_bytes(index, out.getvalue(), mime)
+        resized += 1
+    return resized
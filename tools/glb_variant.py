@@ -0,0 +1,337 @@
+"""
+Material variants derived from a generated base model.
+
+An ASSETS entry with "variant_of": "<base asset name>" is never sent to
+Meshy. Once the base model is downloaded, its raw GLB is copied with the
+entry's "material" spec applied and cached like a generated model (icons are
+baked from that copy). What gets installed shares the base's geometry:
+
+  <name>.tscn         a scene instancing the base's installed .glb, running
+                      Systems/material_variant.gd, which overrides the base's
+                      materials with the spec's factors
+  <name>_albedo.jpg   the recolored base-color texture (.png if the base's is),
+                      when the spec has a tint and the base a texture,
+                      downscaled like the base's
+
+If the base's texture was packed into a shared atlas, the scene maps the
+atlas UVs back onto the variant's own texture; generate_assets.py rewrites
+the scenes whenever the base may have moved (reinstall, atlas repack).
+
+The material spec:
+
+  tint        RGB (0-1) the base-color texture is recolored to. Each texel
+              keeps its shading: a texel as bright as match (or as the
+              texture's mean, without match) becomes exactly tint.
+  match       RGB of the texels to recolor, e.g. the bronze of a blade, so a
+              grip of a different hue keeps its color. Without it the whole
+              texture is recolored.
+  tolerance   hue/saturation distance from match still fully recolored
+              (default 0.12), fading out over another half of that
+  base_color  RGBA multiplied into every material's baseColorFactor
+  metallic, roughness
+              replace every material's factors
+
+A model without a base-color texture gets tint as its baseColorFactor, and
+primitives with no material at all (e.g. untextured preview models) get a new
+one carrying the spec. A spec that would leave the model unchanged is a
+VariantError rather than a silent copy of the base.
+Recoloring textures needs Pillow to decode and re-encode them.
+"""
+
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from glb import GLB, read_gltf
+from glb_optimize import JPEG_QUALITY, pot_size
+from texture_atlas import ATLAS_EXTRAS_KEY
+
+SPEC_KEYS = {"tint", "match", "tolerance", "base_color", "metallic", "roughness"}
+DEFAULT_TOLERANCE = 0.12
+LUMINANCE = np.array([0.2126, 0.7152, 0.0722])
+
+VARIANT_SCRIPT = "res://Systems/material_variant.gd"
+TEXTURE_SUFFIX = "_albedo"
+TEXTURE_FORMATS = {"JPEG": ".jpg", "PNG": ".png"}
+
+
+class VariantError(ValueError):
+    pass
+
+
+def variant_spec(asset: dict) -> dict:
+    spec = asset.get("material") or {}
+    unknown = set(spec) - SPEC_KEYS
+    if unknown:
+        raise VariantError(f"{asset['name']}: unknown material keys {sorted(unknown)}")
+    if "match" in spec and "tint" not in spec:
+        raise VariantError(f"{asset['name']}: material 'match' needs a 'tint'")
+    if not spec.keys() - {"match", "tolerance"}:
+        raise VariantError(f"{asset['name']}: material spec changes nothing")
+    return spec
+
+
+def variant_key(base_key: str, spec: dict) -> str:
+    """Cache key of a variant: the base request's key plus the material spec."""
+    blob = json.dumps({"base": base_key, "material": spec}, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def derive_variant(base_path: Path, output_path: Path, spec: dict) -> dict:
+    """Write base_path with spec applied to output_path.
+
+    Returns {"materials": materials changed, "textures": textures recolored,
+    "coverage": mean fraction of each recolored texture that changed}.
+    Raises VariantError if the spec would leave the model as it is.
+    """
+    glb = GLB.load(base_path)
+    gltf = glb.gltf
+    materials = gltf.setdefault("materials", [])
+    report = {"materials": 0, "textures": 0, "coverage": 0.0}
+    if not gltf.get("meshes"):
+        raise VariantError(f"{base_path.name} has no meshes to apply the material to")
+
+    # Primitives without a material render with glTF's default white one;
+    # give them an explicit material the spec can change
+    bare = [p for mesh in gltf.get("meshes", []) for p in mesh["primitives"] if "material" not in p]
+    if bare:
+        for primitive in bare:
+            primitive["material"] = len(materials)
+        materials.append({"name": "variant", "pbrMetallicRoughness": {}})
+
+    textured = set()
+    tinted = False
+    for material in materials:
+        pbr = material.setdefault("pbrMetallicRoughness", {})
+        info = pbr.get("baseColorTexture")
+        image_index = gltf["textures"][info["index"]].get("source") if info else None
+        if image_index is not None:
+            textured.add(image_index)
+        elif "tint" in spec:
+            alpha = pbr.get("baseColorFactor", [1.0, 1.0, 1.0, 1.0])[3]
+            pbr["baseColorFactor"] = [*map(float, spec["tint"]), alpha]
+            tinted = True
+        if "base_color" in spec:
+            factor = pbr.get("baseColorFactor", [1.0, 1.0, 1.0, 1.0])
+            pbr["baseColorFactor"] = [round(a * b, 4) for a, b in zip(factor, spec["base_color"])]
+        if "metallic" in spec:
+            pbr["metallicFactor"] = float(spec["metallic"])
+        if "roughness" in spec:
+            pbr["roughnessFactor"] = float(spec["roughness"])
+        report["materials"] += 1
+
+    if "tint" in spec and textured:
+        try:
+            from PIL import Image
+        except ImportError:
+            raise VariantError("Pillow is not installed")
+        coverage = []
+        for image_index in sorted(textured):
+            coverage.append(_recolor_image(glb, image_index, spec, Image))
+        report["textures"] = len(coverage)
+        report["coverage"] = float(np.mean(coverage))
+
+    if spec.keys() <= {"tint", "match", "tolerance"} and not tinted and not report["coverage"]:
+        raise VariantError(f"no texels of {base_path.name} match {spec.get('match')}")
+    glb.save(output_path)
+    return report
+
+
+def format_variant_report(name: str, base: str, report: dict) -> str:
+    line = f"  [variant] {name}: derived from {base}, {report['materials']} material(s)"
+    if report["textures"]:
+        line += f", {report['textures']} texture(s) recolored ({report['coverage']:.0%} of texels)"
+    return line
+
+
+def format_scene_report(name: str, base_file: str, report: dict) -> str:
+    line = f"  [variant] {name}: scene over {base_file}"
+    if report["texture"]:
+        line += f", {report['texture'][0]}x{report['texture'][1]} texture"
+    return line + f", {report['bytes'] / 1024:.1f} KB"
+
+
+# ── Installed scene ──
+
+def texture_path(scene_path: Path) -> Path | None:
+    """The installed texture of the variant scene at scene_path; None if it has none."""
+    for suffix in TEXTURE_FORMATS.values():
+        path = scene_path.with_name(scene_path.stem + TEXTURE_SUFFIX + suffix)
+        if path.is_file():
+            return path
+    return None
+
+
+def install_variant(derived_path: Path, scene_path: Path, scene_res: str, base_path: Path, base_res: str,
+                    spec: dict, max_texture_size: int | None = None) -> dict:
+    """Install a variant as a scene over its base's installed model (see the module docstring).
+
+    derived_path is the variant's own GLB from derive_variant; only its
+    recolored texture is installed, at most max_texture_size on a side.
+    Returns {"texture": [w, h] or None, "bytes": size of the installed files}.
+    """
+    old = texture_path(scene_path)
+    if old is not None:
+        old.unlink()
+    size = None
+    if "tint" in spec:
+        size = _write_texture(GLB.load(derived_path), scene_path, max_texture_size)
+    write_variant_scene(scene_path, scene_res, base_path, base_res, spec)
+    texture = texture_path(scene_path)
+    installed = scene_path.stat().st_size + (texture.stat().st_size if texture else 0)
+    return {"texture": size, "bytes": installed}
+
+
+def write_variant_scene(scene_path: Path, scene_res: str, base_path: Path, base_res: str, spec: dict):
+    """Write the variant scene for the base's model as currently installed (atlas placement included)."""
+    texture = texture_path(scene_path)
+    resources = [("Script", VARIANT_SCRIPT, "1"), ("PackedScene", base_res, "base_model")]
+    properties = []
+    if texture is not None:
+        texture_res = scene_res[: -len(scene_path.name)] + texture.name
+        resources.append(("Texture2D", texture_res, "albedo"))
+        scale, offset = _atlas_uv_transform(base_path)
+        properties.append('albedo_texture = ExtResource("albedo")')
+        if (scale, offset) != ((1.0, 1.0), (0.0, 0.0)):
+            properties.append(f"uv_scale = Vector3({scale[0]!r}, {scale[1]!r}, 1.0)")
+            properties.append(f"uv_offset = Vector3({offset[0]!r}, {offset[1]!r}, 0.0)")
+    if "tint" in spec:
+        properties.append("tint_untextured = true")
+        properties.append(f"tint = {_color([*spec['tint'], 1.0])}")
+    if "base_color" in spec:
+        properties.append(f"color_factor = {_color(spec['base_color'])}")
+    for factor in ("metallic", "roughness"):
+        if factor in spec:
+            properties.append(f"{factor} = {float(spec[factor])!r}")
+
+    lines = [f"[gd_scene load_steps={len(resources) + 1} format=3]", ""]
+    lines += [f'[ext_resource type="{kind}" path="{path}" id="{rid}"]' for kind, path, rid in resources]
+    lines += ["", f'[node name="{scene_path.stem}" type="Node3D"]', 'script = ExtResource("1")', *properties]
+    lines += ["", '[node name="Model" parent="." instance=ExtResource("base_model")]', ""]
+    tmp = scene_path.with_name(scene_path.name + ".tmp")
+    tmp.write_text("\n".join(lines))
+    os.replace(tmp, scene_path)
+
+
+def _write_texture(glb: GLB, scene_path: Path, max_size: int | None) -> list[int] | None:
+    """Write the model's base-color image next to scene_path. Returns its size; None if it has none."""
+    gltf = glb.gltf
+    images = set()
+    for material in gltf.get("materials", []):
+        info = material.get("pbrMetallicRoughness", {}).get("baseColorTexture")
+        if info:
+            images.add(gltf["textures"][info["index"]].get("source"))
+    if not images:
+        return None
+    if len(images) > 1 or None in images:
+        raise VariantError("a shared-mesh variant needs a single base-color image")
+    payload = glb.image_bytes(images.pop())
+    if payload is None:
+        raise VariantError("base-color image is not embedded")
+    try:
+        from PIL import Image
+    except ImportError:
+        raise VariantError("Pillow is not installed")
+    with Image.open(io.BytesIO(payload)) as img:
+        img.load()
+        image_format = "JPEG" if img.format == "JPEG" else "PNG"
+        size = pot_size(*img.size, max_size) if max_size else img.size
+        if size != img.size:
+            img = img.resize(size, Image.LANCZOS)
+        out = io.BytesIO()
+        if image_format == "JPEG":
+            img.convert("RGB").save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+        else:
+            img.save(out, format="PNG", optimize=True)
+    path = scene_path.with_name(scene_path.stem + TEXTURE_SUFFIX + TEXTURE_FORMATS[image_format])
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(out.getvalue())
+    os.replace(tmp, path)
+    return list(size)
+
+
+def _atlas_uv_transform(base_path: Path) -> tuple[tuple[float, float], tuple[float, float]]:
+    """UV scale and offset taking the base's (atlas page) UVs back to its own texture space."""
+    marker = read_gltf(base_path).get("asset", {}).get("extras", {}).get(ATLAS_EXTRAS_KEY)
+    if not marker or "rect" not in marker:
+        return (1.0, 1.0), (0.0, 0.0)
+    x, y, size = marker["rect"]
+    width, height = marker["page_size"]
+    return (width / size, height / size), (-x / size, -y / size)
+
+
+def _color(rgba) -> str:
+    return "Color({})".format(", ".join(repr(round(float(c), 4)) for c in rgba))
+
+
+# ── Recoloring ──
+
+def _recolor_image(glb: GLB, image_index: int, spec: dict, Image) -> float:
+    payload = glb.image_bytes(image_index)
+    if payload is None:
+        raise VariantError("base-color image is not embedded")
+    with Image.open(io.BytesIO(payload)) as img:
+        source_format = img.format
+        has_alpha = "A" in img.getbands()
+        pixels = np.asarray(img.convert("RGBA" if has_alpha else "RGB"), dtype=np.float64) / 255.0
+
+    rgb, weight = recolor(pixels[..., :3], spec)
+    pixels[..., :3] = rgb
+    result = Image.fromarray(np.round(pixels * 255.0).astype(np.uint8))
+    out = io.BytesIO()
+    if source_format == "JPEG" and not has_alpha:
+        result.save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+        mime = "image/jpeg"
+    else:
+        result.save(out, format="PNG", optimize=True)
+        mime = "image/png"
+    glb.set_image_bytes(image_index, out.getvalue(), mime)
+    return float((weight > 0).mean())
+
+
+def recolor(rgb: np.ndarray, spec: dict) -> tuple[np.ndarray, np.ndarray]:
+    """Recolor an (..., 3) float image toward spec["tint"]. Returns (image, per-texel weight)."""
+    tint = np.asarray(spec["tint"], dtype=np.float64)
+    luminance = rgb @ LUMINANCE
+    if "match" in spec:
+        match = np.asarray(spec["match"], dtype=np.float64)
+        weight = _match_weight(rgb, match, spec.get("tolerance", DEFAULT_TOLERANCE))
+        reference = float(match @ LUMINANCE)
+    else:
+        weight = np.ones(luminance.shape)
+        reference = float(luminance.mean())
+    if not weight.any():
+        return rgb, weight
+
+    reference = max(reference, 1e-4)
+    colorized = np.clip(tint * (luminance / reference)[..., None], 0.0, 1.0)
+    w = weight[..., None]
+    return rgb * (1.0 - w) + colorized * w, weight
+
+
+def _match_weight(rgb: np.ndarray, match: np.ndarray, tolerance: float) -> np.ndarray:
+    """1 for texels whose hue and saturation are within tolerance of match, fading to 0 at 1.5x."""
+    hue, saturation = _hue_saturation(rgb)
+    match_hue, match_saturation = _hue_saturation(match)
+    hue_distance = np.abs((hue - match_hue + 0.5) % 1.0 - 0.5) * 2.0
+    # Hue means little for greyish texels, so weigh it by how colored both are
+    hue_distance *= np.minimum(saturation, match_saturation) / max(float(match_saturation), 1e-4)
+    distance = np.hypot(hue_distance, saturation - match_saturation)
+    return np.clip((1.5 * tolerance - distance) / (0.5 * tolerance), 0.0, 1.0)
+
+
+def _hue_saturation(rgb: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """HSV hue (0-1) and saturation of (..., 3) colors."""
+    high = rgb.max(axis=-1)
+    low = rgb.min(axis=-1)
+    spread = high - low
+    safe = np.where(spread > 0, spread, 1.0)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    hue = np.where(high == r, (g - b) / safe % 6.0, np.where(high == g, (b - r) / safe + 2.0, (r - g) / safe + 4.0))
+    hue = np.where(spread > 0, hue / 6.0, 0.0)
+    saturation = np.where(high > 0, spread / np.where(high > 0, high, 1.0), 0.0)
+    return hue, saturation
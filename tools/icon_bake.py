@@ -0,0 +1,304 @@
+"""
+Offline inventory icon baking.
+
+Renders item GLBs with a small NumPy software rasterizer (orthographic
+three-quarter camera, fixed key/fill/ambient lighting, supersampled edges)
+and packs the results into one RGBA atlas plus a JSON index of rects:
+
+  {"version": 1, "atlas": "res://...png", "size": [w, h], "icon_size": n,
+   "icons": {"res://Assets/Models/.../x.glb": {"rect": [x, y, w, h], "uv": [u0, v0, u1, v1]}}}
+
+Keys are the models' res:// paths, which is what ItemData.model_path holds,
+so the UI can look an item's icon up without instantiating its model.
+
+Base-color textures are sampled when Pillow is installed (it decodes the
+JPEG/PNG images Meshy embeds); without it icons use material and vertex
+colors only.
+"""
+
+import io
+import json
+import math
+import os
+from pathlib import Path
+
+import numpy as np
+
+from glb import GLB, MODE_TRIANGLES, mesh_instances
+from png import encode_png
+
+ICON_SIZE = 128
+SUPERSAMPLE = 3
+ICON_PADDING = 0.08  # fraction of the icon left empty on each side
+
+# Camera looks down at the model from the front right, like a hand-drawn icon
+CAMERA_YAW = 35.0
+CAMERA_PITCH = 25.0
+
+# (direction toward the light, intensity) in world space, plus ambient
+LIGHTS = (((-0.5, 0.8, 0.6), 0.85), ((0.8, 0.2, 0.3), 0.3))
+AMBIENT = 0.2
+
+INDEX_VERSION = 1
+
+
+# ── Scene ──
+
+def _decode_image(glb: GLB, image_index: int) -> np.ndarray | None:
+    payload = glb.image_bytes(image_index)
+    if payload is None:
+        return None
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    with Image.open(io.BytesIO(payload)) as img:
+        return np.asarray(img.convert("RGBA"), dtype=np.float32) / 255.0
+
+
+def _srgb_to_linear(c: np.ndarray) -> np.ndarray:
+    return np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+
+
+def _linear_to_srgb(c: np.ndarray) -> np.ndarray:
+    c = np.clip(c, 0.0, 1.0)
+    return np.where(c <= 0.0031308, c * 12.92, 1.055 * c ** (1 / 2.4) - 0.055)
+
+
+def load_scene(glb: GLB) -> dict:
+    """Flatten every triangle primitive into world-space arrays for rendering.
+
+    Returns positions/normals/uvs/colors per vertex, indices and a material
+    slot per triangle, and per-slot base color factor and texture.
+    """
+    gltf = glb.gltf
+    positions, normals, uvs, colors, indices, slots = [], [], [], [], [], []
+    factors, textures = [], []
+    images = {}
+    offset = 0
+    for mesh_index, world in mesh_instances(gltf):
+        normal_matrix = np.linalg.inv(world[:3, :3]).T
+        for prim in gltf["meshes"][mesh_index]["primitives"]:
+            if prim.get("mode", MODE_TRIANGLES) != MODE_TRIANGLES:
+                continue
+            attributes = prim["attributes"]
+            pos = glb.read_accessor(attributes["POSITION"]).astype(np.float64)
+            count = len(pos)
+            tri = (glb.read_accessor(prim["indices"]).astype(np.int64) if "indices" in prim
+                   else np.arange(count))
+            tri = tri[: len(tri) // 3 * 3].reshape(-1, 3)
+
+            material = gltf.get("materials", [])[prim["material"]] if "material" in prim else {}
+            pbr = material.get("pbrMetallicRoughness", {})
+            factors.append(np.array(pbr.get("baseColorFactor", (1.0, 1.0, 1.0, 1.0)), dtype=np.float64))
+            texture_info = pbr.get("baseColorTexture")
+            texture = None
+            if texture_info:
+                source = gltf["textures"][texture_info["index"]].get("source")
+                if source is not None:
+                    if source not in images:
+                        images[source] = _decode_image(glb, source)
+                    texture = images[source]
+            textures.append(texture)
+            uv_name = f"TEXCOORD_{texture_info.get('texCoord', 0)}" if texture_info else None
+
+            positions.append(pos @ world[:3, :3].T + world[:3, 3])
+            if "NORMAL" in attributes:
+                normals.append(glb.read_accessor(attributes["NORMAL"]).astype(np.float64) @ normal_matrix.T)
+            else:
+                normals.append(np.full((count, 3), np.nan))
+            uvs.append(glb.read_accessor(attributes[uv_name])[:, :2].astype(np.float64)
+                       if uv_name in attributes else np.zeros((count, 2)))
+            if "COLOR_0" in attributes:
+                color = glb.read_accessor(attributes["COLOR_0"]).astype(np.float64)
+                if color.shape[1] == 3:
+                    color = np.concatenate([color, np.ones((count, 1))], axis=1)
+                colors.append(color)
+            else:
+                colors.append(np.ones((count, 4)))
+            indices.append(tri + offset)
+            slots.append(np.full(len(tri), len(factors) - 1))
+            offset += count
+
+    if not indices:
+        raise ValueError("model has no triangles")
+    return {
+        "positions": np.concatenate(positions),
+        "normals": np.concatenate(normals),
+        "uvs": np.concatenate(uvs),
+        "colors": np.concatenate(colors),
+        "indices": np.concatenate(indices),
+        "slots": np.concatenate(slots),
+        "factors": factors,
+        "textures": textures,
+    }
+
+
+# ── Rendering ──
+
+def _camera_basis() -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(right, up, forward) unit vectors; forward points from the camera into the scene."""
+    yaw, pitch = math.radians(CAMERA_YAW), math.radians(CAMERA_PITCH)
+    forward = np.array([-math.sin(yaw) * math.cos(pitch), -math.sin(pitch), -math.cos(yaw) * math.cos(pitch)])
+    right = np.cross(forward, [0.0, 1.0, 0.0])
+    right /= np.linalg.norm(right)
+    return right, np.cross(right, forward), forward
+
+
+def _rasterize(screen: np.ndarray, depth: np.ndarray, indices: np.ndarray, size: int):
+    """Z-buffered triangle coverage. Returns (triangle id per pixel or -1, barycentrics)."""
+    zbuf = np.full((size, size), np.inf)
+    tri_id = np.full((size, size), -1, dtype=np.int64)
+    bary = np.zeros((size, size, 3))
+    for t, (a, b, c) in enumerate(indices):
+        (x0, y0), (x1, y1), (x2, y2) = screen[a], screen[b], screen[c]
+        area = (x1 - x0) * (y2 - y0) - (x2 - x0) * (y1 - y0)
+        if abs(area) < 1e-12:
+            continue
+        left = max(int(math.floor(min(x0, x1, x2))), 0)
+        right = min(int(math.ceil(max(x0, x1, x2))), size - 1)
+        top = max(int(math.floor(min(y0, y1, y2))), 0)
+        bottom = min(int(math.ceil(max(y0, y1, y2))), size - 1)
+        if left > right or top > bottom:
+            continue
+        px, py = np.meshgrid(np.arange(left, right + 1) + 0.5, np.arange(top, bottom + 1) + 0.5)
+        w0 = ((x1 - px) * (y2 - py) - (x2 - px) * (y1 - py)) / area
+        w1 = ((x2 - px) * (y0 - py) - (x0 - px) * (y2 - py)) / area
+        w2 = 1.0 - w0 - w1
+        z = w0 * depth[a] + w1 * depth[b] + w2 * depth[c]
+        region = (slice(top, bottom + 1), slice(left, right + 1))
+        hit = (w0 >= 0) & (w1 >= 0) & (w2 >= 0) & (z < zbuf[region])
+        if not hit.any():
+            continue
+        zbuf[region][hit] = z[hit]
+        tri_id[region][hit] = t
+        bary[region][hit] = np.stack([w0[hit], w1[hit], w2[hit]], axis=1)
+    return tri_id, bary
+
+
+def _sample(texture: np.ndarray, uv: np.ndarray) -> np.ndarray:
+    """Nearest-texel lookup with repeat wrapping (supersampling smooths it out)."""
+    height, width = texture.shape[:2]
+    x = (np.mod(uv[:, 0], 1.0) * width).astype(np.int64).clip(0, width - 1)
+    y = (np.mod(uv[:, 1], 1.0) * height).astype(np.int64).clip(0, height - 1)
+    return texture[y, x]
+
+
+def render_icon(glb: GLB, size: int = ICON_SIZE) -> np.ndarray:
+    """Render a model to an (size, size, 4) uint8 RGBA image with a transparent background."""
+    scene = load_scene(glb)
+    right, up, forward = _camera_basis()
+    positions = scene["positions"]
+    sx, sy, depth = positions @ right, positions @ up, positions @ forward
+
+    # Fit the projected bounds into the icon, centered, keeping aspect
+    render_size = size * SUPERSAMPLE
+    extent = max(sx.max() - sx.min(), sy.max() - sy.min(), 1e-9)
+    scale = render_size * (1 - 2 * ICON_PADDING) / extent
+    cx, cy = (sx.max() + sx.min()) / 2, (sy.max() + sy.min()) / 2
+    screen = np.stack([(sx - cx) * scale + render_size / 2, (cy - sy) * scale + render_size / 2], axis=1)
+
+    indices = scene["indices"]
+    tri_id, bary = _rasterize(screen, depth, indices, render_size)
+    covered = tri_id >= 0
+    tris = tri_id[covered]
+    weights = bary[covered]
+    corners = indices[tris]
+
+    def interpolate(values):
+        return np.einsum("pk,pkc->pc", weights, values[corners])
+
+    # Vertex normals where present, flat face normals otherwise; flip toward the camera (two-sided)
+    p0, p1, p2 = (positions[corners[:, i]] for i in range(3))
+    face_normals = np.cross(p1 - p0, p2 - p0)
+    normals = interpolate(np.nan_to_num(scene["normals"]))
+    missing = np.isnan(scene["normals"][corners[:, 0], 0]) | (np.linalg.norm(normals, axis=1) < 1e-9)
+    normals[missing] = face_normals[missing]
+    normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-12)[:, None]
+    normals[normals @ forward > 0] *= -1
+
+    base = interpolate(scene["colors"])
+    uvs = interpolate(scene["uvs"])
+    slots = scene["slots"][tris]
+    for slot, (factor, texture) in enumerate(zip(scene["factors"], scene["textures"])):
+        mask = slots == slot
+        if not mask.any():
+            continue
+        base[mask] *= factor
+        if texture is not None:
+            texel = _sample(texture, uvs[mask])
+            base[mask, :3] *= _srgb_to_linear(texel[:, :3])
+            base[mask, 3] *= texel[:, 3]
+
+    light = np.full(len(normals), AMBIENT)
+    for direction, intensity in LIGHTS:
+        direction = np.array(direction) / np.linalg.norm(direction)
+        light += intensity * np.maximum(normals @ direction, 0.0)
+    shaded = _linear_to_srgb(base[:, :3] * light[:, None])
+
+    # Premultiplied box filter down to the output size
+    image = np.zeros((render_size, render_size, 4))
+    alpha = np.clip(base[:, 3], 0.0, 1.0)
+    image[covered, :3] = shaded * alpha[:, None]
+    image[covered, 3] = alpha
+    image = image.reshape(size, SUPERSAMPLE, size, SUPERSAMPLE, 4).mean(axis=(1, 3))
+    rgb = image[:, :, :3] / np.maximum(image[:, :, 3:], 1e-6)
+    out = np.concatenate([rgb, image[:, :, 3:]], axis=2)
+    return np.round(out * 255).clip(0, 255).astype(np.uint8)
+
+
+# ── Atlas ──
+
+def _next_pow2(n: int) -> int:
+    return 1 << max(0, n - 1).bit_length()
+
+
+def pack_atlas(icons: dict[str, np.ndarray], icon_size: int = ICON_SIZE) -> tuple[np.ndarray, dict]:
+    """Lay equal-sized icons out on a grid in a power-of-two atlas. Returns (pixels, rects by key)."""
+    count = max(1, len(icons))
+    width = _next_pow2(math.ceil(math.sqrt(count)) * icon_size)
+    columns = width // icon_size
+    height = _next_pow2(math.ceil(count / columns) * icon_size)
+    atlas = np.zeros((height, width, 4), dtype=np.uint8)
+    rects = {}
+    for slot, key in enumerate(sorted(icons)):
+        x, y = slot % columns * icon_size, slot // columns * icon_size
+        atlas[y:y + icon_size, x:x + icon_size] = icons[key]
+        rects[key] = {
+            "rect": [x, y, icon_size, icon_size],
+            "uv": [x / width, y / height, (x + icon_size) / width, (y + icon_size) / height],
+        }
+    return atlas, rects
+
+
+def bake_icons(models: dict[str, Path], atlas_path: Path, index_path: Path, atlas_res: str,
+               icon_size: int = ICON_SIZE, errors: dict | None = None) -> dict:
+    """Render every model (res path -> file), write the atlas PNG and JSON index, return the index.
+
+    Models that fail to render are left out and reported through errors.
+    """
+    icons = {}
+    for res_path, path in models.items():
+        try:
+            icons[res_path] = render_icon(GLB.load(path), icon_size)
+        except Exception as e:
+            if errors is not None:
+                errors[res_path] = str(e)
+    atlas, rects = pack_atlas(icons, icon_size)
+    index = {
+        "version": INDEX_VERSION,
+        "atlas": atlas_res,
+        "size": [atlas.shape[1], atlas.shape[0]],
+        "icon_size": icon_size,
+        "icons": rects,
+    }
+    atlas_path.parent.mkdir(parents=True, exist_ok=True)
+    _write_atomic(atlas_path, encode_png(atlas))
+    _write_atomic(index_path, (json.dumps(index, indent=1, sort_keys=True) + "\n").encode("utf-8"))
+    return index
+
+
+def _write_atomic(path: Path, payload: bytes):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(payload)
+    os.replace(tmp, path)
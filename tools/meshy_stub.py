@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Meshy text-to-3D API.
+
+Serves the endpoints generate_assets.py uses, so the pipeline can be run and
+benchmarked offline without credits:
+  POST /openapi/v2/text-to-3d          create a preview or refine task
+  GET  /openapi/v2/text-to-3d/<id>     task status, progress and model_urls
+  DELETE /openapi/v2/text-to-3d/<id>   cancel a task (it reports CANCELED)
+  GET  /downloads/<id>.glb             synthetic GLB (supports Range/ETag)
+  GET  /stub/stats                     request counters and timings (JSON)
+
+Task durations, queueing and response latency are drawn from lognormal
+distributions; failures, expiries, stragglers (tasks straggler_factor times
+slower than drawn) and 429s happen at configurable rates. All
+durations are given in "Meshy seconds" and multiplied by time_scale, so a
+benchmark can compress a multi-minute run into a few seconds.
+
+Usage:
+  python tools/meshy_stub.py --port 8765 --time-scale 0.05
+  MESHY_BASE_URL=http://127.0.0.1:8765/openapi/v2 python tools/generate_assets.py
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from glb import ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER, GLB
+from png import encode_png
+
+API_PREFIX = "/openapi/v2/text-to-3d"
+
+DEFAULT_CONFIG = {
+    "time_scale": 0.02,
+    # (median seconds, lognormal sigma)
+    "preview_duration": (90.0, 0.5),
+    "refine_duration": (150.0, 0.5),
+    "queue_delay": (5.0, 1.0),
+    "response_latency": (0.15, 0.5),
+    "failure_rate": 0.0,  # task ends FAILED
+    "expiry_rate": 0.0,  # task ends EXPIRED
+    "straggler_rate": 0.0,  # task runs straggler_factor times longer
+    "straggler_factor": 10.0,
+    "rate_limit_rate": 0.0,  # any API request answered 429
+    "retry_after": 2.0,  # seconds advertised on 429s
+    "max_requests_per_second": 0.0,  # 0 = unlimited; excess requests get 429
+    "texture_size": 256,  # edge of the embedded noise texture (drives GLB size)
+    "download_bytes_per_second": 0.0,  # 0 = unthrottled
+    "seed": None,
+}
+
+
+class StubState:
+    def __init__(self, config: dict):
+        self.config = config
+        self.random = random.Random(config["seed"])
+        self.lock = threading.Lock()
+        self.tasks = {}  # id -> task dict
+        self.glb_cache = {}  # target_polycount -> bytes
+        self.stats = {
+            "api_requests": 0,
+            "create_requests": 0,
+            "status_requests": 0,
+            "cancel_requests": 0,
+            "download_requests": 0,
+            "rate_limited": 0,
+            "requests_by_prompt": {},
+            "download_bytes": 0,
+            "download_seconds": 0.0,
+            "first_download_start": None,
+            "last_download_end": None,
+            "in_flight": 0,
+            "peak_in_flight": 0,
+        }
+        self.recent = []  # timestamps of recent API requests, for max_requests_per_second
+
+    def scaled(self, seconds: float) -> float:
+        return seconds * self.config["time_scale"]
+
+    def draw(self, spec: tuple[float, float]) -> float:
+        median, sigma = spec
+        return self.scaled(median * math.exp(self.random.gauss(0.0, sigma)))
+
+    def create_task(self, payload: dict) -> tuple[int, dict]:
+        mode = payload.get("mode")
+        with self.lock:
+            if mode == "refine":
+                preview = self.tasks.get(payload.get("preview_task_id"))
+                if not preview or preview["mode"] != "preview" or self._status(preview, time.time())[0] != "SUCCEEDED":
+                    return 400, {"message": "preview_task_id must reference a succeeded preview task"}
+                prompt = preview["prompt"]
+                polycount = preview["target_polycount"]
+            elif mode == "preview":
+                if not payload.get("prompt"):
+                    return 400, {"message": "prompt is required"}
+                prompt = payload["prompt"]
+                polycount = int(payload.get("target_polycount", 5000))
+            else:
+                return 400, {"message": f"unknown mode {mode!r}"}
+
+            now = time.time()
+            queue = self.draw(self.config["queue_delay"])
+            duration = self.draw(self.config[f"{mode}_duration"])
+            if self.random.random() < self.config["straggler_rate"]:
+                duration *= self.config["straggler_factor"]
+            roll = self.random.random()
+            if roll < self.config["failure_rate"]:
+                outcome = "FAILED"
+            elif roll < self.config["failure_rate"] + self.config["expiry_rate"]:
+                outcome = "EXPIRED"
+            else:
+                outcome = "SUCCEEDED"
+            task_id = str(uuid.UUID(int=self.random.getrandbits(128)))
+            self.tasks[task_id] = {
+                "id": task_id,
+                "mode": mode,
+                "prompt": prompt,
+                "target_polycount": polycount,
+                "created_at": now,
+                "started_at": now + queue,
+                "finished_at": now + queue + duration,
+                "outcome": outcome,
+            }
+            self._count_prompt(prompt)
+            return 202, {"result": task_id}
+
+    def task_status(self, task_id: str, base_url: str) -> tuple[int, dict]:
+        with self.lock:
+            task = self.tasks.get(task_id)
+            if task is None:
+                return 404, {"message": "task not found"}
+            self._count_prompt(task["prompt"])
+            task["last_polled_at"] = time.time()
+            status, progress = self._status(task, task["last_polled_at"])
+        body = {
+            "id": task_id,
+            "mode": task["mode"],
+            "status": status,
+            "progress": progress,
+            "created_at": int(task["created_at"] * 1000),
+            "started_at": int(task["started_at"] * 1000),
+        }
+        if status == "SUCCEEDED":
+            body["finished_at"] = int(task["finished_at"] * 1000)
+            body["model_urls"] = {"glb": f"{base_url}/downloads/{task_id}.glb"}
+        elif status in ("FAILED", "EXPIRED"):
+            body["task_error"] = {"message": f"stub {status.lower()}"}
+        return 200, body
+
+    def cancel_task(self, task_id: str) -> tuple[int, dict]:
+        with self.lock:
+            task = self.tasks.get(task_id)
+            if task is None:
+                return 404, {"message": "task not found"}
+            now = time.time()
+            if now < task["finished_at"]:
+                task["outcome"] = "CANCELED"
+                task["started_at"] = min(task["started_at"], now)
+                task["finished_at"] = now
+        return 200, {}
+
+    def _status(self, task: dict, now: float) -> tuple[str, int]:
+        if now < task["started_at"]:
+            return "PENDING", 0
+        if now < task["finished_at"]:
+            span = task["finished_at"] - task["started_at"]
+            return "IN_PROGRESS", min(99, int(100 * (now - task["started_at"]) / max(span, 1e-9)))
+        return task["outcome"], 100 if task["outcome"] == "SUCCEEDED" else 0
+
+    def _count_prompt(self, prompt: str):
+        counts = self.stats["requests_by_prompt"]
+        counts[prompt] = counts.get(prompt, 0) + 1
+
+    def glb_for(self, task_id: str) -> bytes | None:
+        with self.lock:
+            task = self.tasks.get(task_id)
+            if task is None or self._status(task, time.time())[0] != "SUCCEEDED":
+                return None
+            polycount = task["target_polycount"]
+            if polycount not in self.glb_cache:
+                self.glb_cache[polycount] = synthetic_glb(polycount, self.config["texture_size"], self.random.random())
+            return self.glb_cache[polycount]
+
+    def rate_limited(self) -> bool:
+        """Decide (and count) whether this API request gets a 429."""
+        with self.lock:
+            now = time.time()
+            limit = self.config["max_requests_per_second"]
+            limited = self.random.random() < self.config["rate_limit_rate"]
+            if limit:
+                window = self.scaled(1.0)
+                self.recent = [t for t in self.recent if now - t < window]
+                if len(self.recent) >= limit:
+                    limited = True
+                else:
+                    self.recent.append(now)
+            if limited:
+                self.stats["rate_limited"] += 1
+            return limited
+
+    @staticmethod
+    def observed_end(task: dict) -> float:
+        """When a task stopped mattering to the client: it finished, was canceled, or was last polled.
+
+        A task the client gave up on (timed out, abandoned) would otherwise
+        count until its planned finish, long after the run moved on.
+        """
+        return min(task["finished_at"], task.get("last_polled_at", task["created_at"]))
+
+    def peak_concurrent_tasks(self) -> int:
+        """Largest number of tasks that were queued or running at the same moment."""
+        with self.lock:
+            events = []
+            for task in self.tasks.values():
+                events += [(task["created_at"], 1), (self.observed_end(task), -1)]
+        peak = current = 0
+        for _, delta in sorted(events):
+            current += delta
+            peak = max(peak, current)
+        return peak
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            stats = json.loads(json.dumps(self.stats))
+            stats["tasks"] = len(self.tasks)
+            stats["tasks_by_mode"] = {
+                mode: sum(1 for t in self.tasks.values() if t["mode"] == mode) for mode in ("preview", "refine")
+            }
+        stats["peak_concurrent_tasks"] = self.peak_concurrent_tasks()
+        return stats
+
+
+def synthetic_glb(target_polycount: int, texture_size: int, seed: float) -> bytes:
+    """A UV sphere with about target_polycount triangles and an embedded noise PNG texture."""
+    rings = max(2, int(math.sqrt(target_polycount / 2)))
+    segments = max(3, target_polycount // (2 * rings))
+    theta = np.linspace(0, math.pi, rings + 1)
+    phi = np.linspace(0, 2 * math.pi, segments + 1)
+    t, p = np.meshgrid(theta, phi, indexing="ij")
+    normals = np.stack([np.sin(t) * np.cos(p), np.cos(t), np.sin(t) * np.sin(p)], axis=-1).reshape(-1, 3)
+    uvs = np.stack([p / (2 * math.pi), t / math.pi], axis=-1).reshape(-1, 2)
+
+    r, s = np.meshgrid(np.arange(rings), np.arange(segments), indexing="ij")
+    a = (r * (segments + 1) + s).reshape(-1)
+    b = a + segments + 1
+    faces = np.concatenate([np.stack([a, b, a + 1], 1), np.stack([a + 1, b, b + 1], 1)])
+
+    glb = GLB({"asset": {"version": "2.0", "generator": "meshy_stub"}}, [])
+    attributes = {
+        "POSITION": glb.add_accessor(normals.astype(np.float32) * 0.5, target=ARRAY_BUFFER, bounds=True),
+        "NORMAL": glb.add_accessor(normals.astype(np.float32), target=ARRAY_BUFFER),
+        "TEXCOORD_0": glb.add_accessor(uvs.astype(np.float32), target=ARRAY_BUFFER),
+    }
+    indices = glb.add_accessor(faces.reshape(-1).astype(np.uint32), target=ELEMENT_ARRAY_BUFFER)
+
+    rng = np.random.default_rng(int(seed * 2**32))
+    texture = rng.integers(0, 256, size=(texture_size, texture_size, 3), dtype=np.uint8)
+    image = glb.add_view(encode_png(texture, level=1))
+
+    glb.gltf.update({
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0}],
+        "meshes": [{"primitives": [{"attributes": attributes, "indices": indices, "material": 0}]}],
+        "materials": [{"pbrMetallicRoughness": {"baseColorTexture": {"index": 0}}}],
+        "textures": [{"source": 0}],
+        "images": [{"bufferView": image, "mimeType": "image/png"}],
+    })
+    return glb.to_bytes()
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        @property
+        def base_url(self) -> str:
+            host, port = self.server.server_address[:2]
+            return f"http://{host}:{port}"
+
+        def send_json(self, code: int, body: dict, headers: dict | None = None):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def begin_api_request(self, counter: str) -> bool:
+            """Count the request, apply response latency and decide on a 429. Returns False if limited."""
+            with state.lock:
+                state.stats["api_requests"] += 1
+                state.stats[counter] += 1
+            time.sleep(state.draw(state.config["response_latency"]))
+            if state.rate_limited():
+                retry = state.scaled(state.config["retry_after"])
+                self.send_json(429, {"message": "rate limited"}, {"Retry-After": f"{retry:.3f}"})
+                return False
+            return True
+
+        def track(self, delta: int):
+            with state.lock:
+                state.stats["in_flight"] += delta
+                state.stats["peak_in_flight"] = max(state.stats["peak_in_flight"], state.stats["in_flight"])
+
+        def do_POST(self):
+            self.track(1)
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                if self.path.rstrip("/") != API_PREFIX:
+                    return self.send_json(404, {"message": "not found"})
+                if not self.begin_api_request("create_requests"):
+                    return
+                try:
+                    payload = json.loads(body or b"{}")
+                except ValueError:
+                    return self.send_json(400, {"message": "invalid JSON"})
+                code, response = state.create_task(payload)
+                self.send_json(code, response)
+            finally:
+                self.track(-1)
+
+        def do_GET(self):
+            self.track(1)
+            try:
+                if self.path == "/stub/stats":
+                    return self.send_json(200, state.snapshot())
+                match = re.fullmatch(rf"{API_PREFIX}/([\w-]+)", self.path)
+                if match:
+                    if not self.begin_api_request("status_requests"):
+                        return
+                    code, response = state.task_status(match.group(1), self.base_url)
+                    return self.send_json(code, response)
+                match = re.fullmatch(r"/downloads/([\w-]+)\.glb", self.path)
+                if match:
+                    return self.send_glb(match.group(1))
+                self.send_json(404, {"message": "not found"})
+            finally:
+                self.track(-1)
+
+        def do_DELETE(self):
+            self.track(1)
+            try:
+                match = re.fullmatch(rf"{API_PREFIX}/([\w-]+)", self.path)
+                if not match:
+                    return self.send_json(404, {"message": "not found"})
+                if not self.begin_api_request("cancel_requests"):
+                    return
+                code, response = state.cancel_task(match.group(1))
+                self.send_json(code, response)
+            finally:
+                self.track(-1)
+
+        def send_glb(self, task_id: str):
+            data = state.glb_for(task_id)
+            if data is None:
+                return self.send_json(404, {"message": "model not available"})
+            etag = f'"{task_id}"'
+            start = 0
+            match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+            if match and self.headers.get("If-Range", etag) == etag and int(match.group(1)) >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if match and self.headers.get("If-Range", etag) == etag:
+                start = int(match.group(1))
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+            else:
+                self.send_response(200)
+            body = data[start:]
+            self.send_header("Content-Type", "model/gltf-binary")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+
+            began = time.time()
+            rate = state.config["download_bytes_per_second"]
+            step = 64 * 1024
+            for offset in range(0, len(body), step):
+                self.wfile.write(body[offset:offset + step])
+                if rate:
+                    time.sleep(step / rate)
+            ended = time.time()
+            with state.lock:
+                stats = state.stats
+                stats["download_requests"] += 1
+                stats["download_bytes"] += len(body)
+                stats["download_seconds"] += ended - began
+                if stats["first_download_start"] is None or began < stats["first_download_start"]:
+                    stats["first_download_start"] = began
+                stats["last_download_end"] = max(ended, stats["last_download_end"] or ended)
+
+    return Handler
+
+
+class MeshyStub:
+    """Runs the stub server on a background thread: `with MeshyStub(config) as stub: stub.base_url`."""
+
+    def __init__(self, config: dict | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.state = StubState({**DEFAULT_CONFIG, **(config or {})})
+        self.server = ThreadingHTTPServer((host, port), make_handler(self.state))
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/openapi/v2"
+
+    def __enter__(self) -> "MeshyStub":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self) -> dict:
+        return self.state.snapshot()
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    """Stub knobs shared by this script and bench_pipeline.py."""
+    d = DEFAULT_CONFIG
+    parser.add_argument("--time-scale", type=float, default=d["time_scale"], help="multiplier for every duration")
+    parser.add_argument("--preview-median", type=float, default=d["preview_duration"][0])
+    parser.add_argument("--refine-median", type=float, default=d["refine_duration"][0])
+    parser.add_argument("--duration-sigma", type=float, default=d["preview_duration"][1], help="lognormal spread of task durations")
+    parser.add_argument("--queue-median", type=float, default=d["queue_delay"][0])
+    parser.add_argument("--latency-median", type=float, default=d["response_latency"][0], help="per-request response latency")
+    parser.add_argument("--failure-rate", type=float, default=d["failure_rate"])
+    parser.add_argument("--expiry-rate", type=float, default=d["expiry_rate"])
+    parser.add_argument("--straggler-rate", type=float, default=d["straggler_rate"],
+                        help="fraction of tasks that run --straggler-factor times longer")
+    parser.add_argument("--straggler-factor", type=float, default=d["straggler_factor"])
+    parser.add_argument("--rate-limit-rate", type=float, default=d["rate_limit_rate"])
+    parser.add_argument("--max-rps", type=float, default=d["max_requests_per_second"], help="server-side request cap (0 = none)")
+    parser.add_argument("--texture-size", type=int, default=d["texture_size"])
+    parser.add_argument("--download-bps", type=float, default=d["download_bytes_per_second"])
+    parser.add_argument("--seed", type=int, default=d["seed"])
+
+
+def config_from_args(args: argparse.Namespace) -> dict:
+    return {
+        "time_scale": args.time_scale,
+        "preview_duration": (args.preview_median, args.duration_sigma),
+        "refine_duration": (args.refine_median, args.duration_sigma),
+        "queue_delay": (args.queue_median, DEFAULT_CONFIG["queue_delay"][1]),
+        "response_latency": (args.latency_median, DEFAULT_CONFIG["response_latency"][1]),
+        "failure_rate": args.failure_rate,
+        "expiry_rate": args.expiry_rate,
+        "straggler_rate": args.straggler_rate,
+        "straggler_factor": args.straggler_factor,
+        "rate_limit_rate": args.rate_limit_rate,
+        "max_requests_per_second": args.max_rps,
+        "texture_size": args.texture_size,
+        "download_bytes_per_second": args.download_bps,
+        "seed": args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Meshy text-to-3D API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    with MeshyStub(config_from_args(args), args.host, args.port) as stub:
+        print(f"Meshy stub listening: MESHY_BASE_URL={stub.base_url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+Tiny PNG encoder for the asset tools (no Pillow needed).
+
+Writes 8-bit grayscale, RGB or RGBA images from a NumPy array, using the
+"up" filter on every row, which compresses rendered images well.
+"""
+
+import struct
+import zlib
+
+import numpy as np
+
+COLOR_TYPES = {1: 0, 3: 2, 4: 6}  # channels -> PNG color type
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    crc = zlib.crc32(kind + data) & 0xFFFFFFFF
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", crc)
+
+
+def encode_png(pixels: np.ndarray, level: int = 9) -> bytes:
+    """Encode an (h, w) or (h, w, channels) uint8 array as PNG bytes."""
+    pixels = np.asarray(pixels)
+    if pixels.ndim == 2:
+        pixels = pixels[:, :, None]
+    if pixels.dtype != np.uint8:
+        pixels = np.clip(pixels, 0, 255).astype(np.uint8)
+    height, width, channels = pixels.shape
+    if channels not in COLOR_TYPES:
+        raise ValueError(f"unsupported channel count {channels}")
+
+    rows = pixels.reshape(height, width * channels).astype(np.int16)
+    up = np.empty_like(rows)
+    up[0] = rows[0]
+    up[1:] = rows[1:] - rows[:-1]
+    filtered = np.empty((height, width * channels + 1), dtype=np.uint8)
+    filtered[:, 0] = 2  # filter type "up"
+    filtered[:, 1:] = (up & 0xFF).astype(np.uint8)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, COLOR_TYPES[channels], 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n"
+            + _chunk(b"IHDR", header)
+            + _chunk(b"IDAT", zlib.compress(filtered.tobytes(), level))
+            + _chunk(b"IEND", b""))
+
+
+def write_png(path, pixels: np.ndarray):
+    with open(path, "wb") as f:
+        f.write(encode_png(pixels))
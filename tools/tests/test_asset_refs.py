@@ -0,0 +1,53 @@
+from asset_refs import ReferenceIndex, is_model
+
+
+def write(root, relative: str, text: str = ""):
+    path = root / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def project(root):
+    write(root, "project.godot", 'run/main_scene="res://Scenes/Main.tscn"\n')
+    write(root, "Scenes/Main.tscn", '[ext_resource path="res://Scenes/Tree.tscn"]\n')
+    write(root, "Scenes/Tree.tscn", '[ext_resource path="res://Assets/Models/World/tree_lod.tscn"]\n')
+    write(root, "Scenes/Unused.tscn", '[ext_resource path="res://Assets/Models/World/rock.glb"]\n')
+    write(root, "Data/axe.tres", 'model_path = "res://Assets/Models/Weapons/axe.glb"\n')
+    write(root, "Assets/Models/World/tree_lod.tscn", '[ext_resource path="res://Assets/Models/World/tree.glb"]\n')
+    write(root, "Assets/Models/World/tree.glb")
+    write(root, "Assets/Models/World/orphan.glb")
+
+
+def test_model_scenes_count_as_references(tmp_path):
+    project(tmp_path)
+    index = ReferenceIndex(tmp_path).scan()
+
+    used = index.used_models()
+    assert used == {"res://Assets/Models/World/tree_lod.tscn", "res://Assets/Models/World/tree.glb"}
+    assert index.referenced_models() - used == {"res://Assets/Models/World/rock.glb",
+                                                "res://Assets/Models/Weapons/axe.glb"}
+    on_disk = index.models_on_disk(tmp_path / "Assets" / "Models")
+    assert set(on_disk) - used == {"res://Assets/Models/World/orphan.glb"}
+    assert not is_model("res://Scenes/Tree.tscn")
+
+
+def test_cache_only_reparses_changed_files(tmp_path):
+    project(tmp_path)
+    cache = tmp_path / "cache.json"
+    ReferenceIndex(tmp_path, cache).scan()
+    assert ReferenceIndex(tmp_path, cache).scan().reparsed == 0
+    write(tmp_path, "Scenes/Main.tscn", '[ext_resource path="res://Scenes/Tree.tscn"]\n\n')
+    assert ReferenceIndex(tmp_path, cache).scan().reparsed == 1
+
+
+def test_retarget_rewrites_exact_references_only(tmp_path):
+    project(tmp_path)
+    write(tmp_path, "Data/axe_big.tres", 'model_path = "res://Assets/Models/Weapons/axe.glb.bak"\n')
+    index = ReferenceIndex(tmp_path).scan()
+
+    assert index.retarget("res://Assets/Models/Weapons/axe.glb", "res://Assets/Models/Weapons/axe.tscn") == [
+        "res://Data/axe.tres"]
+    assert (tmp_path / "Data/axe.tres").read_text() == 'model_path = "res://Assets/Models/Weapons/axe.tscn"\n'
+    assert "axe.glb.bak" in (tmp_path / "Data/axe_big.tres").read_text()
+    assert ReferenceIndex(tmp_path).scan().referrers("res://Assets/Models/Weapons/axe.tscn") == ["res://Data/axe.tres"]
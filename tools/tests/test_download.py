@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+import generate_assets as gen
+from meshy_stub import MeshyStub
+
+
+@pytest.fixture
+def stub():
+    with MeshyStub({"time_scale": 0.0, "texture_size": 64, "seed": 7}) as stub:
+        yield stub
+
+
+def finished_model(stub) -> tuple[str, bytes]:
+    """URL and bytes of a model the stub has finished generating."""
+    _, response = stub.state.create_task({"mode": "preview", "prompt": "a sword", "target_polycount": 800})
+    task_id = response["result"]
+    host, port = stub.server.server_address[:2]
+    return f"http://{host}:{port}/downloads/{task_id}.glb", stub.state.glb_for(task_id)
+
+
+def write_part(output, payload: bytes, validator: str | None):
+    output.with_name(output.name + ".part").write_bytes(payload)
+    output.with_name(output.name + ".part.json").write_text(json.dumps({"validator": validator}))
+
+
+def test_download_resumes_from_the_part_file(stub, tmp_path):
+    url, data = finished_model(stub)
+    output = tmp_path / "sword.glb"
+    task_id = url.rsplit("/", 1)[1][: -len(".glb")]
+    write_part(output, data[:1000], f'"{task_id}"')
+
+    assert gen.download_glb(url, output)
+    assert output.read_bytes() == data
+    assert stub.stats()["download_bytes"] == len(data) - 1000
+    assert not output.with_name("sword.glb.part").exists()
+    assert not output.with_name("sword.glb.part.json").exists()
+
+
+def test_part_file_of_other_content_is_replaced(stub, tmp_path):
+    url, data = finished_model(stub)
+    output = tmp_path / "sword.glb"
+    write_part(output, b"x" * 1000, '"some other model"')
+
+    assert gen.download_glb(url, output)
+    assert output.read_bytes() == data
+    assert stub.stats()["download_bytes"] == len(data)
+
+
+def test_complete_part_file_is_validated_not_refetched(stub, tmp_path):
+    url, data = finished_model(stub)
+    output = tmp_path / "sword.glb"
+    task_id = url.rsplit("/", 1)[1][: -len(".glb")]
+    write_part(output, data, f'"{task_id}"')
+
+    assert gen.download_glb(url, output)
+    assert output.read_bytes() == data
+    assert stub.stats()["download_bytes"] == 0
+
+
+def test_unfinished_model_is_not_installed(stub, tmp_path):
+    host, port = stub.server.server_address[:2]
+    output = tmp_path / "sword.glb"
+    assert not gen.download_glb(f"http://{host}:{port}/downloads/unknown.glb", output)
+    assert not output.exists()
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from glb import ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER, GLB, GLBError, read_gltf
+
+
+def triangle_glb() -> GLB:
+    glb = GLB({"asset": {"version": "2.0"}}, [])
+    positions = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype=np.float32)
+    uvs = np.array([[0, 0], [65535, 0], [0, 65535]], dtype=np.uint16)
+    attributes = {
+        "POSITION": glb.add_accessor(positions, target=ARRAY_BUFFER, bounds=True),
+        "TEXCOORD_0": glb.add_accessor(uvs, target=ARRAY_BUFFER, normalized=True),
+    }
+    indices = glb.add_accessor(np.array([0, 1, 2], dtype=np.uint16), target=ELEMENT_ARRAY_BUFFER)
+    image = glb.add_view(b"\x89PNG not really")
+    glb.gltf.update({
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0, "translation": [0, 2, 0]}],
+        "meshes": [{"primitives": [{"attributes": attributes, "indices": indices, "material": 0}]}],
+        "materials": [{"pbrMetallicRoughness": {"baseColorTexture": {"index": 0}}}],
+        "textures": [{"source": 0}],
+        "images": [{"bufferView": image, "mimeType": "image/png"}],
+    })
+    return glb
+
+
+def test_round_trip_keeps_accessors_and_images(tmp_path):
+    path = tmp_path / "model.glb"
+    triangle_glb().save(path)
+
+    glb = GLB.load(path)
+    prim = glb.gltf["meshes"][0]["primitives"][0]
+    np.testing.assert_array_equal(glb.read_accessor(prim["attributes"]["POSITION"]),
+                                  [[0, 0, 0], [1, 0, 0], [0, 1, 0]])
+    np.testing.assert_allclose(glb.read_accessor(prim["attributes"]["TEXCOORD_0"]), [[0, 0], [1, 0], [0, 1]])
+    np.testing.assert_array_equal(glb.read_accessor(prim["indices"]), [0, 1, 2])
+    assert glb.image_bytes(0) == b"\x89PNG not really"
+    assert GLB.from_bytes(glb.to_bytes()).to_bytes() == glb.to_bytes()
+
+
+def test_padded_vertex_attributes_get_a_stride():
+    glb = GLB({"asset": {"version": "2.0"}}, [])
+    colors = np.array([[1, 2, 3], [4, 5, 6]], dtype=np.uint8)
+    index = glb.add_accessor(colors, target=ARRAY_BUFFER)
+    assert glb.gltf["bufferViews"][0]["byteStride"] == 4
+    np.testing.assert_array_equal(GLB.from_bytes(glb.to_bytes()).read_accessor(index), colors)
+
+
+def test_compact_drops_what_nothing_references(tmp_path):
+    glb = triangle_glb()
+    glb.add_accessor(np.zeros(10, dtype=np.float32))
+    glb.gltf["materials"].append({"name": "unused"})
+    glb.set_image_bytes(0, b"replacement", "image/png")  # orphans the original image view
+    glb.compact()
+
+    assert len(glb.gltf["accessors"]) == 3
+    assert len(glb.gltf["materials"]) == 1
+    assert len(glb.gltf["bufferViews"]) == 4
+    assert glb.image_bytes(0) == b"replacement"
+
+
+def test_read_gltf_reads_only_the_json_chunk(tmp_path):
+    path = tmp_path / "model.glb"
+    triangle_glb().save(path)
+    assert read_gltf(path)["nodes"] == [{"mesh": 0, "translation": [0, 2, 0]}]
+
+
+def test_truncated_file_is_rejected():
+    data = triangle_glb().to_bytes()
+    with pytest.raises(GLBError):
+        GLB.from_bytes(data[: len(data) // 2])
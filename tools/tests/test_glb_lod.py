@@ -0,0 +1,37 @@
+from glb import GLB, read_gltf
+from glb_lod import build_lod_glb, strip_lods
+from meshy_stub import synthetic_glb
+
+
+def scene_roots(path) -> list[str]:
+    gltf = read_gltf(path)
+    return [gltf["nodes"][n].get("name") for n in gltf["scenes"][0]["nodes"]]
+
+
+def test_levels_are_written_into_the_model_and_rebuilt_from_lod0(tmp_path):
+    path = tmp_path / "tree.glb"
+    path.write_bytes(synthetic_glb(2000, 16, 0.5))
+
+    report = build_lod_glb(path, path, [0.5, 0.25])
+    assert scene_roots(path) == ["LOD0", "LOD1", "LOD2"]
+    assert report["triangles"][1] <= report["triangles"][0] // 2
+    assert report["triangles"][2] <= report["triangles"][0] // 4
+
+    again = build_lod_glb(path, path, [0.5, 0.25])
+    assert again == report
+    assert len(read_gltf(path)["meshes"]) == 3
+
+
+def test_strip_lods_restores_the_plain_model(tmp_path):
+    path = tmp_path / "tree.glb"
+    path.write_bytes(synthetic_glb(2000, 16, 0.5))
+    original = GLB.load(path)
+    build_lod_glb(path, path, [0.5])
+
+    assert strip_lods(path)
+    assert not strip_lods(path)
+    stripped = GLB.load(path)
+    assert len(stripped.gltf["meshes"]) == len(stripped.gltf["nodes"]) == 1
+    prim = stripped.gltf["meshes"][0]["primitives"][0]
+    assert len(stripped.read_accessor(prim["indices"])) == len(
+        original.read_accessor(original.gltf["meshes"][0]["primitives"][0]["indices"]))
@@ -0,0 +1,54 @@
+import numpy as np
+
+from glb import GLB
+from glb_optimize import _read_primitive, decimate, optimize_glb, pot_size, weld
+from meshy_stub import synthetic_glb
+
+
+def sphere(triangles: int) -> tuple[dict, np.ndarray]:
+    glb = GLB.from_bytes(synthetic_glb(triangles, 16, 0.5))
+    return _read_primitive(glb, glb.gltf["meshes"][0]["primitives"][0])
+
+
+def test_weld_merges_identical_vertices_and_drops_degenerate_triangles():
+    positions = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 0, 0], [1, 1, 0], [0, 1, 0], [0, 1, 0]],
+                         dtype=np.float32)
+    indices = np.array([[0, 1, 2], [3, 4, 5], [5, 6, 5]])
+    attributes, indices = weld({"POSITION": positions}, indices)
+    assert len(attributes["POSITION"]) == 4
+    assert len(indices) == 2
+    np.testing.assert_array_equal(attributes["POSITION"][indices], positions[[[0, 1, 2], [3, 4, 5]]])
+
+
+def test_decimate_stays_within_the_triangle_budget():
+    attributes, indices = weld(*sphere(4000))
+    for target in (2000, 1000, 250):
+        decimated, kept = decimate(attributes, indices, target)
+        assert target // 4 <= len(kept) <= target
+        assert kept.max() < len(decimated["POSITION"])
+        assert set(decimated) == set(attributes)
+
+
+def test_decimate_leaves_a_mesh_under_budget_alone():
+    attributes, indices = weld(*sphere(500))
+    _, kept = decimate(attributes, indices, 1000)
+    np.testing.assert_array_equal(kept, indices)
+
+
+def test_optimize_glb_enforces_polycount_and_texture_size(tmp_path):
+    path = tmp_path / "model.glb"
+    path.write_bytes(synthetic_glb(6000, 256, 0.25))
+    report = optimize_glb(path, target_polycount=1500, max_texture_size=64)
+
+    assert report["triangles_before"] > 1500
+    assert report["triangles_after"] <= 1500
+    assert report["textures_resized"] == 1
+    assert report["bytes_after"] == path.stat().st_size < report["bytes_before"]
+    glb = GLB.load(path)
+    prim = glb.gltf["meshes"][0]["primitives"][0]
+    assert len(glb.read_accessor(prim["indices"])) // 3 == report["triangles_after"]
+
+
+def test_pot_size_fits_the_budget():
+    assert pot_size(1000, 600, 512) == (512, 256)
+    assert pot_size(64, 64, 512) == (64, 64)
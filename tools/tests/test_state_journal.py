@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+import generate_assets as gen
+
+
+@pytest.fixture(autouse=True)
+def state_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(gen, "STATE_FILE", tmp_path / "state.json")
+    monkeypatch.setattr(gen, "JOURNAL_FILE", tmp_path / "state.journal")
+
+
+def test_replay_rebuilds_state_from_the_journal():
+    journal = gen.StateJournal()
+    journal.update_entry("k1", "iron_axe", preview_task="p1", refine_task="r1")
+    journal.update_entry("k1", "iron_axe", refine_task=None, model="k1.glb")
+    journal.record(op="install", name="iron_axe", key="k1")
+    journal.update_entry("k2", "logs", preview_task="p2")
+    journal.record(op="evict", key="k2")
+
+    state = gen.load_state()
+    assert state == journal.state
+    entry = state["cache"]["k1"]
+    assert (entry["preview_task"], entry["model"]) == ("p1", "k1.glb")
+    assert "refine_task" not in entry
+    assert "k2" not in state["cache"]
+    assert state["assets"] == {"iron_axe": "k1"}
+
+
+def test_torn_last_line_is_ignored():
+    journal = gen.StateJournal()
+    journal.update_entry("k1", "iron_axe", preview_task="p1")
+    with open(gen.JOURNAL_FILE, "ab") as f:
+        f.write(b'{"op":"install","name":"iron_axe","ke')  # crashed mid-append
+
+    state = gen.load_state()
+    assert state["cache"]["k1"]["preview_task"] == "p1"
+    assert state["assets"] == {}
+
+
+def test_append_after_a_torn_line_starts_a_new_line():
+    gen.StateJournal().update_entry("k1", "iron_axe", preview_task="p1")
+    with open(gen.JOURNAL_FILE, "ab") as f:
+        f.write(b'{"op":"entry","key":"k1"')
+
+    gen.StateJournal().record(op="install", name="iron_axe", key="k1")
+    lines = gen.JOURNAL_FILE.read_bytes().splitlines()
+    assert json.loads(lines[-1]) == {"op": "install", "name": "iron_axe", "key": "k1"}
+    assert gen.load_state()["assets"] == {"iron_axe": "k1"}
+
+
+def test_refresh_applies_records_from_another_journal():
+    mine, theirs = gen.StateJournal(), gen.StateJournal()
+    theirs.update_entry("k1", "iron_axe", preview_task="p1")
+    mine.refresh()
+    assert mine.state["cache"]["k1"]["preview_task"] == "p1"
+
+
+def test_compact_folds_the_journal_into_the_snapshot():
+    journal = gen.StateJournal()
+    journal.update_entry("k1", "iron_axe", preview_task="p1")
+    journal.compact()
+
+    assert not gen.JOURNAL_FILE.exists()
+    assert json.loads(gen.STATE_FILE.read_text())["cache"]["k1"]["preview_task"] == "p1"
+    assert gen.load_state() == journal.state
@@ -0,0 +1,372 @@
+"""
+Shared base-color atlases for small item and equipment models.
+
+Every refined Meshy model embeds its own textures, so each sword, helm or
+food item is a separate texture (and material) on the GPU. This stage packs
+the base-color textures of a whole group of models into shared atlas pages:
+
+  1. extract each model's embedded base-color image to tools/.cache/textures/,
+     named by its content hash (the lossless source for later repacks, shared
+     by every workdir and run that extracts the same image),
+  2. resize it to the group's power-of-two tile size and place it on a page,
+     with edge-extended gutters so mipmaps don't bleed between tiles,
+  3. rewrite the model's UVs into its tile and point its image at the page
+     through a relative URI (Godot loads the page once, as a shared texture),
+  4. write one material per page (<group>_atlas_<n>.tres next to the page)
+     and map the model's material to it in the model's Godot import settings
+     (<model>.glb.import, "use external material"), so every model on a page
+     draws with the same material and the renderer can batch them.
+
+Sharing a material means sharing its factors too: the page material takes
+the mean metallic and roughness of its models (the low-poly style barely
+shows them), and only models with one untinted, non-emissive material and
+no vertex colors are packed.
+
+The placement is recorded in the GLB (asset.extras.texture_atlas), so the
+stage can be re-run after models change: already-atlased models are mapped
+back to their own UV space and repacked. Models with anything but a single
+opaque base-color texture (normal maps, alpha, several textures), or with UVs
+outside 0-1 (a tile can't repeat the way a wrapping texture does), keep their
+embedded textures and their own material.
+
+Needs Pillow to decode and resize the JPEG/PNG images Meshy embeds.
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+
+from glb import ARRAY_BUFFER, GLB
+from glb_optimize import quantize_unit
+from png import encode_png
+
+# Models packed together, by output directory, and the tile edge each gets
+ATLAS_GROUPS = {
+    "items": {"dirs": ("Models/Items", "Models/Food"), "tile": 256},
+    "equipment": {"dirs": ("Models/Weapons", "Models/Armor"), "tile": 512},
+}
+ATLAS_PAGE_SIZE = 2048
+TILE_GUTTER = 4  # texels of edge padding on each side of a tile
+ATLAS_EXTRAS_KEY = "texture_atlas"
+CLAMP_TO_EDGE = 33071
+UV_EPSILON = 1e-3  # quantization slack still counted as inside the texture
+MIME_SUFFIXES = {"image/jpeg": ".jpg", "image/png": ".png"}
+FACTOR_EPSILON = 1e-3
+SUBRESOURCES = re.compile(r"^_subresources=", re.MULTILINE)
+
+
+class AtlasError(ValueError):
+    pass
+
+
+def atlas_group(asset: dict) -> str | None:
+    """Group an asset is packed into; an asset opts out with "atlas": None or picks one by name."""
+    if "atlas" in asset:
+        return asset["atlas"]
+    for name, group in ATLAS_GROUPS.items():
+        if asset["output_dir"] in group["dirs"]:
+            return name
+    return None
+
+
+def page_name(group: str, page: int) -> str:
+    return f"{group}_atlas_{page}.png"
+
+
+def build_atlases(models: dict[str, tuple[str, Path]], pages_dir: Path, extract_dir: Path, pages_res: str) -> dict:
+    """Pack models ({asset name: (group, GLB path)}) into atlas pages and rewrite them.
+
+    pages_res is the res:// path of pages_dir, which the page materials and import settings use.
+    Returns {"pages": {file name: [w, h]}, "packed": {name: group}, "skipped": {name: reason},
+    "unlinked": {name: reason}} (unlinked: packed, but its import settings could not be updated).
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        raise AtlasError("Pillow is not installed")
+
+    report = {"pages": {}, "packed": {}, "skipped": {}, "unlinked": {}}
+    sources = {}  # name -> (glb, image index, texcoord accessors, PIL image)
+    for name, (group, path) in sorted(models.items()):
+        try:
+            sources[name] = _load_source(Path(path), extract_dir, Image)
+        except AtlasError as e:
+            report["skipped"][name] = str(e)
+            try:
+                _link_material(Path(path), None, pages_res)
+            except (OSError, ValueError):
+                pass  # import settings Godot's editor wrote in its own syntax; nothing of ours to drop
+
+    pages_dir.mkdir(parents=True, exist_ok=True)
+    for group in sorted({models[name][0] for name in sources}):
+        names = [name for name in sorted(sources) if models[name][0] == group]
+        tile = ATLAS_GROUPS[group]["tile"]
+        per_page = (ATLAS_PAGE_SIZE // tile) ** 2
+        for page_index, start in enumerate(range(0, len(names), per_page)):
+            members = names[start:start + per_page]
+            width, height = _page_size(len(members), tile)
+            page = np.zeros((height, width, 3), dtype=np.uint8)
+            columns = width // tile
+            placements = {}
+            for slot, name in enumerate(members):
+                x, y = slot % columns * tile, slot // columns * tile
+                page[y:y + tile, x:x + tile] = _tile_pixels(sources[name][3], tile, Image)
+                placements[name] = [x + TILE_GUTTER, y + TILE_GUTTER, tile - 2 * TILE_GUTTER]
+
+            file_name = page_name(group, page_index)
+            page_path = pages_dir / file_name
+            _write_atomic(page_path, encode_png(page))
+            report["pages"][file_name] = [width, height]
+            material_res = f"{pages_res}/{page_path.stem}.tres"
+            for name in members:
+                glb, image_index, texcoords, _ = sources[name]
+                path = models[name][1]
+                _apply_placement(glb, image_index, texcoords, placements[name], (width, height), page_path, path)
+                glb.save(path)
+                report["packed"][name] = group
+                try:
+                    _link_material(path, material_res, pages_res)
+                except (OSError, ValueError) as e:
+                    report["unlinked"][name] = str(e)
+            materials = [sources[name][0].gltf["materials"][0] for name in members]
+            _write_atomic(page_path.with_suffix(".tres"),
+                          _page_material(page_path.stem, f"{pages_res}/{file_name}", materials).encode("utf-8"))
+
+        # Pages left over from a bigger previous run
+        stale = len(range(0, len(names), per_page))
+        while (pages_dir / page_name(group, stale)).exists():
+            (pages_dir / page_name(group, stale)).unlink()
+            (pages_dir / page_name(group, stale)).with_suffix(".tres").unlink(missing_ok=True)
+            stale += 1
+    return report
+
+
+def format_atlas_report(report: dict) -> str:
+    lines = [f"  [atlas] packed {len(report['packed'])} models into {len(report['pages'])} page(s)"]
+    for file_name, (width, height) in sorted(report["pages"].items()):
+        lines.append(f"      {file_name}: {width}x{height}")
+    for name, reason in sorted(report["skipped"].items()):
+        lines.append(f"      {name}: kept own textures ({reason})")
+    for name, reason in sorted(report["unlinked"].items()):
+        lines.append(f"      {name}: packed, but keeps its own material in Godot ({reason})")
+    return "\n".join(lines)
+
+
+# ── Sources ──
+
+def _load_source(path: Path, extract_dir: Path, Image):
+    """Load a model, check it can share a page, and return it with its texture in original UV space."""
+    glb = GLB.load(path)
+    gltf = glb.gltf
+    materials = gltf.get("materials", [])
+    primitives = [p for mesh in gltf.get("meshes", []) for p in mesh.get("primitives", [])]
+    used = [materials[p["material"]] for p in primitives if "material" in p]
+    if not used or len(used) != len(primitives):
+        raise AtlasError("primitives without a material")
+    if len({p["material"] for p in primitives}) > 1:
+        raise AtlasError("several materials")
+    if any("COLOR_0" in p["attributes"] for p in primitives):
+        raise AtlasError("vertex colors")
+
+    texture_index = texcoord = None
+    for material in used:
+        if material.get("alphaMode", "OPAQUE") != "OPAQUE":
+            raise AtlasError("transparent material")
+        infos = [material.get(k) for k in ("normalTexture", "occlusionTexture", "emissiveTexture")]
+        pbr = material.get("pbrMetallicRoughness", {})
+        if any(infos) or pbr.get("metallicRoughnessTexture"):
+            raise AtlasError("material has more than a base-color texture")
+        if not np.allclose(pbr.get("baseColorFactor", [1.0] * 4), 1.0, atol=FACTOR_EPSILON) \
+                or np.any(np.abs(material.get("emissiveFactor", [0.0] * 3)) > FACTOR_EPSILON):
+            raise AtlasError("tinted or emissive material")
+        info = pbr.get("baseColorTexture")
+        if not info or info.get("extensions"):
+            raise AtlasError("no plain base-color texture")
+        if texture_index not in (None, info["index"]) or texcoord not in (None, info.get("texCoord", 0)):
+            raise AtlasError("several base-color textures")
+        texture_index, texcoord = info["index"], info.get("texCoord", 0)
+
+    image_index = gltf["textures"][texture_index].get("source")
+    if image_index is None:
+        raise AtlasError("texture without an image")
+    attribute = f"TEXCOORD_{texcoord}"
+    texcoords = sorted({p["attributes"][attribute] for p in primitives if attribute in p["attributes"]})
+    if len(texcoords) == 0:
+        raise AtlasError(f"no {attribute}")
+
+    marker = gltf.get("asset", {}).get("extras", {}).get(ATLAS_EXTRAS_KEY)
+    if marker:
+        # Already on a page: recover the texture and map UVs back to the whole image
+        original = extract_dir / marker["texture"]
+        if original.is_file():
+            image = Image.open(original).convert("RGB")
+        else:
+            page = Image.open(io.BytesIO(glb.image_bytes(image_index))).convert("RGB")
+            x, y, size = marker["rect"]
+            image = page.crop((x, y, x + size, y + size))
+        x, y, size = marker["rect"]
+        width, height = marker["page_size"]
+        for accessor in texcoords:
+            uv = glb.read_accessor(accessor).astype(np.float64)
+            uv = (uv * [width, height] - [x, y]) / size
+            _check_uv_range(uv)
+            _replace_accessor(glb, accessor, uv)
+        return glb, image_index, texcoords, image
+
+    for accessor in texcoords:
+        _check_uv_range(glb.read_accessor(accessor))
+
+    payload = glb.image_bytes(image_index)
+    if payload is None:
+        raise AtlasError("image is not embedded")
+    mime = gltf["images"][image_index].get("mimeType", "image/png")
+    extract_dir.mkdir(parents=True, exist_ok=True)
+    extracted = extract_dir / f"{hashlib.sha256(payload).hexdigest()[:16]}{MIME_SUFFIXES.get(mime, '.png')}"
+    if not extracted.is_file():
+        _write_atomic(extracted, payload)
+    gltf.setdefault("asset", {}).setdefault("extras", {})[ATLAS_EXTRAS_KEY] = {"texture": extracted.name}
+    return glb, image_index, texcoords, Image.open(io.BytesIO(payload)).convert("RGB")
+
+
+def _check_uv_range(uv: np.ndarray):
+    if uv.size and (uv.min() < -UV_EPSILON or uv.max() > 1.0 + UV_EPSILON):
+        raise AtlasError(f"UVs outside 0-1 ({uv.min():.2f} to {uv.max():.2f}), the texture wraps")
+
+
+# ── Packing ──
+
+def _page_size(tiles: int, tile: int) -> tuple[int, int]:
+    """Smallest power-of-two page (up to ATLAS_PAGE_SIZE square) that fits tiles, widening first."""
+    width = height = tile
+    while (width // tile) * (height // tile) < tiles:
+        if width <= height:
+            width *= 2
+        else:
+            height *= 2
+    return width, height
+
+
+def _tile_pixels(image, tile: int, Image) -> np.ndarray:
+    inner = tile - 2 * TILE_GUTTER
+    pixels = np.asarray(image.resize((inner, inner), Image.LANCZOS), dtype=np.uint8)
+    return np.pad(pixels, ((TILE_GUTTER, TILE_GUTTER), (TILE_GUTTER, TILE_GUTTER), (0, 0)), mode="edge")
+
+
+def _apply_placement(glb: GLB, image_index: int, texcoords: list[int], rect: list[int],
+                     page_size: tuple[int, int], page_path: Path, path: Path):
+    x, y, size = rect
+    for accessor in texcoords:
+        uv = glb.read_accessor(accessor).astype(np.float64)
+        # _load_source rejected wrapping UVs; this only clamps quantization slack
+        uv = (np.clip(uv, 0.0, 1.0) * size + [x, y]) / page_size
+        _replace_accessor(glb, accessor, uv)
+
+    glb.set_image_uri(image_index, Path(os.path.relpath(page_path, path.parent)).as_posix())
+    gltf = glb.gltf
+    for texture in gltf.get("textures", []):
+        if texture.get("source") == image_index:
+            samplers = gltf.setdefault("samplers", [])
+            samplers.append({**(samplers[texture["sampler"]] if "sampler" in texture else {}),
+                             "wrapS": CLAMP_TO_EDGE, "wrapT": CLAMP_TO_EDGE})
+            texture["sampler"] = len(samplers) - 1
+    marker = gltf["asset"]["extras"][ATLAS_EXTRAS_KEY]
+    marker.update({"page": page_path.name, "rect": rect, "page_size": list(page_size)})
+    glb.compact()
+    gltf["materials"][0]["name"] = page_path.stem  # the name the import settings map to the page material
+
+
+
+def _replace_accessor(glb: GLB, index: int, uv: np.ndarray):
+    """Overwrite accessor index in place (same index, so every primitive sharing it follows)."""
+    values, normalized = quantize_unit(uv.astype(np.float32))
+    new_index = glb.add_accessor(values, target=ARRAY_BUFFER, normalized=normalized)
+    accessors = glb.gltf["accessors"]
+    accessors[index] = accessors.pop(new_index)
+
+
+def _write_atomic(path: Path, payload: bytes):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(payload)
+    os.replace(tmp, path)
+
+
+# ── Page materials ──
+
+def _page_material(name: str, page_res: str, materials: list[dict]) -> str:
+    """A StandardMaterial3D .tres drawing the page with its models' mean metallic and roughness."""
+    pbr = [m.get("pbrMetallicRoughness", {}) for m in materials]
+    metallic = float(np.mean([p.get("metallicFactor", 1.0) for p in pbr]))
+    roughness = float(np.mean([p.get("roughnessFactor", 1.0) for p in pbr]))
+    lines = [
+        "[gd_resource type=\"StandardMaterial3D\" load_steps=2 format=3]",
+        "",
+        f"[ext_resource type=\"Texture2D\" path=\"{page_res}\" id=\"1\"]",
+        "",
+        "[resource]",
+        f"resource_name = \"{name}\"",
+        "albedo_texture = ExtResource(\"1\")",
+        f"metallic = {metallic:.3f}",
+        f"roughness = {roughness:.3f}",
+        "texture_repeat = false",
+    ]
+    if any(m.get("doubleSided") for m in materials):
+        lines.append("cull_mode = 2")
+    return "\n".join(lines) + "\n"
+
+
+def _link_material(path: Path, material_res: str | None, pages_res: str):
+    """Point the model's material at material_res in <model>.glb.import (None: drop a page material link).
+
+    Only the "materials" entry of the import's _subresources is touched; the
+    rest of the file, and any other subresource settings, are kept.
+    """
+    import_path = path.with_name(path.name + ".import")
+    text = import_path.read_text(encoding="utf-8") if import_path.is_file() else ""
+    match = SUBRESOURCES.search(text)
+    if material_res is None and not match:
+        return
+    subresources, start, end = {}, None, None
+    if match:
+        start, end = match.start(), _value_end(text, match.end())
+        subresources = json.loads(text[match.end():end])  # ValueError: not JSON, left for Godot's editor
+    materials = {name: m for name, m in subresources.get("materials", {}).items()
+                 if not m.get("use_external/path", "").startswith(pages_res + "/")}
+    if material_res is not None:
+        materials[Path(material_res).stem] = {"use_external/enabled": True, "use_external/path": material_res}
+    subresources["materials"] = materials
+    line = "_subresources=" + json.dumps(subresources)
+    if match:
+        text = text[:start] + line + text[end:]
+    elif "[params]" in text:
+        text = text.replace("[params]\n", f"[params]\n\n{line}\n", 1)
+    else:
+        text = (text or '[remap]\n\nimporter="scene"\n') + f"\n[params]\n\n{line}\n"
+    _write_atomic(import_path, text.encode("utf-8"))
+
+
+def _value_end(text: str, start: int) -> int:
+    """End of the braced Variant value starting at start (Godot writes dictionaries over several lines)."""
+    depth, in_string, escaped = 0, False, False
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in "{[":
+            depth += 1
+        elif c in "}]":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    raise ValueError("unterminated _subresources")
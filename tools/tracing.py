@@ -0,0 +1,276 @@
+"""
+Structured run tracing for the asset generator.
+
+A Tracer appends one JSON object per line to a trace file. Every record has
+"ts" (unix seconds) and "event":
+
+  run      start/end of a generate run, with its settings and totals
+  span     a timed piece of work: "span" names it (slot, submit, task,
+           download, install, optimize, lod, atlas, icons), with "start" and
+           "seconds" plus span-specific fields (stage, bytes, server-side
+           queue/run times for tasks, hedge_task_id and winner for hedged
+           tasks, ...)
+  http     one API request attempt: method, endpoint, status, latency, retry
+  fallback an asset shipped with its preview model instead of the refine
+  asset    final outcome of one asset, with its category and total time
+
+Fields bound with Tracer.bind() (the asset a worker thread is on) are added to
+every record that thread emits. A --workers run writes one trace per worker
+process; their events are simply concatenated for the summary.
+
+summarize() and format_summary() turn a trace back into percentiles, the
+critical path and per-category costs.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+
+class Tracer:
+    """Thread-safe JSONL event writer. With no path every call is a no-op."""
+
+    def __init__(self, path: Path | None = None):
+        self.path = Path(path) if path else None
+        self._file = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    def emit(self, event: str, **fields):
+        if self._file is None:
+            return
+        record = {"ts": time.time(), "event": event, **getattr(self._local, "context", {}), **fields}
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    @contextmanager
+    def bind(self, **fields):
+        """Attach fields to every record this thread emits inside the block."""
+        previous = getattr(self._local, "context", {})
+        self._local.context = {**previous, **fields}
+        try:
+            yield
+        finally:
+            self._local.context = previous
+
+    @contextmanager
+    def span(self, name: str, **fields):
+        """Time the block and emit it as a span. The yielded dict collects extra fields."""
+        record = dict(fields)
+        start = time.time()
+        try:
+            yield record
+        except BaseException:
+            record.setdefault("ok", False)
+            raise
+        finally:
+            self.emit("span", span=name, start=start, seconds=time.time() - start, **record)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def load_events(path: Path) -> list[dict]:
+    events = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue  # torn last line of an interrupted run
+    return events
+
+
+def latest_traces(trace_dir: Path) -> list[Path]:
+    """Trace files of the most recent run: one file, or one per worker (<stamp>-w<i>.jsonl)."""
+    traces = sorted(Path(trace_dir).glob("*.jsonl")) if Path(trace_dir).is_dir() else []
+    if not traces:
+        return []
+    run = traces[-1].stem.partition("-w")[0]
+    return [path for path in traces if path.stem.partition("-w")[0] == run]
+
+
+def task_durations(events: list[dict]) -> list[tuple[str, str, str, float]]:
+    """(stage, asset, category, server-side seconds) of every succeeded task in a trace."""
+    categories = {e["asset"]: e.get("category") for e in events if e["event"] == "asset"}
+    durations = []
+    for e in events:
+        if e["event"] == "span" and e["span"] == "task" and e.get("ok") and e.get("asset") in categories:
+            seconds = (e.get("queue_seconds") or 0) + (e.get("run_seconds") or 0)
+            if seconds:
+                durations.append((e.get("stage"), e["asset"], categories[e["asset"]], seconds))
+    return durations
+
+
+# ── Summary ──
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"n": 0}
+    array = np.asarray(values, dtype=np.float64)
+    p50, p90, p99 = np.percentile(array, [50, 90, 99])
+    return {"n": len(values), "min": float(array.min()), "p50": p50, "p90": p90, "p99": p99,
+            "max": float(array.max()), "total": float(array.sum())}
+
+
+def _stage_samples(spans: list[dict]) -> dict[str, list[float]]:
+    samples = {}
+
+    def add(label, value):
+        if value is not None:
+            samples.setdefault(label, []).append(value)
+
+    for s in spans:
+        name, stage = s["span"], s.get("stage")
+        if name == "task":
+            add(f"{stage} queue (server)", s.get("queue_seconds"))
+            add(f"{stage} generate (server)", s.get("run_seconds"))
+            add(f"{stage} wait (client)", s["seconds"])
+        elif name in ("slot", "submit"):
+            add(f"{name} {stage}", s["seconds"])
+        else:
+            add(name, s["seconds"])
+    return samples
+
+
+def summarize(events: list[dict]) -> dict:
+    runs = [e for e in events if e["event"] == "run"]
+    spans = [e for e in events if e["event"] == "span"]
+    http = [e for e in events if e["event"] == "http"]
+    assets = [e for e in events if e["event"] == "asset"]
+    fallbacks = [e for e in events if e["event"] == "fallback"]
+    downloads = [s for s in spans if s["span"] == "download" and s.get("bytes")]
+    hedged = [s for s in spans if s["span"] == "task" and s.get("hedge_task_id")]
+
+    start = min((e.get("start", e["ts"]) for e in events), default=0.0)
+    end = max((e["ts"] for e in events), default=0.0)
+
+    # Critical path: the asset that finished last bounds the run; show its timeline
+    critical = None
+    if assets:
+        last = max(assets, key=lambda a: a["ts"])
+        timeline = sorted((s for s in spans if s.get("asset") == last["asset"]), key=lambda s: s["start"])
+        critical = {
+            "asset": last["asset"],
+            "finished_after": last["ts"] - start,
+            "segments": [
+                {"what": f"{s['span']} {s.get('stage', '')}".strip(), "offset": s["start"] - start,
+                 "seconds": s["seconds"]}
+                for s in timeline
+            ],
+        }
+
+    categories = {}
+    for a in assets:
+        c = categories.setdefault(a.get("category", "?"), {
+            "assets": 0, "ok": 0, "seconds": [], "generate_seconds": 0.0, "requests": 0, "bytes": 0})
+        c["assets"] += 1
+        c["ok"] += bool(a.get("ok"))
+        c["seconds"].append(a.get("seconds", 0.0))
+    by_asset_category = {a["asset"]: a.get("category", "?") for a in assets}
+    for s in spans:
+        category = categories.get(by_asset_category.get(s.get("asset")))
+        if category is None:
+            continue
+        if s["span"] == "task":
+            category["generate_seconds"] += (s.get("queue_seconds") or 0) + (s.get("run_seconds") or 0)
+        elif s["span"] == "download":
+            category["bytes"] += s.get("bytes", 0)
+    for h in http:
+        category = categories.get(by_asset_category.get(h.get("asset")))
+        if category is not None:
+            category["requests"] += 1
+
+    return {
+        "wall_seconds": end - start,
+        "runs": runs,
+        "assets": len(assets),
+        "succeeded": sum(bool(a.get("ok")) for a in assets),
+        "stages": {label: percentiles(v) for label, v in sorted(_stage_samples(spans).items())},
+        "http": {
+            "requests": len(http),
+            "by_endpoint": {ep: sum(h.get("endpoint") == ep for h in http) for ep in sorted({h.get("endpoint") for h in http})},
+            "latency": percentiles([h["seconds"] for h in http]),
+            "retries": sum(1 for h in http if h.get("retry_in") is not None),
+            "rate_limited": sum(1 for h in http if h.get("status") == 429),
+            "errors": sum(1 for h in http if h.get("error")),
+        },
+        "downloads": {
+            "bytes": sum(s["bytes"] for s in downloads),
+            "throughput_mb_s": percentiles([s["bytes"] / 1e6 / s["seconds"] for s in downloads if s["seconds"] > 0]),
+        },
+        "fallbacks": [f.get("asset") for f in fallbacks],
+        "hedged": [(s.get("asset"), s.get("stage"), s.get("winner")) for s in hedged],
+        "stragglers": [(a["asset"], a.get("seconds", 0.0), bool(a.get("ok")))
+                       for a in sorted(assets, key=lambda a: a.get("seconds", 0.0), reverse=True)[:5]],
+        "critical_path": critical,
+        "categories": categories,
+    }
+
+
+def format_summary(summary: dict) -> str:
+    lines = [f"Wall time: {summary['wall_seconds']:.1f}s, "
+             f"{summary['succeeded']}/{summary['assets']} assets succeeded"]
+
+    lines.append(f"\n{'Stage (seconds)':<30}{'n':>5}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+    for label, p in summary["stages"].items():
+        if p["n"]:
+            lines.append(f"  {label:<28}{p['n']:>5}{p['p50']:>9.2f}{p['p90']:>9.2f}{p['p99']:>9.2f}{p['max']:>9.2f}")
+
+    http = summary["http"]
+    latency = http["latency"]
+    endpoints = ", ".join(f"{n} {ep}" for ep, n in http["by_endpoint"].items())
+    lines.append(f"\nHTTP: {http['requests']} requests ({endpoints}), {http['retries']} retried, "
+                 f"{http['rate_limited']} got 429, {http['errors']} connection errors")
+    if latency["n"]:
+        lines.append(f"  latency ms: p50 {latency['p50'] * 1000:.0f}, p90 {latency['p90'] * 1000:.0f}, "
+                     f"p99 {latency['p99'] * 1000:.0f}, max {latency['max'] * 1000:.0f}")
+
+    downloads = summary["downloads"]
+    throughput = downloads["throughput_mb_s"]
+    line = f"\nDownloads: {downloads['bytes'] / 1e6:.1f} MB"
+    if throughput["n"]:
+        line += f", per-stream MB/s p50 {throughput['p50']:.2f}, slowest {throughput['min']:.2f}"
+    lines.append(line)
+
+    if summary["fallbacks"]:
+        lines.append(f"\nPreview fallbacks ({len(summary['fallbacks'])}): {', '.join(summary['fallbacks'])}")
+
+    if summary["hedged"]:
+        won = sum(winner == "duplicate" for _, _, winner in summary["hedged"])
+        lines.append(f"\nHedged tasks ({len(summary['hedged'])}, {won} won by the duplicate): "
+                     + ", ".join(f"{asset} {stage}" for asset, stage, _ in summary["hedged"]))
+
+    critical = summary["critical_path"]
+    if critical:
+        lines.append(f"\nCritical path: {critical['asset']} finished at +{critical['finished_after']:.1f}s")
+        for segment in critical["segments"]:
+            lines.append(f"  +{segment['offset']:>7.1f}s  {segment['what']:<22}{segment['seconds']:>8.2f}s")
+
+    if summary["stragglers"]:
+        lines.append("\nSlowest assets:")
+        for name, seconds, ok in summary["stragglers"]:
+            lines.append(f"  {name:<24}{seconds:>8.1f}s{'' if ok else '  FAILED'}")
+
+    if summary["categories"]:
+        lines.append(f"\n{'Category':<22}{'assets':>7}{'ok':>5}{'mean s':>9}{'gen s':>9}{'API req':>9}{'MB':>8}")
+        for name, c in sorted(summary["categories"].items()):
+            mean = sum(c["seconds"]) / len(c["seconds"]) if c["seconds"] else 0.0
+            lines.append(f"  {name:<20}{c['assets']:>7}{c['ok']:>5}{mean:>9.1f}{c['generate_seconds']:>9.1f}"
+                         f"{c['requests']:>9}{c['bytes'] / 1e6:>8.1f}")
+    return "\n".join(lines)